@@ -1,5 +1,12 @@
 `timescale 1ns / 1ps
 
+// Plusargs (set by run_sim.tcl / run_pipeline.py):
+//   +MAX_CYCLES=N  clk_100mhz cycles to run after reset before giving up
+//                  (default 800000); the run ends as soon as the
+//                  completion marker is stored
+//   +VCD           dump riscv_pipeline_wave.vcd (off by default)
+//   +TRACE         per-cycle CYC trace (trace_index.py / trace_store.py)
+//   +TRACE_REGS    register file snapshot every cycle
 module tb_RISCV_Pipeline;
     reg  clk_100mhz;
     reg  rst;
@@ -15,10 +22,21 @@ module tb_RISCV_Pipeline;
     initial clk_100mhz = 0;
     always #5 clk_100mhz = ~clk_100mhz;
 
-    // Waveform dump for Vivado waveform viewer
+    integer max_cycles, ref_cycles;
+    reg     trace_on, trace_regs, completed;
+
     initial begin
-        $dumpfile("riscv_pipeline_wave.vcd");
-        $dumpvars(0, tb_RISCV_Pipeline);
+        if (!$value$plusargs("MAX_CYCLES=%d", max_cycles))
+            max_cycles = 800000;
+        trace_on   = $test$plusargs("TRACE");
+        trace_regs = $test$plusargs("TRACE_REGS");
+        completed  = 0;
+
+        // Waveform dump for Vivado waveform viewer (opt-in)
+        if ($test$plusargs("VCD")) begin
+            $dumpfile("riscv_pipeline_wave.vcd");
+            $dumpvars(0, tb_RISCV_Pipeline);
+        end
     end
 
     // -------------------------------------------------------
@@ -30,8 +48,7 @@ module tb_RISCV_Pipeline;
     always @(posedge dut.clk) begin
         cycle_num <= cycle_num + 1;
 
-        // Cycle trace disabled for final verification run
-        if (0) begin
+        if (trace_on) begin
             $display("CYC %0d | PC=%08h | instr=%08h | rd=%0d wr=%b | alu=%08h | mem_w=%b mem_r=%b | fwdA=%b fwdB=%b",
                 cycle_num,
                 dut.if_stage.if_pc,
@@ -44,17 +61,18 @@ module tb_RISCV_Pipeline;
                 dut.fwd_a_w, dut.fwd_b_w);
         end
 
-        // Print register file snapshot occasionally
-        if (0) begin
+        // Print register file snapshot
+        if (trace_regs) begin
             $display("  REGS: x1=%08h x2=%08h x6=%08h x9=%08h",
                 dut.regfile.regs[1], dut.regfile.regs[2],
                 dut.regfile.regs[6], dut.regfile.regs[9]);
         end
 
-        // End of simulation detection
-        if (dut.ex_mem_write_w && dut.ex_alu_result_w == 32'h00001FFC && dut.ex_store_data_w == 32'hDEADBEEF) begin
+        // End of simulation detection: the main block dumps DataMem once
+        // the marker store has landed
+        if (!completed && dut.ex_mem_write_w && dut.ex_alu_result_w == 32'h00001FFC && dut.ex_store_data_w == 32'hDEADBEEF) begin
             $display("*** COMPLETION MARKER WRITE DETECTED at cycle %0d ***", cycle_num);
-            $finish;
+            completed <= 1;
         end
     end
 
@@ -66,12 +84,23 @@ module tb_RISCV_Pipeline;
         repeat(20) @(posedge clk_100mhz);
         rst = 0;
 
-        $display("=== RISC-V Pipeline Simulation Started (rst released) ===");
+        $display("=== RISC-V Pipeline Simulation Started (rst released, budget %0d cycles) ===",
+                 max_cycles);
 
-        // Run 400000 cycles (4ms at 100MHz)
-        repeat(400000) @(posedge clk_100mhz);
+        // Run until the completion marker, or max_cycles of clk_100mhz
+        // (default 8ms = 100k pipeline cycles, room for the ~54k-cycle
+        // 64x64 packed program)
+        ref_cycles = 0;
+        while (!completed && ref_cycles < max_cycles) begin
+            @(posedge clk_100mhz);
+            ref_cycles = ref_cycles + 1;
+        end
+        if (completed)
+            @(posedge dut.clk);     // marker store writes DataMem on this edge
+        else
+            $display("*** TIMEOUT: no completion marker after %0d cycles ***", max_cycles);
 
-        $display("=== Done. LED[3:0] = %b ===", led);
+        $display("=== Done after %0d clk_100mhz cycles. LED[3:0] = %b ===", ref_cycles, led);
         $display("  Register x1  = %08h", dut.regfile.regs[1]);
         $display("  Register x8  = %08h", dut.regfile.regs[8]);
         $display("  Register x19 = %08h", dut.regfile.regs[19]);
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+run_benchmarks.py
+Regression benchmark for the VISOR flow.
+
+Runs the fixed generate_test_image.corpus() frames through every requested
+backend x program variant (generate_program_mem.py stock / --optimize /
+--rotate) in a process pool, using run_pipeline.run_job with the result
+cache disabled. Per job it records:
+    stage_s       - wall time of each run_pipeline stage (img_to_mem,
+                    simulate, mem_to_img) and of the cycle model
+    cycles        - pipeline_model.py cycles from reset to the completion
+                    marker (cycle-accurate, independent of the backend)
+    golden_ok     - output_image.mem equals sobel_golden.py (stock programs
+                    are checked with --stale-x18)
+The summary per backend/variant adds cycles per output pixel (the 30x30
+Sobel interior) and the implied frames/s at the pipeline clock
+(clk_100mhz / 8 = 12.5 MHz, see pipeline_model.py; override with
+--clock-mhz).
+
+compare flags regressions against a stored baseline: any frame whose cycle
+count grew, any new golden mismatch or failed job fails the comparison;
+median stage times more than --time-tolerance slower are warnings (failures
+with --strict-time).
+
+Usage (from project root):
+    python benchmarks/run_benchmarks.py run [--backend iss vivado]
+                                            [--variant stock optimize rotate]
+                                            [-j N] [--repeat N] [-o results.json]
+    python benchmarks/run_benchmarks.py compare results.json
+                                            [--baseline benchmarks/baseline.json]
+                                            [--time-tolerance 0.25] [--strict-time]
+Refresh the baseline with: run -o benchmarks/baseline.json
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+import platform
+import statistics
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+BENCH_DIR    = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+SCRIPT_DIR   = os.path.join(PROJECT_ROOT, "scripts")
+sys.path.insert(0, SCRIPT_DIR)
+
+import mem_codec
+import pipeline_model
+import riscv_iss
+import run_pipeline
+import sobel_golden
+import visor
+from generate_test_image import write_corpus
+
+OUT_DIR   = os.path.join(PROJECT_ROOT, "output", "benchmarks")
+RESULTS   = os.path.join(OUT_DIR, "results.json")
+BASELINE  = os.path.join(BENCH_DIR, "baseline.json")
+
+VARIANTS      = ("stock", "optimize", "rotate")
+OUTPUT_PIXELS = 30 * 30         # Sobel outputs per 32x32 frame
+TIME_FLOOR_S  = 0.05            # ignore stage slow-downs below this
+
+def build_programs(variants, out_dir):
+    """program.mem per variant, generated into out_dir/<variant>/."""
+    programs = {}
+    for variant in variants:
+        dest = os.path.join(out_dir, variant)
+        try:
+            words = visor.generate_program(variant)
+        except ValueError as e:
+            sys.exit(f"[ERROR] {variant} program: {e}")
+        os.makedirs(dest, exist_ok=True)
+        programs[variant] = os.path.join(dest, "program.mem")
+        mem_codec.write_memh(programs[variant], words, upper=True)
+    return programs
+
+def bench_job(backend, variant, image, program_mem, run_dir):
+    """run_pipeline.run_job plus cycle count and golden check; never raises."""
+    record = run_pipeline.run_job(image, run_dir, backend, program_mem)
+    record.update(variant=variant,
+                  name=os.path.splitext(os.path.basename(image))[0],
+                  cycles=None, golden_ok=None)
+    if record["status"] != "ok":
+        return record
+    image_mem  = os.path.join(run_dir, "image.mem")
+    output_mem = os.path.join(run_dir, "output_image.mem")
+    try:
+        start = time.perf_counter()
+        stats = pipeline_model.run(
+            riscv_iss.read_mem(program_mem, riscv_iss.IMEM_WORDS),
+            riscv_iss.read_mem(image_mem, riscv_iss.DMEM_WORDS))
+        record["stage_s"]["cycle_model"] = round(time.perf_counter() - start, 4)
+        if not stats["halted"]:
+            raise RuntimeError("cycle model: no completion marker")
+        record["cycles"] = stats["cycles"]
+
+        shape = (sobel_golden.HEIGHT, sobel_golden.WIDTH)
+        frame = mem_codec.read_memh(image_mem, mem_codec.FRAME_WORDS) & 0xFF
+        golden = sobel_golden.sobel_golden(frame.reshape(shape),
+                                           stale_x18=(variant == "stock"))
+        actual = mem_codec.read_memh(output_mem, frame.size) & 0xFF
+        record["golden_ok"] = bool((golden == actual.reshape(shape)).all())
+    except Exception as e:
+        record["status"] = "failed"
+        record["error"] = str(e)
+    return record
+
+def summarize(records, clock_hz):
+    """Per backend/variant: cycles per frame, cycles/pixel, fps, stage medians."""
+    groups = {}
+    for rec in records:
+        groups.setdefault(f"{rec['backend']}/{rec['variant']}", []).append(rec)
+    summary = {}
+    for key, recs in sorted(groups.items()):
+        ok = [r for r in recs if r["status"] == "ok"]
+        cycles = {r["name"]: r["cycles"] for r in ok}
+        stages = {}
+        for r in ok:
+            for name, t in r["stage_s"].items():
+                stages.setdefault(name, []).append(t)
+        mean = statistics.mean(cycles.values()) if cycles else 0
+        summary[key] = {
+            "jobs": len(recs),
+            "failed": len(recs) - len(ok),
+            "golden_mismatches": sum(1 for r in ok if not r["golden_ok"]),
+            "cycles": cycles,
+            "mean_cycles": round(mean, 1),
+            "cycles_per_pixel": round(mean / OUTPUT_PIXELS, 3),
+            "fps": round(clock_hz / mean, 2) if mean else 0,
+            "median_stage_s": {k: round(statistics.median(v), 4)
+                               for k, v in stages.items()},
+            "median_wall_time_s": round(statistics.median(
+                r["wall_time_s"] for r in ok), 4) if ok else None,
+        }
+    return summary
+
+def print_summary(summary, clock_hz):
+    print(f"\n{'backend/variant':<18} {'cycles':>8} {'cyc/px':>7} "
+          f"{'fps':>7} {'wall s':>7} {'sim s':>7}  golden")
+    for key, s in summary.items():
+        passed = s["jobs"] - s["failed"] - s["golden_mismatches"]
+        print(f"{key:<18} {s['mean_cycles']:8.0f} {s['cycles_per_pixel']:7.2f} "
+              f"{s['fps']:7.1f} {s['median_wall_time_s'] or 0:7.3f} "
+              f"{s['median_stage_s'].get('simulate', 0):7.3f}  "
+              f"{passed}/{s['jobs']}")
+    print(f"(fps at {clock_hz / 1e6:g} MHz)")
+
+def run(args):
+    clock_hz = args.clock_mhz * 1e6
+    if args.backend is None:
+        args.backend = ["iss"] + (["vivado"] if run_pipeline.find_vivado() else [])
+    if "vivado" in args.backend and run_pipeline.find_vivado() is None:
+        sys.exit(f"[ERROR] Vivado not found at '{run_pipeline.VIVADO_PATH}'")
+
+    run_pipeline.banner(f"BENCHMARK: {', '.join(args.backend)} x "
+                        f"{', '.join(args.variant)}, {args.jobs} workers")
+    corpus   = write_corpus(os.path.join(args.work_dir, "corpus"))
+    programs = build_programs(args.variant, os.path.join(args.work_dir, "programs"))
+
+    jobs = [(backend, variant, image, programs[variant],
+             os.path.join(args.work_dir, "runs",
+                          f"{backend}_{variant}_"
+                          f"{os.path.splitext(os.path.basename(image))[0]}_r{rep}"))
+            for rep in range(args.repeat)
+            for backend in args.backend
+            for variant in args.variant
+            for image in corpus]
+
+    # xsim shares one run directory per project: one Vivado run at a time
+    sim_slots = multiprocessing.BoundedSemaphore(
+        1 if "vivado" in args.backend else args.jobs)
+    start = time.perf_counter()
+    records = []
+    with ProcessPoolExecutor(max_workers=args.jobs,
+                             initializer=run_pipeline._init_worker,
+                             initargs=(sim_slots,)) as pool:
+        futures = [pool.submit(bench_job, *job) for job in jobs]
+        for future in as_completed(futures):
+            rec = future.result()
+            records.append(rec)
+            if rec["status"] != "ok":
+                print(f"[FAIL] {rec['backend']}/{rec['variant']} "
+                      f"{rec['name']}: {rec['error']}")
+            elif not rec["golden_ok"]:
+                print(f"[FAIL] {rec['backend']}/{rec['variant']} "
+                      f"{rec['name']}: output differs from golden")
+    elapsed = time.perf_counter() - start
+
+    for rec in records:
+        for k in ("image", "run_dir"):
+            rec[k] = os.path.relpath(rec[k], PROJECT_ROOT).replace(os.sep, "/")
+    records.sort(key=lambda r: (r["backend"], r["variant"], r["name"],
+                                r["run_dir"]))
+    summary = summarize(records, clock_hz)
+    results = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+               "host": platform.node(), "python": platform.python_version(),
+               "clock_mhz": args.clock_mhz, "jobs": args.jobs,
+               "repeat": args.repeat, "wall_time_s": round(elapsed, 3),
+               "summary": summary, "results": records}
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=1)
+
+    print_summary(summary, clock_hz)
+    print(f"\n[OK]   {len(records)} jobs in {elapsed:.2f} s → '{args.output}'")
+    return 1 if any(s["failed"] or s["golden_mismatches"]
+                    for s in summary.values()) else 0
+
+def compare(args):
+    for path in (args.results, args.baseline):
+        if not os.path.exists(path):
+            sys.exit(f"[ERROR] File not found: '{path}'")
+    with open(args.results) as f:
+        new = json.load(f)["summary"]
+    with open(args.baseline) as f:
+        old = json.load(f)["summary"]
+
+    failures = warnings = 0
+    for key, base in old.items():
+        cur = new.get(key)
+        if cur is None:
+            print(f"[WARN] {key}: in the baseline but not in '{args.results}'")
+            warnings += 1
+            continue
+        for name, cycles in base["cycles"].items():
+            now = cur["cycles"].get(name)
+            if now is None:
+                print(f"[FAIL] {key} {name}: no result")
+                failures += 1
+            elif now > cycles:
+                print(f"[FAIL] {key} {name}: {cycles} → {now} cycles "
+                      f"(+{100 * (now - cycles) / cycles:.1f}%)")
+                failures += 1
+            elif now < cycles:
+                print(f"[INFO] {key} {name}: {cycles} → {now} cycles "
+                      f"({100 * (now - cycles) / cycles:.1f}%)")
+        for field in ("failed", "golden_mismatches"):
+            if cur[field] > base[field]:
+                print(f"[FAIL] {key}: {field} {base[field]} → {cur[field]}")
+                failures += 1
+        for stage, t in base["median_stage_s"].items():
+            now = cur["median_stage_s"].get(stage)
+            if now is not None and now > t * (1 + args.time_tolerance) and \
+                    now - t > TIME_FLOOR_S:
+                print(f"[{'FAIL' if args.strict_time else 'WARN'}] {key} "
+                      f"{stage}: median {t:.3f} → {now:.3f} s")
+                if args.strict_time:
+                    failures += 1
+                else:
+                    warnings += 1
+
+    print(f"[INFO] {len(old)} baseline groups: {failures} regressions, "
+          f"{warnings} warnings")
+    return 1 if failures else 0
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="VISOR regression benchmark (cycles, cycles/pixel, fps, "
+                    "stage wall time)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_run = sub.add_parser("run", help="benchmark the corpus")
+    p_run.add_argument("--backend", nargs="+", choices=("iss", "vivado"),
+                       help="default: iss, plus vivado when it is found")
+    p_run.add_argument("--variant", nargs="+", choices=VARIANTS,
+                       default=list(VARIANTS))
+    p_run.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1)
+    p_run.add_argument("--repeat", type=int, default=1,
+                       help="runs per job, for steadier stage medians")
+    p_run.add_argument("--clock-mhz", type=float,
+                       default=pipeline_model.PIPELINE_CLK_HZ / 1e6,
+                       help="pipeline clock for fps (default: %(default)g)")
+    p_run.add_argument("--work-dir", default=OUT_DIR)
+    p_run.add_argument("-o", "--output", default=RESULTS)
+
+    p_cmp = sub.add_parser("compare", help="flag regressions vs a baseline")
+    p_cmp.add_argument("results", nargs="?", default=RESULTS)
+    p_cmp.add_argument("--baseline", default=BASELINE)
+    p_cmp.add_argument("--time-tolerance", type=float, default=0.25,
+                       help="allowed stage slow-down fraction (default: 0.25)")
+    p_cmp.add_argument("--strict-time", action="store_true",
+                       help="treat stage slow-downs as regressions")
+    args = parser.parse_args()
+
+    if args.cmd == "run":
+        args.jobs = max(1, args.jobs)
+        args.repeat = max(1, args.repeat)
+        sys.exit(run(args))
+    sys.exit(compare(args))
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
-import re
+import numpy as np
+from trace_index import (DEFAULT_LOG, load_index, select, with_context,
+                         iter_lines)
 
 # Analyze key instructions in trace:
 # PC=0x64: CUSTOM_RERAM instruction (rs1=x10, rs2=x11, rd=x19) => wb_sel=2'b10 => reram_result
@@ -8,39 +10,25 @@ import re
 # PC=0x74: ADD  x23, x23, x8 (add base 0x1000)
 # PC=0x78: SW   x19, 0(x23)  (store reram result)
 
-with open('VISOR.sim/sim_1/behav/xsim/simulate.log', 'r') as f:
-    lines = f.readlines()
+index = load_index(DEFAULT_LOG)
 
-# Find all store instructions at PC=0x78 and preceding RERAM at PC=0x64
-for i, line in enumerate(lines):
-    if 'PC=00000078' in line and 'CYC' in line:
-        # Print the RERAM instruction and the store
-        for j in range(max(0, i-8), min(len(lines), i+3)):
-            l = lines[j].strip()
-            if 'CYC' in l or 'REGS' in l:
-                print(l)
-        print("---")
-        # Only print first 5
-        if lines[i:].count('PC=00000078') < 2:
-            break
+def show(rows):
+    for line in iter_lines(DEFAULT_LOG, index['offset'][rows]):
+        print(line)
+
+# First 5 stores at PC=0x78, each with the 8 lines before it (RERAM at 0x64)
+stores = np.flatnonzero(select(index, pcs=[0x78]))[:5]
+for row in stores:
+    mask = np.zeros(len(index['offset']), dtype=bool)
+    mask[row] = True
+    show(np.flatnonzero(with_context(mask, 8, 2)))
+    print("---")
 
 # Also check: what does the CUSTOM instruction (PC=0x64) produce?
 print("\n=== CUSTOM RERAM (PC=0x64) instructions ===")
-count = 0
-for line in lines:
-    if 'PC=00000064' in line and 'CYC' in line:
-        print(line.strip())
-        count += 1
-        if count > 10:
-            break
+show(np.flatnonzero(select(index, pcs=[0x64]))[:11])
 
 # Check what x19 holds after RERAM
 print("\n=== wb_sel and reram_result check ===")
 print("Looking for rd=19 (x19) writes...")
-count = 0
-for line in lines:
-    if 'rd=19' in line and 'CYC' in line:
-        print(line.strip())
-        count += 1
-        if count > 10:
-            break
+show(np.flatnonzero(select(index, rd=19))[:11])
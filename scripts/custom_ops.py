@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+custom_ops.py
+Registry of custom (opcode 0001011) instructions for exploring ReRAM ISA
+extensions before any RTL is written.
+
+Each entry declares:
+    name       - generate_program_mem.py --custom NAME
+    funct3/7   - encoding; rd = dests[0], rs1/rs2 = sources[0]/sources[1]
+    sources    - registers of a 3 x cols pixel window, row-major; like the
+                 pixel_regs bus they are read straight from the register
+                 file, bits [7:0] only
+    dests      - cols - 2 result registers, one output pixel each: trigger
+                 output j is the pixel under window column j + 1
+    semantics  - f(pixels) -> one result per dest, pixels in sources order
+    latency    - pipeline cycles per trigger (1 = the current ReRAM path;
+                 a longer op is modelled as stalling the pipeline)
+
+riscv_iss.py executes custom words through lookup(), so any registered op
+runs functionally. Words that match no entry fall back to "sobel", as
+ControlUnit decodes the opcode alone. generate_program_mem.py --custom NAME
+emits a sliding-window program for any op (see build_custom), and
+"rank" generates, runs and checks each op against a direct sweep of its
+semantics, then ranks them by projected cycles per frame:
+
+    cycles = instructions + 2 * taken branches + load-use stalls
+             + (latency - 1) * triggers + PIPELINE_FILL
+
+(the pipeline_model.py count for the same program when latency is 1; rank
+prints the check on "sobel", the only op the RTL implements).
+
+More ops can be declared in Python files listed in $VISOR_CUSTOM_OPS
+(os.pathsep-separated), which are executed with register() in scope, so
+the generator, the ISS and rank all pick them up.
+
+Usage: python custom_ops.py list
+       python custom_ops.py rank [image.mem] [--ops a,b,...] [--width W]
+                                 [--height H] [--json out.json]
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+
+from riscv_iss import SOBEL_GX, SOBEL_GY, reram_sobel
+
+SCRIPT_DIR   = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+
+OP_CUSTOM     = 0b0001011
+DEFAULT_OP    = "sobel"
+PIPELINE_FILL = 2               # reset release to first issue + marker WB
+
+# Registers the generated programs keep for themselves: zero, zero-fill
+# pointers, output base / end and the induction pointers x20-x23; x27 is
+# what the marker's "lui x10, 0xDEADC" adds (imm[7:3], see riscv_iss.py)
+RESERVED = (0, 3, 4, 8, 9, 20, 21, 22, 23, 27)
+
+PREWITT_GX = (-1, 0, 1, -1, 0, 1, -1, 0, 1)
+PREWITT_GY = (-1, -1, -1, 0, 0, 0, 1, 1, 1)
+SCHARR_GX  = (-3, 0, 3, -10, 0, 10, -3, 0, 3)
+SCHARR_GY  = (-3, -10, -3, 0, 0, 0, 3, 10, 3)
+LAPLACIAN  = (0, 1, 0, 1, -4, 1, 0, 1, 0)
+
+REGISTRY = {}
+
+def encode(op):
+    """Instruction word of a registered op."""
+    return ((op["funct7"] & 0x7F) << 25) | ((op["sources"][1] & 0x1F) << 20) | \
+           ((op["sources"][0] & 0x1F) << 15) | ((op["funct3"] & 0x7) << 12) | \
+           ((op["dests"][0] & 0x1F) << 7) | OP_CUSTOM
+
+def register(name, funct3, funct7, sources, dests, semantics, latency=1,
+             doc=""):
+    """Declare a custom instruction; raises ValueError if it cannot be
+    scheduled or clashes with a registered encoding."""
+    sources, dests = tuple(sources), tuple(dests)
+    cols = len(sources) // 3
+    if len(sources) != 3 * cols or cols < 3:
+        raise ValueError(f"{name}: sources must be a 3 x cols window, cols >= 3")
+    if len(dests) != cols - 2:
+        raise ValueError(f"{name}: a 3x{cols} window needs {cols - 2} dests")
+    regs = sources + dests
+    if len(set(regs)) != len(regs):
+        raise ValueError(f"{name}: sources and dests must be distinct")
+    clash = sorted(set(regs) & set(RESERVED)) + [r for r in regs if not 0 < r < 32]
+    if clash:
+        raise ValueError(f"{name}: x{clash[0]} is reserved by the programs")
+    if latency < 1:
+        raise ValueError(f"{name}: latency must be at least 1 cycle")
+    for other in REGISTRY.values():
+        if (other["funct3"], other["funct7"]) == (funct3, funct7) and \
+                other["name"] != name:
+            raise ValueError(f"{name}: funct3/funct7 already used by "
+                             f"{other['name']}")
+    REGISTRY[name] = {"name": name, "funct3": funct3, "funct7": funct7,
+                      "sources": sources, "dests": dests, "cols": cols,
+                      "pixels": cols - 2, "semantics": semantics,
+                      "latency": latency, "doc": doc}
+    return REGISTRY[name]
+
+def lookup(word):
+    """Registered op for a custom instruction word (DEFAULT_OP if none)."""
+    funct3, funct7 = (word >> 12) & 0x7, (word >> 25) & 0x7F
+    for op in REGISTRY.values():
+        if (op["funct3"], op["funct7"]) == (funct3, funct7):
+            return op
+    return REGISTRY[DEFAULT_OP]
+
+# ====== Semantics helpers ======
+
+def gradient(gx, gy=None):
+    """|Gx| + |Gy| (or |Gx| alone) clamped to 255, on a 3x3 window."""
+    def apply(pixels):
+        sx = sum(w * (p & 0xFF) for w, p in zip(gx, pixels))
+        sy = sum(w * (p & 0xFF) for w, p in zip(gy, pixels)) if gy else 0
+        return min(abs(sx) + abs(sy), 255)
+    return apply
+
+def sliding(kernel3x3, cols):
+    """Semantics of a 3 x cols window: kernel3x3 on every 3-column slice."""
+    def apply(pixels):
+        rows = [pixels[r * cols:(r + 1) * cols] for r in range(3)]
+        return [kernel3x3([p for row in rows for p in row[j:j + 3]])
+                for j in range(cols - 2)]
+    return apply
+
+def reference(op, frame, width, height):
+    """Output frame of op triggered the way build_custom walks the image.
+
+    frame is a flat list of width * height pixels; the border stays 0."""
+    out = [0] * (width * height)
+    cols, px = op["cols"], op["pixels"]
+    for r in range(1, height - 1):
+        for c in range(1, width - 1, px):
+            window = [frame[(r + dr) * width + c - 1 + dc]
+                      for dr in (-1, 0, 1) for dc in range(cols)]
+            for j, value in enumerate(op["semantics"](window)):
+                out[r * width + c + j] = value & 0xFFFFFFFF
+    return out
+
+# ====== Built-in ops ======
+
+register("sobel", 0b000, 0, range(10, 19), (19,),
+         lambda p: (reram_sobel(p),),
+         doc="ReRAM_Accelerator as built: |Gx|+|Gy| on x10-x18 -> x19")
+register("prewitt", 0b001, 0, range(10, 19), (19,),
+         sliding(gradient(PREWITT_GX, PREWITT_GY), 3),
+         doc="funct3 kernel select: Prewitt weights")
+register("scharr", 0b010, 0, range(10, 19), (19,),
+         sliding(gradient(SCHARR_GX, SCHARR_GY), 3),
+         doc="funct3 kernel select: Scharr weights")
+register("laplacian", 0b011, 0, range(10, 19), (19,),
+         sliding(gradient(LAPLACIAN), 3),
+         doc="funct3 kernel select: 4-neighbour Laplacian")
+register("sobel2", 0b000, 1,
+         (10, 11, 12, 24, 13, 14, 15, 25, 16, 17, 18, 26), (19, 28),
+         sliding(gradient(SOBEL_GX, SOBEL_GY), 4),
+         doc="2 pixels per trigger from a 3x4 window")
+register("sobel3", 0b000, 2,
+         (10, 11, 12, 24, 1, 13, 14, 15, 25, 2, 16, 17, 18, 26, 5),
+         (19, 28, 29),
+         sliding(gradient(SOBEL_GX, SOBEL_GY), 5), latency=2,
+         doc="3 pixels per trigger from a 3x5 window, 2-cycle MAC")
+
+def load_extensions(paths=None):
+    """Execute the op declarations in $VISOR_CUSTOM_OPS (or paths)."""
+    if paths is None:
+        paths = [p for p in os.environ.get("VISOR_CUSTOM_OPS", "").split(os.pathsep) if p]
+    for path in paths:
+        if not os.path.exists(path):
+            sys.exit(f"[ERROR] Custom op file not found: '{path}'")
+        with open(path) as f:
+            code = compile(f.read(), path, "exec")
+        exec(code, {"register": register, "gradient": gradient,
+                    "sliding": sliding, "reram_sobel": reram_sobel,
+                    "__file__": path})
+
+load_extensions()
+
+# ====== Ranking ======
+
+def project_cycles(op, stats):
+    """Projected pipeline cycles of a riscv_iss.run() for an op's program."""
+    return (stats["instructions"] + 2 * stats["branches_taken"] +
+            stats["load_use_stalls"] +
+            (op["latency"] - 1) * stats["reram_triggers"] + PIPELINE_FILL)
+
+def build_program(name, width, height):
+    """(InstrMem words, None) of generate_program_mem.py --custom name, or
+    (None, the reason it cannot be generated)."""
+    import visor
+
+    try:
+        return visor.generate_program(custom=name, width=width,
+                                      height=height), None
+    except ValueError as e:
+        return None, str(e)
+
+def rank(names, image, width, height):
+    """Per op: projected cycles, cycles per pixel and output check."""
+    import riscv_iss
+    import pipeline_model
+
+    frame = [p & 0xFF for p in image[:width * height]]
+    interior = (width - 2) * (height - 2)
+    results = []
+    for name in names:
+        op = REGISTRY[name]
+        program, error = build_program(name, width, height)
+        if program is None:
+            results.append({"name": name, "error": error})
+            continue
+        dmem = list(image)
+        stats = riscv_iss.run(program, dmem)
+        out = dmem[riscv_iss.DMEM_WORDS - width * height:]
+        expected = reference(op, frame, width, height)
+        expected[-1] = riscv_iss.MARKER_VALUE
+        cycles = project_cycles(op, stats)
+        record = {"name": name, "pixels_per_trigger": op["pixels"],
+                  "latency": op["latency"], "halted": stats["halted"],
+                  "instructions": stats["instructions"],
+                  "triggers": stats["reram_triggers"],
+                  "projected_cycles": cycles,
+                  "cycles_per_pixel": round(cycles / interior, 3),
+                  "output_ok": stats["halted"] and out == expected}
+        if name == DEFAULT_OP:
+            record["model_cycles"] = pipeline_model.run(program, list(image))["cycles"]
+        results.append(record)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Registry of custom ReRAM instructions")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("list", help="registered ops")
+    p_rank = sub.add_parser("rank", help="rank ops by projected cycles/frame")
+    p_rank.add_argument("image", nargs="?",
+                        default=os.path.join(PROJECT_ROOT, "output", "image.mem"))
+    p_rank.add_argument("--ops", help="comma-separated op names (default: all)")
+    p_rank.add_argument("--width", type=int, default=32)
+    p_rank.add_argument("--height", type=int, default=32)
+    p_rank.add_argument("--json", help="write the ranking as JSON")
+    args = parser.parse_args()
+
+    if args.cmd == "list":
+        for op in REGISTRY.values():
+            print(f"{op['name']:<10} {encode(op):08X}  funct3={op['funct3']:03b} "
+                  f"funct7={op['funct7']:<3d} 3x{op['cols']} -> "
+                  f"{','.join(f'x{r}' for r in op['dests'])}  "
+                  f"latency {op['latency']}  {op['doc']}")
+        return
+
+    import riscv_iss
+    names = args.ops.split(",") if args.ops else list(REGISTRY)
+    unknown = [n for n in names if n not in REGISTRY]
+    if unknown:
+        sys.exit(f"[ERROR] Unknown op(s): {', '.join(unknown)} "
+                 f"(registered: {', '.join(REGISTRY)})")
+    if DEFAULT_OP not in names:
+        names.insert(0, DEFAULT_OP)         # the baseline for the deltas
+    if os.path.exists(args.image):
+        image = riscv_iss.read_mem(args.image, riscv_iss.DMEM_WORDS)
+    else:
+        print(f"[WARN] '{args.image}' not found, using a random "
+              f"{args.width}x{args.height} frame")
+        rng = random.Random(0)
+        image = [rng.randrange(256) for _ in range(args.width * args.height)]
+        image += [0] * (riscv_iss.DMEM_WORDS - len(image))
+
+    results = rank(names, image, args.width, args.height)
+    base = next(r for r in results if r["name"] == DEFAULT_OP)
+    if "model_cycles" in base:
+        print(f"[INFO] Projection check on '{DEFAULT_OP}': "
+              f"{base['projected_cycles']} projected, "
+              f"{base['model_cycles']} pipeline_model.py")
+    ranked = sorted((r for r in results if "error" not in r),
+                    key=lambda r: r["projected_cycles"])
+    print(f"{'op':<10} {'px/trig':>7} {'lat':>3} {'cycles':>8} {'cyc/px':>7} "
+          f"{'vs ' + DEFAULT_OP:>9}  output")
+    for r in ranked:
+        delta = r["projected_cycles"] / base["projected_cycles"] - 1
+        print(f"{r['name']:<10} {r['pixels_per_trigger']:>7} {r['latency']:>3} "
+              f"{r['projected_cycles']:>8} {r['cycles_per_pixel']:>7.2f} "
+              f"{delta:>+9.1%}  {'OK' if r['output_ok'] else 'MISMATCH'}")
+    for r in results:
+        if "error" in r:
+            print(f"[FAIL] {r['name']}: {r['error']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"size": [args.width, args.height],
+                       "baseline": DEFAULT_OP, "ops": results}, f, indent=2)
+        print(f"[OK]   Ranking written to '{args.json}'")
+    bad = [r["name"] for r in results if "error" in r or not r["output_ok"]]
+    if bad:
+        sys.exit(f"[ERROR] {', '.join(bad)}: no program or wrong output")
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,8 @@
-import sys, re
-with open('VISOR.sim/sim_1/behav/xsim/simulate.log', 'r') as f_in, open('trace_end.txt', 'w', encoding='utf-8') as f_out:
-    for line in f_in:
-        m = re.search(r'CYC (\d+)', line)
-        if m:
-            cyc = int(m.group(1))
-            if 7190 <= cyc <= 8000:
-                f_out.write(line)
-        elif 'REGS' in line or 'COMPLETION' in line:
-            f_out.write(line)
+from trace_index import DEFAULT_LOG, KIND_CYC, load_index, select, iter_lines
+
+# CYC lines in 7190..8000 plus every REGS / COMPLETION line
+index = load_index(DEFAULT_LOG)
+mask = select(index, cycles=(7190, 8000)) | (index['kind'] != KIND_CYC)
+with open('trace_end.txt', 'w', encoding='utf-8') as f_out:
+    for line in iter_lines(DEFAULT_LOG, index['offset'][mask]):
+        f_out.write(line + '\n')
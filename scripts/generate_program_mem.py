@@ -4,15 +4,46 @@ generate_program_mem.py
 Generates program.mem (256 lines of 8-char hex) for RISC-V Sobel edge detection.
 Also writes sobel_program.s assembly source for reference.
 
+--optimize emits the strength-reduced, hazard-scheduled COL_LOOP instead
+(see build_optimized), --rotate the sliding-window variant that loads 3
+pixels per output (see build_rotate), --packed a sliding window over a frame
+stored 4 pixels per word (see build_packed, img_to_mem.py --packed);
+--custom NAME emits the same kind of sliding window for any instruction
+registered in custom_ops.py (see build_custom), e.g. one that computes
+several pixels per trigger. check_schedule() rejects any adjacent pair the
+pipeline would stall on or read stale.
+
+--width/--height set the frame (default 32x32, 64x64 with --packed). The
+input frame starts at DataMem 0 and the output frame ends at 0x1FFC, where
+the testbench expects the completion marker, so 32x32 keeps its output base
+of 0x1000. check_frame() rejects frames that do not fit DataMem; programs
+over 256 words or with offsets past the 12-bit immediates are rejected too.
+
+--rows A:B (--optimize / --rotate) emits the program of one hart of a
+row-partitioned multi-core run (see multihart_model.py): it zero-fills only
+output rows A..B-1, computes their interior rows and halts; only the hart
+that owns the last row stores the completion marker.
+
+Other scripts import the generator instead of running it:
+    words, asm_lines = generate_program_mem.build("rotate", 48, 21)
+build() writes no files and raises ValueError where this script exits.
+
 Usage (from project root):
-    python scripts/generate_program_mem.py
+    python scripts/generate_program_mem.py [--optimize | --rotate | --packed |
+                                            --custom NAME]
+                                           [--width W] [--height H]
+                                           [--rows A:B] [--out-dir DIR]
+--out-dir writes program.mem and sobel_program.s to DIR instead of mem/.
 """
 import os
+import sys
+import argparse
+
+import custom_ops
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
 MEM_DIR = os.path.join(PROJECT_ROOT, "mem")
-os.makedirs(MEM_DIR, exist_ok=True)
 
 # ====== RV32I Instruction Encoders ======
 
@@ -21,11 +52,17 @@ def r_type(funct7, rs2, rs1, funct3, rd, opcode):
            ((rs1 & 0x1F) << 15) | ((funct3 & 0x7) << 12) | \
            ((rd & 0x1F) << 7) | (opcode & 0x7F)
 
+def check_imm12(imm12):
+    if not -2048 <= imm12 <= 2047:
+        raise ValueError(f"offset {imm12} does not fit a 12-bit immediate")
+
 def i_type(imm12, rs1, funct3, rd, opcode):
+    check_imm12(imm12)
     return ((imm12 & 0xFFF) << 20) | ((rs1 & 0x1F) << 15) | \
            ((funct3 & 0x7) << 12) | ((rd & 0x1F) << 7) | (opcode & 0x7F)
 
 def s_type(imm12, rs2, rs1, funct3, opcode):
+    check_imm12(imm12)
     imm = imm12 & 0xFFF
     return (((imm >> 5) & 0x7F) << 25) | ((rs2 & 0x1F) << 20) | \
            ((rs1 & 0x1F) << 15) | ((funct3 & 0x7) << 12) | \
@@ -61,12 +98,19 @@ OP_LOAD   = 0b0000011
 OP_STORE  = 0b0100011
 OP_IMM    = 0b0010011
 OP_REG    = 0b0110011
+OP_CUSTOM = 0b0001011
+
+WRITES_RD   = (OP_LUI, OP_JAL, OP_LOAD, OP_IMM, OP_REG, OP_CUSTOM)
+RS2_READERS = (OP_REG, OP_STORE, OP_BRANCH)
 
 # Instruction helpers
 def LUI(rd, imm20):       return u_type(imm20, rd, OP_LUI)
 def ADDI(rd, rs1, imm):   return i_type(imm, rs1, 0b000, rd, OP_IMM)
 def SLLI(rd, rs1, shamt): return i_type(shamt, rs1, 0b001, rd, OP_IMM)
+def SRLI(rd, rs1, shamt): return i_type(shamt, rs1, 0b101, rd, OP_IMM)
+def ANDI(rd, rs1, imm):   return i_type(imm, rs1, 0b111, rd, OP_IMM)
 def ADD(rd, rs1, rs2):    return r_type(0, rs2, rs1, 0b000, rd, OP_REG)
+def OR(rd, rs1, rs2):     return r_type(0, rs2, rs1, 0b110, rd, OP_REG)
 def LW(rd, rs1, imm):     return i_type(imm, rs1, 0b010, rd, OP_LOAD)
 def SW(rs2, rs1, imm):    return s_type(imm, rs2, rs1, 0b010, OP_STORE)
 def BLT(rs1, rs2, off):   return b_type(off, rs2, rs1, 0b100, OP_BRANCH)
@@ -78,122 +122,791 @@ def NOP():                 return 0x00000013
 CUSTOM_RERAM = 0x00B5098B
 
 # ====== Build Program ======
-# Register allocation:
-#   x1  = row / zero-fill counter     x2  = col
-#   x3  = temp (zero-fill addr)       x6  = 31 (loop bound)
-#   x8  = 0x1000 (output base)        x9  = temp
-#   x10-x18 = 3x3 pixel neighborhood  x19 = Sobel result
-#   x20 = base address for loads      x21 = temp (col-1)
-#   x23 = output address temp
-
-program = []
-asm_lines = []
-
-def emit(instr, comment=""):
-    program.append(instr)
-    addr = (len(program) - 1) * 4
-    asm_lines.append(f"  # 0x{addr:03X}  {instr:08X}  {comment}")
-
-# --- Initialization ---
-emit(LUI(8, 1),             "lui   x8, 1            # x8 = 0x1000 (output base)")
-emit(ADDI(6, 0, 31),        "addi  x6, x0, 31       # x6 = 31 (loop bound)")
-emit(ADDI(9, 0, 1024),      "addi  x9, x0, 1024     # x9 = 1024 (pixel count)")
-emit(ADDI(1, 0, 0),         "addi  x1, x0, 0        # x1 = 0 (zero-fill counter)")
-
-# --- Zero-fill output region (border pixels get 0) ---
-# ZERO_LOOP at addr 0x10
-emit(SLLI(3, 1, 2),         "slli  x3, x1, 2        # ZERO_LOOP: offset = counter*4")
-emit(ADD(3, 3, 8),          "add   x3, x3, x8       # addr = output_base + offset")
-emit(SW(0, 3, 0),           "sw    x0, 0(x3)        # output[i] = 0")
-emit(ADDI(1, 1, 1),         "addi  x1, x1, 1        # counter++")
-emit(BLT(1, 9, -16),        "blt   x1, x9, -16      # if counter<1024, loop (->0x10)")
-
-# --- Main processing loops ---
-emit(ADDI(1, 0, 1),         "addi  x1, x0, 1        # row = 1")
-# ROW_LOOP at addr 0x28
-emit(ADDI(2, 0, 1),         "addi  x2, x0, 1        # ROW_LOOP: col = 1")
-
-# COL_LOOP at addr 0x2C — compute base addr of pixel(row-1, col-1)
-emit(ADDI(20, 1, -1),       "addi  x20, x1, -1      # COL_LOOP: x20 = row-1")
-emit(SLLI(20, 20, 5),       "slli  x20, x20, 5      # x20 = (row-1)*32")
-emit(ADDI(21, 2, -1),       "addi  x21, x2, -1      # x21 = col-1")
-emit(ADD(20, 20, 21),       "add   x20, x20, x21    # x20 = (row-1)*32+(col-1)")
-emit(SLLI(20, 20, 2),       "slli  x20, x20, 2      # x20 = byte addr of top-left")
-
-# Load 3x3 neighborhood into x10-x18
-emit(LW(10, 20, 0),         "lw    x10, 0(x20)      # pix[r-1][c-1]")
-emit(LW(11, 20, 4),         "lw    x11, 4(x20)      # pix[r-1][c  ]")
-emit(LW(12, 20, 8),         "lw    x12, 8(x20)      # pix[r-1][c+1]")
-emit(LW(13, 20, 128),       "lw    x13, 128(x20)    # pix[r  ][c-1]  (+32*4)")
-emit(LW(14, 20, 132),       "lw    x14, 132(x20)    # pix[r  ][c  ]")
-emit(LW(15, 20, 136),       "lw    x15, 136(x20)    # pix[r  ][c+1]")
-emit(LW(16, 20, 256),       "lw    x16, 256(x20)    # pix[r+1][c-1]  (+64*4)")
-emit(LW(17, 20, 260),       "lw    x17, 260(x20)    # pix[r+1][c  ]")
-emit(LW(18, 20, 264),       "lw    x18, 264(x20)    # pix[r+1][c+1]")
-
-# Fire custom ReRAM Sobel accelerator
-emit(CUSTOM_RERAM,           ".word 0x00B5098B       # CUSTOM: rd=x19 rs1=x10 rs2=x11 op=0001011")
-
-# Compute output address = 0x1000 + (row*32+col)*4
-emit(SLLI(23, 1, 5),        "slli  x23, x1, 5       # x23 = row*32")
-emit(ADD(23, 23, 2),        "add   x23, x23, x2     # x23 = row*32+col")
-emit(SLLI(23, 23, 2),       "slli  x23, x23, 2      # x23 = byte offset")
-emit(ADD(23, 23, 8),        "add   x23, x23, x8     # x23 = output addr")
-emit(SW(19, 23, 0),         "sw    x19, 0(x23)      # store Sobel result")
-
-# Col loop: col++, branch back to COL_LOOP
-emit(ADDI(2, 2, 1),         "addi  x2, x2, 1        # col++")
-emit(BLT(2, 6, -84),        "blt   x2, x6, -84      # if col<31, loop (->0x2C)")
-
-# Row loop: row++, branch back to ROW_LOOP
-emit(ADDI(1, 1, 1),         "addi  x1, x1, 1        # row++")
-emit(BLT(1, 6, -96),        "blt   x1, x6, -96      # if row<31, loop (->0x28)")
-
-# --- Completion marker: 0xDEADBEEF at 0x1FFC ---
-emit(LUI(9, 2),             "lui   x9, 2            # x9 = 0x2000")
-emit(ADDI(9, 9, -4),        "addi  x9, x9, -4       # x9 = 0x1FFC")
-# 0xDEADBEEF: upper20=0xDEADC (compensate for sign-ext), lower12=-273
-emit(LUI(10, 0xDEADC),      "lui   x10, 0xDEADC     # x10 = 0xDEADC000")
-emit(ADDI(10, 10, -273),    "addi  x10, x10, -273   # x10 = 0xDEADBEEF")
-emit(SW(10, 9, 0),          "sw    x10, 0(x9)       # mem[0x1FFC] = 0xDEADBEEF")
-
-# --- Infinite loop ---
-emit(JAL(0, 0),             "jal   x0, 0            # infinite loop (halt)")
-
-# ====== Output ======
-print(f"[INFO] Program: {len(program)} instructions")
-
-# Pad to 256 with NOP
-while len(program) < 256:
-    program.append(NOP())
-
-# Write program.mem
-program_path = os.path.join(MEM_DIR, "program.mem")
-with open(program_path, "w") as f:
-    for instr in program:
-        f.write(f"{instr:08X}\n")
-print(f"[OK]   Written {program_path} (256 lines)")
-
-# Write assembly source
-asm_path = os.path.join(MEM_DIR, "sobel_program.s")
-with open(asm_path, "w") as f:
-    f.write("# ============================================================\n")
-    f.write("# sobel_program.s — RISC-V Sobel Edge Detection for ReRAM\n")
-    f.write("# 32x32 image, custom opcode 0001011 for ReRAM accelerator\n")
-    f.write("# Input:  DataMem 0x000-0xFFC   (1024 pixels, 8-bit in 32-bit words)\n")
-    f.write("# Output: DataMem 0x1000-0x1FFC (1024 edge pixels)\n")
-    f.write("# Completion marker: 0xDEADBEEF at 0x1FFC\n")
-    f.write("# ============================================================\n\n")
-    for line in asm_lines:
-        f.write(line + "\n")
-    f.write(f"\n# Remaining {256 - len(asm_lines)} slots: NOP (0x00000013)\n")
-print(f"[OK]   Written {asm_path} ({len(asm_lines)} instructions)")
-
-# Verify critical encodings
-assert program[25] == 0x00B5098B, f"Custom instr mismatch: {program[25]:08X}"
-# Verify 0xDEADBEEF construction
-lui_val = (0xDEADC << 12) & 0xFFFFFFFF  # 0xDEADC000
-addi_val = (-273) & 0xFFFFFFFF           # 0xFFFFFEEF
-result = (lui_val + addi_val) & 0xFFFFFFFF
-assert result == 0xDEADBEEF, f"DEADBEEF mismatch: {result:08X}"
-print("[OK]   Encoding verification passed")
+# The schedules share the encoders above:
+#   stock      - reference program; every pixel recomputes its source and
+#                destination addresses from row/col (22-instruction COL_LOOP)
+#   --optimize - source/destination pointers stepped by 4 per column and the
+#                loads ordered so that no instruction depends on the one
+#                directly ahead of it (14-instruction COL_LOOP, no stalls)
+#   --rotate   - sliding window: the two shared columns are shifted with
+#                register moves and only 3 new pixels are loaded per output
+#                (11 instructions per pixel, COL_LOOP unrolled 5x)
+#   --packed   - 64x64 frame, 4 pixels per word in and out; the sliding
+#                window takes the new right column with srli from the word
+#                already in the register and loads once per 4 pixels
+#   --custom   - sliding window for a custom_ops.py instruction: a 3 x cols
+#                window yields cols-2 pixels per trigger (not unrolled)
+
+MODES = ("stock", "optimize", "rotate", "packed", "custom")
+
+ROTATE_UNROLL = 5               # max pixels per --rotate COL_LOOP iteration
+PACK          = 4               # pixels per word in the --packed layout
+PACKED_WIDTH  = 64              # default --packed frame: 64x64 = 1024 words
+DMEM_BYTES    = 0x2000          # DataMem: reg [31:0] mem [0:2047]
+IMEM_WORDS    = 256             # InstrMem: reg [31:0] mem [0:255]
+
+class Program:
+    """Instructions and assembly listing of one program, built for its own
+    frame, so programs for different frames can be built side by side."""
+
+    def __init__(self, mode="stock", width=None, height=None, rows=None,
+                 custom=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode '{mode}' (one of {', '.join(MODES)})")
+        if custom is not None and mode != "custom":
+            raise ValueError(f"A custom op needs mode 'custom', not '{mode}'")
+        self.mode = mode
+        self.custom_name = custom or custom_ops.DEFAULT_OP
+        if self.custom_name not in custom_ops.REGISTRY:
+            raise ValueError(f"Unknown custom op '{self.custom_name}' (registered: "
+                             f"{', '.join(custom_ops.REGISTRY)})")
+        self.op = custom_ops.REGISTRY[self.custom_name]
+
+        default = PACKED_WIDTH if mode == "packed" else 32
+        self.width  = width or default
+        self.height = height or default
+        # Output rows [first_row, end_row) of this program (--rows, default all)
+        self.first_row, self.end_row = rows or (0, self.height)
+        self.partial = (self.first_row, self.end_row) != (0, self.height)
+
+        # Bytes per image row, frame bytes and the output base (frame ends at 0x2000)
+        self.row      = self.width if mode == "packed" else 4 * self.width
+        self.frame    = self.row * self.height
+        self.out_base = DMEM_BYTES - self.frame
+
+        self.words = []
+        self.asm_lines = []
+        self.issues = []
+
+    def check_frame(self):
+        """Reasons the width x height frame cannot be laid out in DataMem."""
+        errors = []
+        if self.width < 3 or self.height < 3:
+            errors.append("Sobel needs at least 3x3 pixels")
+        if self.mode == "packed" and (self.width % PACK or self.width < 2 * PACK):
+            errors.append(f"--packed needs a width that is a multiple of {PACK} "
+                          f"and at least {2 * PACK}")
+        if 2 * self.frame > DMEM_BYTES:
+            words = self.frame // 4
+            errors.append(f"input + output need {2 * words} words, DataMem has "
+                          f"{DMEM_BYTES // 4} (at most {DMEM_BYTES // 8} words "
+                          f"per frame)")
+        if self.partial:
+            if self.mode not in ("optimize", "rotate"):
+                errors.append("--rows needs --optimize or --rotate")
+            if not 0 <= self.first_row < self.end_row <= self.height:
+                errors.append(f"--rows {self.first_row}:{self.end_row} is not a row range "
+                              f"of 0:{self.height}")
+            elif max(self.first_row, 1) >= min(self.end_row, self.height - 1):
+                errors.append(f"--rows {self.first_row}:{self.end_row} has no interior rows")
+        return errors
+
+    def emit(self, instr, comment=""):
+        self.words.append(instr)
+        addr = (len(self.words) - 1) * 4
+        self.asm_lines.append(f"  # 0x{addr:03X}  {instr:08X}  {comment}")
+
+    def here(self):
+        """Byte address of the next emitted instruction (branch label)."""
+        return len(self.words) * 4
+
+    def emit_li(self, rd, value, what):
+        """rd = value with lui/addi (lui only for values past the 12-bit range)."""
+        hi = (value + 0x800) >> 12
+        lo = value - (hi << 12)
+        # LUI also adds the register named by imm[7:3] (see riscv_iss.py); keep
+        # that field at x0
+        assert 0 <= hi < 8, f"li x{rd}, 0x{value:X} out of range"
+        if hi:
+            self.emit(LUI(rd, hi),  f"{f'lui   x{rd}, {hi}':<23}# x{rd} = 0x{hi << 12:X}"
+                                    + ("" if lo else f" ({what})"))
+        if lo or not hi:
+            self.emit(ADDI(rd, rd if hi else 0, lo),
+                      f"{f'addi  x{rd}, x{rd if hi else 0}, {lo}':<23}# x{rd} = "
+                      f"{value if value < 0x100 else f'0x{value:X}'} ({what})")
+
+    def emit_mul(self, rd, rs, factor, what):
+        """rd = rs * factor with slli/add (x24/x25 hold partial products)."""
+        bits = [b for b in range(factor.bit_length()) if factor >> b & 1]
+        if len(bits) > 1:
+            self.emit(SLLI(24, rs, bits[0]), f"{f'slli  x24, x{rs}, {bits[0]}':<23}# x24 = x{rs}*{1 << bits[0]}")
+            for b in bits[1:-1]:
+                self.emit(SLLI(25, rs, b),   f"{f'slli  x25, x{rs}, {b}':<23}# x25 = x{rs}*{1 << b}")
+                self.emit(ADD(24, 24, 25),    "add   x24, x24, x25")
+        self.emit(SLLI(rd, rs, bits[-1]), f"{f'slli  x{rd}, x{rs}, {bits[-1]}':<23}# x{rd} = {what}"
+                                          + ("" if len(bits) == 1 else " (top bit)"))
+        if len(bits) > 1:
+            self.emit(ADD(rd, rd, 24), f"{f'add   x{rd}, x{rd}, x24':<23}# x{rd} = {what}")
+
+    def emit_addr(self, rd, value, what, bases=(0, 8, 9)):
+        """rd = value as one addi off the first of x0 / x8 (output base) / x9
+        (0x2000) it fits, else with emit_li."""
+        for base in bases:
+            off = value - {0: 0, 8: self.out_base, 9: DMEM_BYTES}[base]
+            if -2048 <= off <= 2047:
+                self.emit(ADDI(rd, base, off),
+                          f"{f'addi  x{rd}, x{base}, {off}':<23}# x{rd} = {what}")
+                return
+        self.emit_li(rd, value, what)
+
+    def interior_rows(self):
+        """Interior rows [r0, r1) computed by this program (see --rows)."""
+        return max(self.first_row, 1), min(self.end_row, self.height - 1)
+
+    def build_stock(self):
+        # Register allocation:
+        #   x1  = row / zero-fill counter     x2  = col
+        #   x3  = temp (zero-fill addr)       x6  = W-1 (col loop bound)
+        #   x7  = H-1 (row loop bound, x6 when the frame is square)
+        #   x8  = output base                 x9  = temp
+        #   x10-x18 = 3x3 pixel neighborhood  x19 = Sobel result
+        #   x20 = base address for loads      x21 = temp (col-1)
+        #   x23 = output address temp         x24, x25 = row*W partial products
+        W, H = self.width, self.height
+        row_bound = 6 if W == H else 7
+
+        # --- Initialization ---
+        self.emit_li(8, self.out_base, "output base")
+        self.emit(ADDI(6, 0, W - 1),     f"{f'addi  x6, x0, {W - 1}':<23}# x6 = {W - 1} (loop bound)")
+        if row_bound == 7:
+            self.emit(ADDI(7, 0, H - 1), f"{f'addi  x7, x0, {H - 1}':<23}# x7 = {H - 1} (row loop bound)")
+        self.emit(ADDI(9, 0, W * H),     f"{f'addi  x9, x0, {W * H}':<23}# x9 = {W * H} (pixel count)")
+        self.emit(ADDI(1, 0, 0),         "addi  x1, x0, 0        # x1 = 0 (zero-fill counter)")
+
+        # --- Zero-fill output region (border pixels get 0) ---
+        zero_loop = self.here()
+        self.emit(SLLI(3, 1, 2),         "slli  x3, x1, 2        # ZERO_LOOP: offset = counter*4")
+        self.emit(ADD(3, 3, 8),          "add   x3, x3, x8       # addr = output_base + offset")
+        self.emit(SW(0, 3, 0),           "sw    x0, 0(x3)        # output[i] = 0")
+        self.emit(ADDI(1, 1, 1),         "addi  x1, x1, 1        # counter++")
+        off = zero_loop - self.here()
+        self.emit(BLT(1, 9, off),       f"blt   x1, x9, {off:<9d}# if counter<{W * H}, loop (->0x{zero_loop:02X})")
+
+        # --- Main processing loops ---
+        self.emit(ADDI(1, 0, 1),         "addi  x1, x0, 1        # row = 1")
+        row_loop = self.here()
+        self.emit(ADDI(2, 0, 1),         "addi  x2, x0, 1        # ROW_LOOP: col = 1")
+
+        # COL_LOOP — compute base addr of pixel(row-1, col-1)
+        col_loop = self.here()
+        self.emit(ADDI(20, 1, -1),       "addi  x20, x1, -1      # COL_LOOP: x20 = row-1")
+        self.emit_mul(20, 20, W, f"(row-1)*{W}")
+        self.emit(ADDI(21, 2, -1),       "addi  x21, x2, -1      # x21 = col-1")
+        self.emit(ADD(20, 20, 21),      f"add   x20, x20, x21    # x20 = (row-1)*{W}+(col-1)")
+        self.emit(SLLI(20, 20, 2),       "slli  x20, x20, 2      # x20 = byte addr of top-left")
+
+        # Load 3x3 neighborhood into x10-x18
+        for r, name in enumerate(("r-1", "r  ", "r+1")):
+            for c, cname in enumerate(("c-1", "c  ", "c+1")):
+                off_b = r * self.row + 4 * c
+                note = f"  (+{r * W}*4)" if r and not c else ""
+                self.emit(LW(10 + 3 * r + c, 20, off_b),
+                          f"{f'lw    x{10 + 3 * r + c}, {off_b}(x20)':<23}# pix[{name}][{cname}]{note}")
+
+        # Fire custom ReRAM Sobel accelerator
+        self.emit(CUSTOM_RERAM,           ".word 0x00B5098B       # CUSTOM: rd=x19 rs1=x10 rs2=x11 op=0001011")
+
+        # Compute output address = output base + (row*W+col)*4
+        self.emit_mul(23, 1, W, f"row*{W}")
+        self.emit(ADD(23, 23, 2),       f"add   x23, x23, x2     # x23 = row*{W}+col")
+        self.emit(SLLI(23, 23, 2),       "slli  x23, x23, 2      # x23 = byte offset")
+        self.emit(ADD(23, 23, 8),        "add   x23, x23, x8     # x23 = output addr")
+        self.emit(SW(19, 23, 0),         "sw    x19, 0(x23)      # store Sobel result")
+
+        # Col loop: col++, branch back to COL_LOOP
+        self.emit(ADDI(2, 2, 1),         "addi  x2, x2, 1        # col++")
+        off = col_loop - self.here()
+        self.emit(BLT(2, 6, off),       f"blt   x2, x6, {off:<9d}# if col<{W - 1}, loop (->0x{col_loop:02X})")
+        col_len = (self.here() - col_loop) // 4
+
+        # Row loop: row++, branch back to ROW_LOOP
+        self.emit(ADDI(1, 1, 1),         "addi  x1, x1, 1        # row++")
+        off = row_loop - self.here()
+        self.emit(BLT(1, row_bound, off),
+                  f"{f'blt   x1, x{row_bound}, {off}':<23}# if row<{H - 1}, loop (->0x{row_loop:02X})")
+
+        # --- Completion marker: 0xDEADBEEF at 0x1FFC ---
+        self.emit(LUI(9, 2),             "lui   x9, 2            # x9 = 0x2000")
+        self.emit(ADDI(9, 9, -4),        "addi  x9, x9, -4       # x9 = 0x1FFC")
+        # 0xDEADBEEF: upper20=0xDEADC (compensate for sign-ext), lower12=-273
+        self.emit(LUI(10, 0xDEADC),      "lui   x10, 0xDEADC     # x10 = 0xDEADC000")
+        self.emit(ADDI(10, 10, -273),    "addi  x10, x10, -273   # x10 = 0xDEADBEEF")
+        self.emit(SW(10, 9, 0),          "sw    x10, 0(x9)       # mem[0x1FFC] = 0xDEADBEEF")
+
+        # --- Infinite loop ---
+        self.emit(JAL(0, 0),             "jal   x0, 0            # infinite loop (halt)")
+        return col_len, 1
+
+    def window_rows(self):
+        """Order of the three window rows in a block of loads.
+
+        HazardUnit compares the raw instr[24:20] field of the instruction behind
+        a load, which for another load is imm[4:0]. When row % 32 == 12 the
+        "lw x13, self.row(x20)" / "lw x14, self.row(x20)" that follows a load of x12
+        would stall, so the middle row is loaded last (2*row % 32 is never 12).
+        """
+        return (0, 2, 1) if self.row % 32 == 12 else (0, 1, 2)
+
+    def emit_zero_fill(self):
+        """Init x8/x9 and zero the output region, 4 words per iteration."""
+        if self.partial:
+            self.emit_zero_rows()
+            return
+        # A frame of n words is cleared as ceil(n/4) blocks that end at 0x2000;
+        # the few words below the output base fall in the gap above the input
+        # (check_frame guarantees 2 frames fit, so the gap is at least 3 words
+        # whenever n is not a multiple of 4)
+        start = -(-self.frame // 16) * 16
+
+        # --- Initialization ---
+        self.emit_li(8, self.out_base, "output base")
+        self.emit(LUI(9, 2),         "lui   x9, 2            # x9 = 0x2000 (output end)")
+        self.emit(ADDI(3, 8, self.frame - start),
+                  f"{f'addi  x3, x8, {self.frame - start}':<23}# x3 = zero-fill pointer")
+
+        # --- Zero-fill output region ---
+        zero_loop = self.here()
+        self.emit(SW(0, 3, 0),       "sw    x0, 0(x3)        # ZERO_LOOP: output[i] = 0")
+        self.emit(SW(0, 3, 4),       "sw    x0, 4(x3)        # output[i+1] = 0")
+        self.emit(SW(0, 3, 8),       "sw    x0, 8(x3)        # output[i+2] = 0")
+        self.emit(SW(0, 3, 12),      "sw    x0, 12(x3)       # output[i+3] = 0")
+        self.emit(ADDI(3, 3, 16),    "addi  x3, x3, 16       # pointer += 4 words")
+        off = zero_loop - self.here()
+        self.emit(BLT(3, 9, off),   f"blt   x3, x9, {off:<9d}# if ptr<0x2000, loop (->0x{zero_loop:02X})")
+
+    def emit_zero_rows(self):
+        """Init x8/x9 and zero output rows first_row..end_row-1 only.
+
+        The other rows belong to other harts and may already hold results, so
+        the loop steps by the largest of 4/2/1 words that divides the range
+        instead of rounding it up."""
+        words = (self.end_row - self.first_row) * self.row // 4
+        unroll = next(u for u in (4, 2, 1) if words % u == 0)
+
+        # --- Initialization ---
+        self.emit_li(8, self.out_base, "output base")
+        self.emit(LUI(9, 2),         "lui   x9, 2            # x9 = 0x2000 (output end)")
+        self.emit_addr(3, self.out_base + self.first_row * self.row, f"&out[{self.first_row}][0] (zero-fill pointer)")
+        self.emit_addr(4, self.out_base + self.end_row * self.row, f"&out[{self.end_row}][0] (zero-fill end)", (0, 9, 8))
+
+        # --- Zero-fill output rows ---
+        zero_loop = self.here()
+        for k in range(unroll):
+            label = "ZERO_LOOP: " if k == 0 else ""
+            self.emit(SW(0, 3, 4 * k), f"{f'sw    x0, {4 * k}(x3)':<23}# {label}output[i+{k}] = 0")
+        self.emit(ADDI(3, 3, 4 * unroll),
+                  f"{f'addi  x3, x3, {4 * unroll}':<23}# pointer += {unroll} words")
+        off = zero_loop - self.here()
+        self.emit(BLT(3, 4, off),   f"blt   x3, x4, {off:<9d}# if ptr<end, loop (->0x{zero_loop:02X})")
+
+    def emit_marker(self):
+        """0xDEADBEEF at 0x1FFC (x9 = 0x2000), then halt."""
+        if self.end_row < self.height:
+            # Not the last hart: the marker would end the simulation early
+            self.emit(JAL(0, 0),     "jal   x0, 0            # infinite loop (halt)")
+            return
+        # --- Completion marker: 0xDEADBEEF at 0x1FFC ---
+        # 0xDEADBEEF: upper20=0xDEADC (compensate for sign-ext), lower12=-273
+        self.emit(LUI(10, 0xDEADC),  "lui   x10, 0xDEADC     # x10 = 0xDEADC000")
+        self.emit(ADDI(10, 10, -273), "addi  x10, x10, -273   # x10 = 0xDEADBEEF")
+        self.emit(SW(10, 9, -4),     "sw    x10, -4(x9)      # mem[0x1FFC] = 0xDEADBEEF")
+
+        # --- Infinite loop ---
+        self.emit(JAL(0, 0),         "jal   x0, 0            # infinite loop (halt)")
+
+    def build_optimized(self):
+        # Register allocation:
+        #   x3  = zero-fill pointer (x4 = its end with --rows)
+        #   x8  = output base
+        #   x9  = 0x2000 (output end)         x10-x18 = 3x3 pixel neighborhood
+        #   x19 = Sobel result                x20 = top-left source pointer
+        #   x21 = output addr of row's last pixel
+        #   x22 = output addr of row r1's last pixel (row loop bound,
+        #         r1 = H-1 unless --rows, see interior_rows)
+        #   x23 = output pointer (incremented before each store)
+        #
+        # Scheduling rules (rtl/ClkDiv.v, see riscv_iss.py):
+        #   - HazardUnit stalls on the raw rs1/rs2 fields of the instruction
+        #     behind a load, and the stall re-fetch duplicates an instruction,
+        #     so nothing may follow a load that names its rd in those fields
+        #   - CUSTOM reads x10-x18 straight from the register file, so the
+        #     instruction ahead of it must not write a pixel register
+        #   - x19 is not forwarded from CUSTOM, so its consumer sits 2 behind
+
+        W = self.width
+
+        self.emit_zero_fill()
+
+        # --- Induction pointers for pixel (r0, 1) ---
+        r0, r1 = self.interior_rows()
+        self.emit_addr(20, (r0 - 1) * self.row, f"&pix[{r0 - 1}][0] (top-left of ({r0},1))")
+        self.emit_addr(23, self.out_base + r0 * self.row, f"&out[{r0}][1] - 4")
+        self.emit_addr(21, self.out_base + r0 * self.row + 4 * (W - 2), f"&out[{r0}][{W - 2}]")
+        self.emit_addr(22, self.out_base + r1 * self.row + 4 * (W - 2), f"&out[{r1}][{W - 2}]", (0, 9, 8))
+
+        # COL_LOOP — load 3x3 neighborhood into x10-x18
+        col_loop = self.here()
+        for r in self.window_rows():
+            name = ("r-1", "r  ", "r+1")[r]
+            for c, cname in enumerate(("c-1", "c  ", "c+1")):
+                off_b = r * self.row + 4 * c
+                label = "COL_LOOP: " if r == c == 0 else ""
+                note = f"  (+{r * W}*4)" if r and not c else ""
+                self.emit(LW(10 + 3 * r + c, 20, off_b),
+                          f"{f'lw    x{10 + 3 * r + c}, {off_b}(x20)':<23}# {label}pix[{name}][{cname}]{note}")
+        self.emit(ADDI(20, 20, 4),   "addi  x20, x20, 4      # source ptr++ (x18 written back)")
+
+        # Fire custom ReRAM Sobel accelerator
+        self.emit(CUSTOM_RERAM,      ".word 0x00B5098B       # CUSTOM: rd=x19 rs1=x10 rs2=x11 op=0001011")
+        self.emit(ADDI(23, 23, 4),   "addi  x23, x23, 4      # output ptr++ (x19 written back)")
+        self.emit(SW(19, 23, 0),     "sw    x19, 0(x23)      # store Sobel result")
+        off = col_loop - self.here()
+        self.emit(BLT(23, 21, off), f"blt   x23, x21, {off:<7d}# if not row end, loop (->0x{col_loop:02X})")
+        col_len = (self.here() - col_loop) // 4
+
+        # Row loop: step over the two border columns, branch back to COL_LOOP
+        self.emit(ADDI(20, 20, 8),   "addi  x20, x20, 8      # source ptr -> next row, col 0")
+        self.emit(ADDI(23, 23, 8),   "addi  x23, x23, 8      # output ptr -> next row, col 1 - 4")
+        self.emit(ADDI(21, 21, self.row), f"{f'addi  x21, x21, {self.row}':<23}# next row end")
+        off = col_loop - self.here()
+        self.emit(BLT(21, 22, off), f"blt   x21, x22, {off:<7d}# if row<{r1}, loop (->0x{col_loop:02X})")
+
+        self.emit_marker()
+        return col_len, 1
+
+    def build_rotate(self):
+        # Register allocation as build_optimized, except:
+        #   x20 = &pix[r-1][c-1] of the first pixel of a COL_LOOP iteration
+        #   x21 = &out[r][W-1] (column loop bound)
+        #   x22 = &out[r1][W-1] (row loop bound, see interior_rows)
+        #   x23 = &out[r][c] of the first pixel of a COL_LOOP iteration
+        #
+        # Adjacent windows share two columns: each pixel shifts x11,x12 /
+        # x14,x15 / x17,x18 left into x10,x11 / x13,x14 / x16,x17 and loads only
+        # the new right column into x12 / x15 / x18, so x10-x18 keep the
+        # p00..p22 layout that CUSTOM reads over pixel_regs. The column loop is
+        # unrolled by the largest factor up to ROTATE_UNROLL that divides the
+        # W-2 interior columns; the previous pixel's store fills the slot
+        # between the last load and CUSTOM (same rules as build_optimized).
+        # 3 is skipped: "addi x20, x20, 12" behind "lw x12" reads as rs2 = x12.
+        W = self.width
+        unroll = max(u for u in range(1, ROTATE_UNROLL + 1)
+                     if (W - 2) % u == 0 and u != 3)
+        step = 4 * unroll
+
+        self.emit_zero_fill()
+
+        # --- Pointers for row r0 ---
+        r0, r1 = self.interior_rows()
+        self.emit_addr(20, (r0 - 1) * self.row, f"&pix[{r0 - 1}][0]")
+        self.emit_addr(23, self.out_base + r0 * self.row + 4, f"&out[{r0}][1]")
+        self.emit_addr(21, self.out_base + (r0 + 1) * self.row - 4, f"&out[{r0}][{W - 1}]")
+        self.emit_addr(22, self.out_base + (r1 + 1) * self.row - 4, f"&out[{r1}][{W - 1}]", (0, 9, 8))
+
+        # ROW_LOOP — columns 0 and 1 become x11,x12 / x14,x15 / x17,x18
+        row_loop = self.here()
+        for r in self.window_rows():
+            name = ("r-1", "r  ", "r+1")[r]
+            for c in range(2):
+                label = "ROW_LOOP: " if r == c == 0 else ""
+                self.emit(LW(11 + 3 * r + c, 20, r * self.row + 4 * c),
+                          f"{f'lw    x{11 + 3 * r + c}, {r * self.row + 4 * c}(x20)':<23}# {label}pix[{name}][{c}]")
+
+        # COL_LOOP — unroll pixels per iteration
+        col_loop = self.here()
+        for k in range(unroll):
+            # x20 is bumped in pixel 0's slot, so later loads are rebased
+            base = 4 * k - (step if k else 0)
+            label = "COL_LOOP: " if k == 0 else ""
+            self.emit(ADDI(10, 11, 0),  f"addi  x10, x11, 0      # {label}p00 <- p01  (pixel +{k})")
+            self.emit(ADDI(11, 12, 0),   "addi  x11, x12, 0      # p01 <- p02")
+            self.emit(ADDI(13, 14, 0),   "addi  x13, x14, 0      # p10 <- p11")
+            self.emit(ADDI(14, 15, 0),   "addi  x14, x15, 0      # p11 <- p12")
+            self.emit(ADDI(16, 17, 0),   "addi  x16, x17, 0      # p20 <- p21")
+            self.emit(ADDI(17, 18, 0),   "addi  x17, x18, 0      # p21 <- p22")
+            self.emit(LW(15, 20, base + self.row + 8),
+                      f"lw    x15, {f'{base + self.row + 8}(x20)':<12}# p12 = pix[r  ][c+{k + 1}]")
+            self.emit(LW(18, 20, base + 2 * self.row + 8),
+                      f"lw    x18, {f'{base + 2 * self.row + 8}(x20)':<12}# p22 = pix[r+1][c+{k + 1}]")
+            self.emit(LW(12, 20, base + 8),
+                      f"lw    x12, {f'{base + 8}(x20)':<12}# p02 = pix[r-1][c+{k + 1}]")
+            if k == 0:
+                self.emit(ADDI(20, 20, step),
+                          f"addi  x20, x20, {step:<7d}# source ptr += {unroll} px")
+            else:
+                self.emit(SW(19, 23, 4 * (k - 1)),
+                          f"sw    x19, {f'{4 * (k - 1)}(x23)':<12}# store pixel +{k - 1}")
+            self.emit(CUSTOM_RERAM,      ".word 0x00B5098B       # CUSTOM: rd=x19 rs1=x10 rs2=x11 op=0001011")
+        self.emit(ADDI(23, 23, step),   f"addi  x23, x23, {step:<7d}# output ptr += {unroll} px")
+        self.emit(SW(19, 23, -4),        "sw    x19, -4(x23)     # store last pixel")
+        off = col_loop - self.here()
+        self.emit(BLT(23, 21, off),     f"blt   x23, x21, {off:<7d}# if not row end, loop (->0x{col_loop:02X})")
+        col_len = (self.here() - col_loop) // 4
+
+        # Row loop: step over the two border columns, branch back to ROW_LOOP
+        self.emit(ADDI(20, 20, 8),   "addi  x20, x20, 8      # source ptr -> next row, col 0")
+        self.emit(ADDI(23, 23, 8),   "addi  x23, x23, 8      # output ptr -> next row, col 1")
+        self.emit(ADDI(21, 21, self.row), f"{f'addi  x21, x21, {self.row}':<23}# next row end")
+        off = row_loop - self.here()
+        self.emit(BLT(21, 22, off), f"blt   x21, x22, {off:<7d}# if row<{r1}, loop (->0x{row_loop:02X})")
+
+        self.emit_marker()
+        return col_len, unroll
+
+    def build_packed(self):
+        # Frame of W x H pixels, PACK per word: pixel (r, c) is byte c % 4 of
+        # word r * W/4 + c / 4 from DataMem 0 and from the output base alike,
+        # so one image row is W bytes.
+        #
+        # Register allocation:
+        #   x3, x4  = zero-fill pointers (rows 0 and H-1)
+        #   x8  = output base                 x9  = 0x2000 (output end)
+        #   x10-x18 = 3x3 neighborhood; only bits [7:0] reach pixel_regs, so a
+        #             register holding a word shifted right by 8*k is pixel k
+        #   x19 = Sobel result                x20 = &pix[r-1][word]
+        #   x21 = &out[r+1][0] (column loop bound)
+        #   x22 = &out[H-1][0] (row loop bound)
+        #   x23 = &out[r][word]               x24 = packed output word
+        #   x25 = shifted Sobel result
+        #
+        # Per pixel the window slides as in build_rotate, but the new right
+        # column is "srli x12, x11, 8" of the word that just moved into x11;
+        # only when it crosses into the next word (pixel 2 of 4) is it loaded.
+        # Column 0 and W-1 are computed from a partial window and cleared per
+        # row after the column loop. Same scheduling rules as build_optimized.
+        W, H = self.width, self.height
+        row = self.row                   # bytes per image row
+        # words cleared per row and ZERO_LOOP iteration
+        zero_words = max(u for u in (1, 2, 4) if (W // PACK) % u == 0)
+
+        # --- Initialization: zero rows 0 and H-1 of the output ---
+        self.emit_li(8, self.out_base, "output base")
+        self.emit(LUI(9, 2),         "lui   x9, 2            # x9 = 0x2000 (output end)")
+        self.emit(ADDI(3, 8, 0),     "addi  x3, x8, 0        # x3 = &out[0][0]")
+        self.emit(ADDI(4, 9, -row),  f"addi  x4, x9, {-row:<9d}# x4 = &out[{H - 1}][0]")
+        zero_loop = self.here()
+        for k in range(zero_words):
+            label = "ZERO_LOOP: " if k == 0 else ""
+            self.emit(SW(0, 3, 4 * k), f"sw    x0, {f'{4 * k}(x3)':<12}# {label}out[0][{PACK * k}..{PACK * k + 3}] = 0")
+            self.emit(SW(0, 4, 4 * k), f"sw    x0, {f'{4 * k}(x4)':<12}# out[{H - 1}][{PACK * k}..{PACK * k + 3}] = 0")
+        self.emit(ADDI(3, 3, 4 * zero_words),
+                  f"{f'addi  x3, x3, {4 * zero_words}':<23}# pointers += {zero_words} words")
+        self.emit(ADDI(4, 4, 4 * zero_words), f"addi  x4, x4, {4 * zero_words}")
+        off = zero_loop - self.here()
+        self.emit(BLT(4, 9, off),   f"blt   x4, x9, {off:<9d}# if ptr<0x2000, loop (->0x{zero_loop:02X})")
+
+        # --- Pointers for row 1 ---
+        self.emit(ADDI(20, 0, 0),    "addi  x20, x0, 0       # x20 = &pix[0][0]")
+        self.emit(ADDI(23, 8, row),  f"addi  x23, x8, {row:<8d}# x23 = &out[1][0]")
+        self.emit(ADDI(22, 9, -row), f"addi  x22, x9, {-row:<8d}# x22 = &out[{H - 1}][0]")
+
+        # ROW_LOOP — word 0 of the three rows: x11/x14/x17 = column 0,
+        # x12/x15/x18 = column 1 (x10/x13/x16 = column -1 only feed pixel 0)
+        row_loop = self.here()
+        self.emit(LW(11, 20, 0),     "lw    x11, 0(x20)      # ROW_LOOP: pix[r-1][0..3]")
+        self.emit(LW(14, 20, row),   f"lw    x14, {f'{row}(x20)':<12}# pix[r  ][0..3]")
+        self.emit(LW(17, 20, 2 * row), f"lw    x17, {f'{2 * row}(x20)':<12}# pix[r+1][0..3]")
+        self.emit(SRLI(12, 11, 8),   "srli  x12, x11, 8      # p02 = pix[r-1][1]")
+        self.emit(SRLI(15, 14, 8),   "srli  x15, x14, 8      # p12 = pix[r  ][1]")
+        self.emit(SRLI(18, 17, 8),   "srli  x18, x17, 8      # p22 = pix[r+1][1]")
+        self.emit(ADDI(21, 23, row), f"addi  x21, x23, {row:<7d}# x21 = &out[r+1][0]")
+
+        # COL_LOOP — one output word (PACK pixels) per iteration
+        col_loop = self.here()
+        for k in range(PACK):
+            label = "COL_LOOP: " if k == 0 else ""
+            self.emit(CUSTOM_RERAM, f".word 0x00B5098B       # {label}CUSTOM pixel +{k} (rd=x19)")
+            for r, name in enumerate(("r-1", "r  ", "r+1")):
+                left = 10 + 3 * r
+                self.emit(ADDI(left, left + 1, 0),     f"addi  x{left}, x{left + 1}, 0      # p{r}0 <- p{r}1")
+                self.emit(ADDI(left + 1, left + 2, 0), f"addi  x{left + 1}, x{left + 2}, 0      # p{r}1 <- p{r}2")
+                if k == PACK - 2:
+                    off_b = 4 + r * row
+                    self.emit(LW(left + 2, 20, off_b),
+                              f"lw    x{left + 2}, {f'{off_b}(x20)':<12}# p{r}2 = pix[{name}][next word]")
+                else:
+                    self.emit(SRLI(left + 2, left + 1, 8),
+                              f"srli  x{left + 2}, x{left + 1}, 8      # p{r}2 = next byte")
+            if k == 0:
+                self.emit(ADDI(24, 19, 0), "addi  x24, x19, 0      # out byte 0")
+            else:
+                self.emit(SLLI(25, 19, 8 * k), f"slli  x25, x19, {8 * k:<7d}# result << {8 * k}")
+                self.emit(OR(24, 24, 25),  f"or    x24, x24, x25    # out byte {k}")
+        self.emit(SW(24, 23, 0),     "sw    x24, 0(x23)      # store 4 output pixels")
+        self.emit(ADDI(20, 20, 4),   "addi  x20, x20, 4      # source ptr += 1 word")
+        self.emit(ADDI(23, 23, 4),   "addi  x23, x23, 4      # output ptr += 1 word")
+        off = col_loop - self.here()
+        self.emit(BLT(23, 21, off), f"blt   x23, x21, {off:<7d}# if not row end, loop (->0x{col_loop:02X})")
+        col_len = (self.here() - col_loop) // 4
+
+        # Clear the border columns 0 and W-1 of the row just written
+        self.emit(LW(24, 23, -row),  f"lw    x24, {f'{-row}(x23)':<12}# out[r][0..3]")
+        self.emit(LW(25, 23, -4),    f"lw    x25, -4(x23)     # out[r][{W - 4}..{W - 1}]")
+        self.emit(ANDI(24, 24, -256), "andi  x24, x24, -256   # column 0 = 0")
+        self.emit(SLLI(25, 25, 8),   "slli  x25, x25, 8")
+        self.emit(SRLI(25, 25, 8),   f"srli  x25, x25, 8      # column {W - 1} = 0")
+        self.emit(SW(24, 23, -row),  f"sw    x24, {f'{-row}(x23)':<12}# write back")
+        self.emit(SW(25, 23, -4),    "sw    x25, -4(x23)     # write back")
+        off = row_loop - self.here()
+        self.emit(BLT(23, 22, off), f"blt   x23, x22, {off:<7d}# if row<{H - 1}, loop (->0x{row_loop:02X})")
+
+        self.emit_marker()
+        return col_len, PACK
+
+    def build_custom(self):
+        # Sliding window for the custom_ops.py instruction self.op: its
+        # sources hold a 3 x cols window (row-major) and each trigger writes
+        # px = cols-2 output pixels to its dests. Pointers as build_rotate; each
+        # COL_LOOP iteration shifts the two carried columns left, loads px new
+        # columns, fires the op and stores px results 2+ slots behind it.
+        op = self.op
+        W = self.width
+        cols, px = op["cols"], op["pixels"]
+        if (W - 2) % px:
+            raise ValueError(f"{op['name']} computes {px} pixels per trigger, "
+                             f"{W - 2} interior columns are not a multiple")
+        win = [op["sources"][r * cols:(r + 1) * cols] for r in range(3)]
+        step = 4 * px
+        names = ("r-1", "r  ", "r+1")
+
+        self.emit_zero_fill()
+
+        # --- Pointers for row r0 ---
+        r0, r1 = self.interior_rows()
+        self.emit_addr(20, (r0 - 1) * self.row, f"&pix[{r0 - 1}][0]")
+        self.emit_addr(23, self.out_base + r0 * self.row + 4, f"&out[{r0}][1]")
+        self.emit_addr(21, self.out_base + (r0 + 1) * self.row - 4, f"&out[{r0}][{W - 1}]")
+        self.emit_addr(22, self.out_base + (r1 + 1) * self.row - 4, f"&out[{r1}][{W - 1}]", (0, 9, 8))
+
+        # ROW_LOOP — columns 0 and 1 become the carried columns px, px+1
+        row_loop = self.here()
+        loads = [(win[r][px + c], r * self.row + 4 * c, f"pix[{names[r]}][{c}]")
+                 for r in range(3) for c in range(2)]
+        for i, (rd, off_b, note) in enumerate(order_loads(loads, win[0][px])):
+            label = "ROW_LOOP: " if i == 0 else ""
+            self.emit(LW(rd, 20, off_b), f"{f'lw    x{rd}, {off_b}(x20)':<23}# {label}{note}")
+
+        # COL_LOOP — shift, load px new columns, trigger, store px pixels
+        col_loop = self.here()
+        for r in range(3):
+            for c in range(2):
+                label = "COL_LOOP: " if r == c == 0 else ""
+                self.emit(ADDI(win[r][c], win[r][px + c], 0),
+                          f"{f'addi  x{win[r][c]}, x{win[r][px + c]}, 0':<23}# {label}w{r}{c} <- w{r}{px + c}")
+        loads = [(win[r][2 + j], r * self.row + 4 * (2 + j), f"w{r}{2 + j} = pix[{names[r]}][c+{j + 1}]")
+                 for r in range(3) for j in range(px)]
+        for rd, off_b, note in order_loads(loads, step & 0x1F):
+            self.emit(LW(rd, 20, off_b), f"{f'lw    x{rd}, {off_b}(x20)':<23}# {note}")
+        self.emit(ADDI(20, 20, step),   f"addi  x20, x20, {step:<7d}# source ptr += {px} px")
+        self.emit(custom_ops.encode(op),
+                  f".word 0x{custom_ops.encode(op):08X}       # CUSTOM {op['name']}: "
+                  f"{'/'.join(f'x{r}' for r in op['dests'])}")
+        self.emit(ADDI(23, 23, step),   f"addi  x23, x23, {step:<7d}# output ptr += {px} px")
+        for j, rd in enumerate(op["dests"]):
+            self.emit(SW(rd, 23, 4 * j - step),
+                      f"sw    x{rd}, {f'{4 * j - step}(x23)':<12}# store pixel +{j}")
+        off = col_loop - self.here()
+        self.emit(BLT(23, 21, off),     f"blt   x23, x21, {off:<7d}# if not row end, loop (->0x{col_loop:02X})")
+        col_len = (self.here() - col_loop) // 4
+
+        # Row loop: step over the two border columns, branch back to ROW_LOOP
+        self.emit(ADDI(20, 20, 8),   "addi  x20, x20, 8      # source ptr -> next row, col 0")
+        self.emit(ADDI(23, 23, 8),   "addi  x23, x23, 8      # output ptr -> next row, col 1")
+        self.emit(ADDI(21, 21, self.row), f"{f'addi  x21, x21, {self.row}':<23}# next row end")
+        off = row_loop - self.here()
+        self.emit(BLT(21, 22, off), f"blt   x21, x22, {off:<7d}# if row<{r1}, loop (->0x{row_loop:02X})")
+
+        self.emit_marker()
+        return col_len, px
+
+
+    def assemble(self):
+        """Emit and verify the program, padded to IMEM_WORDS with NOPs.
+
+        Raises ValueError for a frame, size or (except stock) schedule the
+        pipeline cannot run; stock hazards are kept in self.issues."""
+        size = f"{self.width}x{self.height} frame"
+        frame_errors = self.check_frame()
+        if frame_errors:
+            raise ValueError(f"{size}: " + "; ".join(frame_errors))
+        builders = {"packed": self.build_packed, "rotate": self.build_rotate,
+                    "optimize": self.build_optimized, "stock": self.build_stock,
+                    "custom": self.build_custom}
+        try:
+            self.col_loop_len, self.col_loop_px = builders[self.mode]()
+        except ValueError as e:
+            raise ValueError(f"{size}: {e}") from None
+        self.length = len(self.words)
+        if self.length > IMEM_WORDS:
+            raise ValueError(f"Program does not fit InstrMem ({self.length} > "
+                             f"{IMEM_WORDS} words)")
+
+        # Verify critical encodings
+        if self.mode == "stock" and (self.width, self.height) == (32, 32):
+            assert self.words[25] == 0x00B5098B, \
+                f"Custom instr mismatch: {self.words[25]:08X}"
+        if self.mode == "custom":
+            assert self.words.count(custom_ops.encode(self.op)) * \
+                self.op["pixels"] == self.col_loop_px, "Unexpected CUSTOM count"
+        else:
+            assert self.words.count(CUSTOM_RERAM) == self.col_loop_px, \
+                "Unexpected CUSTOM count"
+
+        # Verify the schedule against the pipeline's unresolved hazards
+        self.issues = check_schedule(self.words)
+        if self.mode != "stock" and self.issues:
+            raise ValueError(f"{self.mode} schedule has hazards at "
+                             f"{self.width}x{self.height}: " + "; ".join(self.issues))
+
+        # Pad to 256 with NOP
+        self.words += [NOP()] * (IMEM_WORDS - self.length)
+        return self
+
+    def listing(self):
+        """Lines of sobel_program.s for the assembled program."""
+        pixels = self.width * self.height
+        in_range  = f"0x000-0x{self.frame - 4:03X}"
+        out_range = f"0x{self.out_base:03X}-0x{DMEM_BYTES - 4:03X}"
+        lines = ["# ============================================================",
+                 "# sobel_program.s — RISC-V Sobel Edge Detection for ReRAM",
+                 f"# {self.width}x{self.height} image, custom opcode 0001011 for ReRAM accelerator"]
+        if self.mode == "packed":
+            lines += [f"# Input:  DataMem {in_range:<14}({pixels} pixels, 4 per 32-bit word)",
+                      f"# Output: DataMem {out_range:<14}({pixels} edge pixels, 4 per word)"]
+        else:
+            lines += [f"# Input:  DataMem {in_range:<14}({pixels} pixels, 8-bit in 32-bit words)",
+                      f"# Output: DataMem {out_range:<14}({pixels} edge pixels)"]
+        if self.partial:
+            lines.append(f"# Hart rows: output rows {self.first_row}-{self.end_row - 1} of {self.height}"
+                         f"{', completion marker at 0x1FFC' if self.end_row == self.height else ', no marker'}")
+        else:
+            lines.append("# Completion marker: 0xDEADBEEF at 0x1FFC")
+        if self.mode == "custom":
+            lines.append(f"# Schedule: --custom {self.custom_name} (custom_ops.py, "
+                         f"{self.op['pixels']} px per trigger, hazard-free)")
+        elif self.mode != "stock":
+            lines.append(f"# Schedule: --{self.mode} (induction pointers, hazard-free)")
+        lines += ["# ============================================================", ""]
+        lines += self.asm_lines
+        lines += ["", f"# Remaining {IMEM_WORDS - len(self.asm_lines)} slots: NOP (0x00000013)"]
+        return lines
+
+def order_loads(loads, last_not):
+    """Order (rd, offset, comment) loads so that no load is followed by one
+    whose raw rs2 field (offset[4:0]) names its rd, and the last rd is not
+    last_not (the rs2 field of the instruction after the block)."""
+    def place(done, rest):
+        if not rest:
+            return done if done[-1][0] != last_not else None
+        for i, load in enumerate(rest):
+            if not done or done[-1][0] != load[1] & 0x1F:
+                found = place(done + [load], rest[:i] + rest[i + 1:])
+                if found:
+                    return found
+        return None
+    found = place([], list(loads))
+    if found is None:
+        raise ValueError("no hazard-free order for the window loads")
+    return found
+
+def check_schedule(program):
+    """Adjacent-instruction hazards the pipeline does not resolve."""
+    issues = []
+    for i in range(len(program) - 1):
+        prev, nxt = program[i], program[i + 1]
+        prev_op, prev_rd = prev & 0x7F, (prev >> 7) & 0x1F
+        nxt_op = nxt & 0x7F
+        rs1, rs2 = (nxt >> 15) & 0x1F, (nxt >> 20) & 0x1F
+        addr = (i + 1) * 4
+        # Custom ops (custom_ops.py) read their sources over pixel_regs and
+        # their dests are not forwarded; CUSTOM_RERAM is x10-x18 -> x19
+        writes = (custom_ops.lookup(prev)["dests"] if prev_op == OP_CUSTOM else
+                  (prev_rd,) if prev_op in WRITES_RD and prev_rd else ())
+        if prev_op == OP_LOAD and prev_rd and prev_rd in (rs1, rs2):
+            issues.append(f"0x{addr:03X}: load-use stall on x{prev_rd}")
+        if nxt_op == OP_CUSTOM:
+            for reg in writes:
+                if reg in custom_ops.lookup(nxt)["sources"]:
+                    issues.append(f"0x{addr:03X}: CUSTOM reads x{reg} before "
+                                  f"it is written back")
+        if prev_op == OP_CUSTOM and nxt_op not in (OP_LUI, OP_JAL):
+            for reg in writes:
+                if rs1 == reg or (rs2 == reg and nxt_op in RS2_READERS):
+                    issues.append(f"0x{addr:03X}: x{reg} used directly behind "
+                                  f"CUSTOM (ReRAM result is not forwarded)")
+    return issues
+
+def build(mode="stock", width=None, height=None, rows=None, custom=None):
+    """InstrMem words (NOP-padded to 256) and sobel_program.s lines of one
+    program; rows is (A, B) as --rows A:B, custom an op name for mode
+    "custom". Writes nothing; raises ValueError instead of exiting."""
+    program = Program(mode, width, height, rows, custom).assemble()
+    return program.words, program.listing()
+
+def row_range(text):
+    try:
+        first, end = (int(v) for v in text.split(":"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("takes A:B (output rows A to B-1)")
+    return first, end
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="RISC-V Sobel program.mem generator")
+    schedule = parser.add_mutually_exclusive_group()
+    for mode in ("optimize", "rotate", "packed"):
+        schedule.add_argument(f"--{mode}", dest="mode", action="store_const",
+                              const=mode)
+    schedule.add_argument("--custom", metavar="NAME",
+                          help="custom_ops.py instruction "
+                               f"(default {custom_ops.DEFAULT_OP})",
+                          nargs="?", const=custom_ops.DEFAULT_OP)
+    parser.add_argument("--width", type=int, metavar="W", default=None)
+    parser.add_argument("--height", type=int, metavar="H", default=None)
+    parser.add_argument("--rows", type=row_range, metavar="A:B", default=None)
+    parser.add_argument("--out-dir", metavar="DIR", default=MEM_DIR,
+                        help="directory for program.mem and sobel_program.s "
+                             "(default: mem/)")
+    args = parser.parse_args()
+
+    mode = "custom" if args.custom else args.mode or "stock"
+    try:
+        program = Program(mode, args.width, args.height, args.rows,
+                          args.custom).assemble()
+    except ValueError as e:
+        sys.exit(f"[ERROR] {e}")
+
+    # ====== Output ======
+    print(f"[INFO] Frame {program.width}x{program.height}: input "
+          f"0x000-0x{program.frame - 4:03X}, "
+          f"output 0x{program.out_base:03X}-0x{DMEM_BYTES - 4:03X}")
+    print(f"[INFO] Program: {program.length} instructions "
+          f"({mode}, COL_LOOP {program.col_loop_len} for "
+          f"{program.col_loop_px} px)")
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    program_path = os.path.join(args.out_dir, "program.mem")
+    with open(program_path, "w") as f:
+        for instr in program.words:
+            f.write(f"{instr:08X}\n")
+    print(f"[OK]   Written {program_path} (256 lines)")
+
+    asm_path = os.path.join(args.out_dir, "sobel_program.s")
+    with open(asm_path, "w") as f:
+        f.write("\n".join(program.listing()) + "\n")
+    print(f"[OK]   Written {asm_path} ({program.length} instructions)")
+
+    # Verify 0xDEADBEEF construction
+    lui_val = (0xDEADC << 12) & 0xFFFFFFFF  # 0xDEADC000
+    addi_val = (-273) & 0xFFFFFFFF           # 0xFFFFFEEF
+    result = (lui_val + addi_val) & 0xFFFFFFFF
+    assert result == 0xDEADBEEF, f"DEADBEEF mismatch: {result:08X}"
+    print("[OK]   Encoding verification passed")
+
+    for issue in program.issues:
+        print(f"[WARN] {issue}")
+    if not program.issues:
+        print("[OK]   Schedule verification passed")
+
+if __name__ == "__main__":
+    main()
@@ -3,46 +3,84 @@
 generate_test_image.py
 Creates a recognizable 32x32 grayscale test image with bold geometric shapes
 that produce clear, impressive edge detection results.
+
+corpus() derives a fixed, deterministic set of 32x32 frames from it (plus a
+few synthetic patterns) for benchmarks/run_benchmarks.py.
 """
-from PIL import Image, ImageDraw
+from PIL import Image, ImageDraw, ImageOps
 import os
+import random
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
 
-img = Image.new('L', (32, 32), 0)  # Black background
-draw = ImageDraw.Draw(img)
+def draw_house():
+    img = Image.new('L', (32, 32), 0)  # Black background
+    draw = ImageDraw.Draw(img)
+
+    # Large bright rectangle (house body) — strong vertical & horizontal edges
+    draw.rectangle([4, 10, 27, 28], fill=180)
+
+    # Roof triangle — strong diagonal edges
+    draw.polygon([(2, 10), (15, 2), (29, 10)], fill=220)
 
-# Large bright rectangle (house body) — strong vertical & horizontal edges
-draw.rectangle([4, 10, 27, 28], fill=180)
+    # Door — inner rectangle creates nested edges
+    draw.rectangle([12, 18, 19, 28], fill=60)
 
-# Roof triangle — strong diagonal edges
-draw.polygon([(2, 10), (15, 2), (29, 10)], fill=220)
+    # Window 1 — bright square on dark body
+    draw.rectangle([6, 13, 10, 17], fill=255)
 
-# Door — inner rectangle creates nested edges
-draw.rectangle([12, 18, 19, 28], fill=60)
+    # Window 2
+    draw.rectangle([21, 13, 25, 17], fill=255)
 
-# Window 1 — bright square on dark body
-draw.rectangle([6, 13, 10, 17], fill=255)
+    # Chimney
+    draw.rectangle([22, 2, 25, 8], fill=200)
 
-# Window 2
-draw.rectangle([21, 13, 25, 17], fill=255)
+    # Ground line
+    draw.line([(0, 29), (31, 29)], fill=120, width=1)
 
-# Chimney
-draw.rectangle([22, 2, 25, 8], fill=200)
+    # Sun (small circle in top-left)
+    draw.ellipse([1, 1, 6, 6], fill=255)
+    return img
 
-# Ground line
-draw.line([(0, 29), (31, 29)], fill=120, width=1)
+def corpus(seed=0):
+    """[(name, 32x32 'L' image)] — same pixels on every call."""
+    house = draw_house()
+    rng = random.Random(seed)
+    noise = Image.new('L', (32, 32))
+    noise.putdata([rng.randrange(256) for _ in range(32 * 32)])
+    checker = Image.new('L', (32, 32))
+    checker.putdata([255 * (((x // 4) + (y // 4)) % 2)
+                     for y in range(32) for x in range(32)])
+    gradient = Image.new('L', (32, 32))
+    gradient.putdata([(x + y) * 4 for y in range(32) for x in range(32)])
+    return [
+        ("house",          house),
+        ("house_inverted", ImageOps.invert(house)),
+        ("house_mirrored", ImageOps.mirror(house)),
+        ("blank",          Image.new('L', (32, 32), 0)),
+        ("gradient",       gradient),
+        ("checker",        checker),
+        ("noise",          noise),
+    ]
 
-# Sun (small circle in top-left)
-draw.ellipse([1, 1, 6, 6], fill=255)
+def write_corpus(out_dir, seed=0):
+    """Save corpus() as <out_dir>/<name>.png; returns the paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for name, img in corpus(seed):
+        paths.append(os.path.join(out_dir, f"{name}.png"))
+        img.save(paths[-1])
+    return paths
 
-output_path = os.path.join(PROJECT_ROOT, "test_data", "test_image.png")
-img.save(output_path)
-print(f"[OK] Saved 32x32 test image → {output_path}")
+if __name__ == "__main__":
+    img = draw_house()
+    output_path = os.path.join(PROJECT_ROOT, "test_data", "test_image.png")
+    img.save(output_path)
+    print(f"[OK] Saved 32x32 test image → {output_path}")
 
-# Also save a preview upscaled version
-img_preview = img.resize((512, 512), Image.NEAREST)
-preview_path = os.path.join(PROJECT_ROOT, "test_data", "test_image_preview.png")
-img_preview.save(preview_path)
-print(f"[OK] Saved 512x512 preview → {preview_path}")
+    # Also save a preview upscaled version
+    img_preview = img.resize((512, 512), Image.NEAREST)
+    preview_path = os.path.join(PROJECT_ROOT, "test_data", "test_image_preview.png")
+    img_preview.save(preview_path)
+    print(f"[OK] Saved 512x512 preview → {preview_path}")
@@ -3,43 +3,153 @@
 img_to_mem.py
 Converts any PNG/JPG image → 32x32 grayscale → image.mem
 Each line is a 32-bit zero-padded hex value (e.g., 000000FF for pixel=255).
-Usage: python img_to_mem.py <input_image> [output.mem]
+An output path ending in .bin writes the raw little-endian word array instead
+(see mem_codec.py).
+
+Tiling mode keeps the full resolution instead of resizing: the grayscale image
+is cut into 32x32 tiles that overlap by the 1-pixel Sobel halo (stride 30),
+one image.mem per tile directory plus a tiles.json layout file that
+mem_to_img.py --stitch uses to reassemble the valid 30x30 interiors.
+
+Stack mode converts many images into one (N, 1024) .bin that
+sobel_golden.py and mem_codec.py can memory-map.
+
+--width/--height resize to another frame size instead, for a program from
+generate_program_mem.py --width/--height (at most 1024 pixels).
+
+--packed resizes to 64x64 instead and stores 4 pixels per word (pixel x % 4
+in byte x % 4), for generate_program_mem.py --packed (at most 4096 pixels
+with --width/--height).
+
+Usage: python img_to_mem.py <input_image> [output.mem | output.bin] [--packed]
+                            [--width W] [--height H]
+       python img_to_mem.py <input_image> --tile <tiles_dir>
+       python img_to_mem.py --stack <frames.bin> <image> [<image> ...]
+                            [--width W] [--height H]
 """
 
 import sys
 import os
+import json
 
 try:
-    from PIL import Image
+    import numpy as np
 except ImportError:
-    sys.exit("[ERROR] Pillow not installed. Run: pip install Pillow")
+    sys.exit("[ERROR] NumPy not installed. Run: pip install numpy")
 
-def img_to_mem(input_path, output_path="image.mem"):
+from mem_codec import pack_pixels, pop_frame_args, write_memh, write_bin
+from visor import image_to_pixels, pil_image, pixels_to_words
+
+TILE   = 32             # DataMem holds one 32x32 frame
+HALO   = 1              # Sobel 3x3 needs one neighbour on each side
+STRIDE = TILE - 2 * HALO
+
+def write_pixels(pixels, output_path, packed=False):
+    """Pixels (list, bytes or array) → one 32-bit word each (4 per word when
+    packed), .mem or .bin."""
+    if isinstance(pixels, (bytes, bytearray)):
+        pixels = np.frombuffer(pixels, dtype=np.uint8)
+    words = pixels_to_words(pixels, packed)
+    if output_path.endswith(".bin"):
+        write_bin(output_path, words)
+    else:
+        # 32-bit zero-padded hex — lower 8 bits = pixel intensity
+        write_memh(output_path, words, upper=True)
+
+def img_to_mem(input_path, output_path="image.mem", packed=False,
+               width=None, height=None):
     if not os.path.exists(input_path):
         sys.exit(f"[ERROR] File not found: {input_path}")
 
     print(f"[INFO] Loading image: {input_path}")
-    img = Image.open(input_path)
+    # Grayscale (0–255), resized to 32x32 (64x64 packed) by default
+    pixels = image_to_pixels(input_path, width, height, packed).ravel()
+
+    write_pixels(pixels, output_path, packed)
 
-    # Convert to grayscale and resize to 32x32
-    img = img.convert("L")              # Grayscale (0–255)
-    img = img.resize((32, 32), Image.LANCZOS)
+    print(f"[OK]   Written {len(pixels)} pixels to '{output_path}'"
+          + (f" ({len(pixels) // 4} packed words)" if packed else ""))
+    sample = pack_pixels(pixels[:20]) if packed else pixels[:5]
+    print(f"       Sample (first 5): {[f'{p:08X}' for p in sample]}")
+
+def imgs_to_stack(input_paths, output_path, width=32, height=32):
+    """Many images → one stacked .bin of width x height frames, frame i = image i."""
+    stack = np.zeros((len(input_paths), width * height), dtype=np.uint32)
+    for i, path in enumerate(input_paths):
+        if not os.path.exists(path):
+            sys.exit(f"[ERROR] File not found: {path}")
+        stack[i] = image_to_pixels(path, width, height).ravel()
+    write_bin(output_path, stack)
+    print(f"[OK]   Written {len(input_paths)} frames to '{output_path}'")
+
+def tile_grid(width, height):
+    """Tile origins (y, x) so the 30x30 interiors cover rows/cols 1..N-2."""
+    rows = max(1, -(-(height - 2 * HALO) // STRIDE))
+    cols = max(1, -(-(width - 2 * HALO) // STRIDE))
+    return rows, cols
+
+def iter_tiles(img):
+    """Yield (row, col, y, x, tile) with tiles zero-padded past the image."""
+    rows, cols = tile_grid(*img.size)
+    for r in range(rows):
+        for c in range(cols):
+            y, x = r * STRIDE, c * STRIDE
+            # crop() zero-fills outside the source image
+            yield r, c, y, x, img.crop((x, y, x + TILE, y + TILE))
+
+def write_layout(tiles_dir, input_path, size, tiles):
+    """tiles.json: everything mem_to_img.py --stitch needs to reassemble."""
+    width, height = size
+    rows, cols = tile_grid(width, height)
+    with open(os.path.join(tiles_dir, "tiles.json"), "w") as f:
+        json.dump({"source": os.path.abspath(input_path),
+                   "width": width, "height": height,
+                   "tile": TILE, "halo": HALO, "stride": STRIDE,
+                   "rows": rows, "cols": cols, "tiles": tiles}, f, indent=1)
+
+def img_to_tiles(input_path, tiles_dir):
+    if not os.path.exists(input_path):
+        sys.exit(f"[ERROR] File not found: {input_path}")
+
+    print(f"[INFO] Loading image: {input_path}")
+    img = pil_image().open(input_path).convert("L")
+    width, height = img.size
+    rows, cols = tile_grid(width, height)
+    os.makedirs(tiles_dir, exist_ok=True)
 
-    pixels = list(img.getdata())        # Flat list of 1024 pixel values
-    assert len(pixels) == 1024, f"Expected 1024 pixels, got {len(pixels)}"
+    tiles = []
+    for r, c, y, x, tile in iter_tiles(img):
+        name = f"tile_{r:03d}_{c:03d}"
+        os.makedirs(os.path.join(tiles_dir, name), exist_ok=True)
+        write_pixels(tile.tobytes(), os.path.join(tiles_dir, name, "image.mem"))
+        tiles.append({"row": r, "col": c, "y": y, "x": x, "dir": name})
 
-    with open(output_path, "w") as f:
-        for px in pixels:
-            # 32-bit zero-padded hex — lower 8 bits = pixel intensity
-            f.write(f"{px:08X}\n")
+    write_layout(tiles_dir, input_path, img.size, tiles)
 
-    print(f"[OK]   Written {len(pixels)} pixels to '{output_path}'")
-    print(f"       Sample (first 5): {[f'{p:08X}' for p in pixels[:5]]}")
+    print(f"[OK]   Written {len(tiles)} tiles ({rows}x{cols}, "
+          f"{width}x{height} px) to '{tiles_dir}'")
+    return tiles
 
 if __name__ == "__main__":
+    packed = "--packed" in sys.argv[1:]
+    if packed:
+        sys.argv.remove("--packed")
+    width, height = pop_frame_args(sys.argv, packed)
     if len(sys.argv) < 2:
-        print("Usage: python img_to_mem.py <input_image> [output.mem]")
+        print("Usage: python img_to_mem.py <input_image> [output.mem] [--packed]")
+        print("       python img_to_mem.py <input_image> --tile <tiles_dir>")
+        print("       python img_to_mem.py --stack <frames.bin> <image> [...]")
         sys.exit(1)
+    if sys.argv[1] == "--stack":
+        if len(sys.argv) < 4:
+            sys.exit("[ERROR] --stack needs an output .bin and at least one image")
+        imgs_to_stack(sys.argv[3:], sys.argv[2], width, height)
+        sys.exit(0)
     input_path  = sys.argv[1]
+    if len(sys.argv) > 2 and sys.argv[2] == "--tile":
+        if len(sys.argv) < 4:
+            sys.exit("[ERROR] --tile needs an output directory")
+        img_to_tiles(input_path, sys.argv[3])
+        sys.exit(0)
     output_path = sys.argv[2] if len(sys.argv) > 2 else "image.mem"
-    img_to_mem(input_path, output_path)
+    img_to_mem(input_path, output_path, packed, width, height)
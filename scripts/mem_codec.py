@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+mem_codec.py
+Whole-file NumPy codec for the $readmemh / $writememh text format used by
+image.mem, output_image.mem and program.mem, plus a raw binary sidecar.
+
+Text (.mem), parsed the way $readmemh does:
+    - whitespace-separated hex words, '_' separators, x/z digits read as 0
+    - '//' and '/* */' comments
+    - '@addr' markers (hex word address) move the load address
+    - words past depth are dropped; words never written stay 0
+Words are decoded as one uint8 lookup over the file's bytes; only the '@'
+segments are visited in Python.
+
+Binary (.bin): the dense word array as raw little-endian uint32, no header.
+A .bin of N*depth words is N stacked frames and is memory-mapped on read, so
+large batches can be sliced without loading them.
+
+Packed layout (img_to_mem.py --packed): 4 pixels per word, pixel x % 4 in
+byte x % 4 (little-endian), so the 1024-word input region holds a 64x64
+frame; pack_pixels / unpack_pixels convert between the two views.
+
+Frames other than 32x32 (--width/--height, see generate_program_mem.py)
+start at word 0 of image.mem but end at the last word of output_image.mem,
+where the completion marker lives; output_frame() cuts them out.
+
+Usage: python mem_codec.py tobin <in.mem> [<in.mem> ...] [-o stack.bin]
+                                 [--depth N]
+       python mem_codec.py tomem <in.bin> <out.mem> [--depth N] [--frame K]
+                                 [--upper]
+Without -o, tobin writes a <name>.bin sidecar next to each input.
+"""
+
+import sys
+import os
+import re
+import argparse
+
+try:
+    import numpy as np
+except ImportError:
+    sys.exit("[ERROR] NumPy not installed. Run: pip install numpy")
+
+FRAME_WORDS = 1024          # one 32x32 image.mem / output_image.mem
+WORD_DIGITS = 8             # 32-bit words
+PACK        = 4             # pixels per word in the packed layout
+PACKED_WIDTH = 64           # packed frame: 64x64 pixels = FRAME_WORDS words
+
+COMMENT_RE = re.compile(rb"//[^\n]*|/\*.*?\*/", re.S)
+ADDR_RE    = re.compile(rb"@([0-9A-Fa-f_]+)")
+
+# ASCII → nibble; 0xFF marks a byte that is not a hex digit
+_NIBBLE = np.full(256, 0xFF, dtype=np.uint8)
+_NIBBLE[np.frombuffer(b"0123456789", np.uint8)] = np.arange(10)
+_NIBBLE[np.frombuffer(b"abcdef", np.uint8)] = np.arange(10, 16)
+_NIBBLE[np.frombuffer(b"ABCDEF", np.uint8)] = np.arange(10, 16)
+_NIBBLE[np.frombuffer(b"xXzZ", np.uint8)] = 0
+_NIBBLE[0] = 0                                  # padding of short tokens
+_SHIFTS = np.arange(4 * (WORD_DIGITS - 1), -1, -4, dtype=np.uint32)
+_DIGITS = {False: np.frombuffer(b"0123456789abcdef", np.uint8),
+           True:  np.frombuffer(b"0123456789ABCDEF", np.uint8)}
+
+def decode_words(tokens):
+    """Hex tokens (list of bytes) → uint32 array, one vectorized pass."""
+    if not tokens:
+        return np.zeros(0, dtype=np.uint32)
+    arr = np.array(tokens)
+    width = arr.dtype.itemsize
+    if width > WORD_DIGITS:
+        long = next(t for t in tokens if len(t) > WORD_DIGITS)
+        raise ValueError(f"word wider than 32 bits: {long.decode(errors='replace')}")
+    chars = arr.view(np.uint8).reshape(len(tokens), width)
+    nib = _NIBBLE[chars]
+    bad = (nib == 0xFF).any(axis=1)
+    if bad.any():
+        tok = tokens[int(np.argmax(bad))]
+        raise ValueError(f"not a hex word: {tok.decode(errors='replace')}")
+    # Right-align short tokens: NUL padding sits at the end of each row
+    lengths = (chars != 0).sum(axis=1)
+    shift = 4 * (lengths[:, None] - 1 - np.arange(width))
+    words = (nib.astype(np.uint64) << np.maximum(shift, 0).astype(np.uint64))
+    return (words * (shift >= 0)).sum(axis=1).astype(np.uint32)
+
+def decode_memh(data):
+    """$readmemh text → (addresses, words) in file order."""
+    if b"/" in data:
+        data = COMMENT_RE.sub(b" ", data)
+    parts = ADDR_RE.split(data.replace(b"_", b""))
+    addrs, words, base = [], [], 0
+    for i in range(0, len(parts), 2):
+        if i:
+            base = int(parts[i - 1], 16)
+        seg = decode_words(parts[i].split())
+        addrs.append(np.arange(base, base + len(seg), dtype=np.int64))
+        words.append(seg)
+        base += len(seg)
+    return np.concatenate(addrs), np.concatenate(words)
+
+def read_memh(path, depth=None, stats=False):
+    """Dense word array of a $readmemh file (depth defaults to its extent).
+
+    With stats=True also returns {"words", "defined", "dropped"}: data words
+    in the file, distinct addresses filled below depth, and words dropped
+    because their address is >= depth."""
+    if not os.path.exists(path):
+        sys.exit(f"[ERROR] File not found: '{path}'")
+    with open(path, "rb") as f:
+        addrs, words = decode_memh(f.read())
+    if depth is None:
+        depth = int(addrs.max()) + 1 if len(addrs) else 0
+    keep = addrs < depth
+    mem = np.zeros(depth, dtype=np.uint32)
+    mem[addrs[keep]] = words[keep]              # later writes win, as in $readmemh
+    if not stats:
+        return mem
+    return mem, {"words": len(words),
+                 "defined": len(np.unique(addrs[keep])),
+                 "dropped": int(np.count_nonzero(~keep))}
+
+def encode_memh(words, upper=False):
+    """uint32 words → $writememh text (8 hex digits per line) as bytes."""
+    words = np.asarray(words, dtype=np.uint32).ravel()
+    out = np.empty((len(words), WORD_DIGITS + 1), dtype=np.uint8)
+    out[:, :WORD_DIGITS] = _DIGITS[upper][(words[:, None] >> _SHIFTS) & 0xF]
+    out[:, WORD_DIGITS] = ord("\n")
+    return out.tobytes()
+
+def write_memh(path, words, upper=False, addr=None):
+    """$writememh of words; addr emits a leading '@addr' marker."""
+    with open(path, "wb") as f:
+        if addr is not None:
+            f.write(f"@{addr:x}\n".encode())
+        f.write(encode_memh(words, upper))
+
+def frame_words(width, height, packed=False):
+    """Words of one width x height frame (input or output region)."""
+    return width * height // PACK if packed else width * height
+
+def output_frame(words, width, height, packed=False):
+    """The frame in a FRAME_WORDS output_image.mem dump (aligned to its end)."""
+    return words[..., FRAME_WORDS - frame_words(width, height, packed):]
+
+def pop_frame_args(argv, packed=False):
+    """Remove --width/--height N from argv; (width, height), checked to fit."""
+    size = {"--width": None, "--height": None}
+    for flag in size:
+        if flag in argv:
+            i = argv.index(flag)
+            if i + 1 >= len(argv):
+                sys.exit(f"[ERROR] {flag} needs a value")
+            size[flag] = int(argv.pop(i + 1))
+            argv.pop(i)
+    default = PACKED_WIDTH if packed else 32
+    width  = size["--width"] or default
+    height = size["--height"] or default
+    if packed and width % PACK:
+        sys.exit(f"[ERROR] Packed width must be a multiple of {PACK}")
+    if frame_words(width, height, packed) > FRAME_WORDS:
+        sys.exit(f"[ERROR] {width}x{height} needs "
+                 f"{frame_words(width, height, packed)} words, a frame "
+                 f"region holds {FRAME_WORDS}")
+    return width, height
+
+def pack_pixels(pixels):
+    """(..., n) 8-bit pixels → (..., n/4) words, pixel i in byte i % 4."""
+    if isinstance(pixels, (bytes, bytearray)):
+        pixels = np.frombuffer(pixels, dtype=np.uint8)
+    pixels = np.ascontiguousarray(pixels, dtype=np.uint8)
+    return pixels.view("<u4").astype(np.uint32)
+
+def unpack_pixels(words):
+    """Inverse of pack_pixels: (..., n) words → (..., 4n) pixels."""
+    return np.ascontiguousarray(words, dtype="<u4").view(np.uint8)
+
+def sidecar_path(path):
+    return os.path.splitext(path)[0] + ".bin"
+
+def write_bin(path, words):
+    """Raw little-endian uint32 (a 2-D array is written frame after frame)."""
+    np.ascontiguousarray(words, dtype="<u4").tofile(path)
+
+def read_bin(path, depth=None):
+    """Memory-mapped words of a .bin; (frames, depth) when depth is given."""
+    if not os.path.exists(path):
+        sys.exit(f"[ERROR] File not found: '{path}'")
+    if os.path.getsize(path) == 0:
+        return np.zeros((0, depth) if depth else 0, dtype="<u4")
+    mem = np.memmap(path, dtype="<u4", mode="r")
+    if depth is None:
+        return mem
+    if len(mem) % depth:
+        sys.exit(f"[ERROR] '{path}' holds {len(mem)} words, "
+                 f"not a multiple of {depth}")
+    return mem.reshape(-1, depth)
+
+def load_words(path, depth=FRAME_WORDS):
+    """One frame of depth words from a .mem file or a single-frame .bin."""
+    if path.endswith(".bin"):
+        frames = read_bin(path, depth)
+        if len(frames) != 1:
+            sys.exit(f"[ERROR] '{path}' holds {len(frames)} frames, expected 1")
+        return np.array(frames[0])
+    return read_memh(path, depth)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="$readmemh/$writememh codec and binary sidecars")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_bin = sub.add_parser("tobin", help=".mem → .bin sidecar(s) or one stack")
+    p_bin.add_argument("mems", nargs="+")
+    p_bin.add_argument("-o", "--output", help="stack every input into one .bin")
+    p_bin.add_argument("--depth", type=int, default=FRAME_WORDS)
+
+    p_mem = sub.add_parser("tomem", help=".bin frame → .mem")
+    p_mem.add_argument("bin")
+    p_mem.add_argument("mem")
+    p_mem.add_argument("--depth", type=int, default=FRAME_WORDS)
+    p_mem.add_argument("--frame", type=int, default=0)
+    p_mem.add_argument("--upper", action="store_true",
+                       help="upper-case hex, as img_to_mem.py writes")
+    args = parser.parse_args()
+
+    if args.cmd == "tobin":
+        if args.output:
+            stack = np.empty((len(args.mems), args.depth), dtype="<u4")
+            for i, path in enumerate(args.mems):
+                stack[i] = read_memh(path, args.depth)
+            write_bin(args.output, stack)
+            print(f"[OK]   {len(args.mems)} frames x {args.depth} words → "
+                  f"'{args.output}'")
+        else:
+            for path in args.mems:
+                write_bin(sidecar_path(path), read_memh(path, args.depth))
+            print(f"[OK]   Wrote {len(args.mems)} .bin sidecars")
+    else:
+        frames = read_bin(args.bin, args.depth)
+        if not 0 <= args.frame < len(frames):
+            sys.exit(f"[ERROR] '{args.bin}' has {len(frames)} frames")
+        write_memh(args.mem, frames[args.frame], upper=args.upper)
+        print(f"[OK]   Frame {args.frame} of '{args.bin}' → '{args.mem}'")
+
+if __name__ == "__main__":
+    main()
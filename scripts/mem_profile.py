@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+mem_profile.py
+DataMem access-pattern profiler and line-buffer / cache sizing model.
+
+The address stream is the EX/WB alu value of every CYC record with mem_r
+or mem_w set, taken from a tb_RISCV_Pipeline trace (simulate.log or a
+trace_store.py store) or from a pipeline_model.py run of any program.mem.
+Reported per stream:
+    reuse     - LRU stack distance of every load (distinct words touched
+                since the previous load of the same word), as a log2
+                histogram plus the hit rate of a fully-associative LRU
+                buffer of 2^k words
+    regions   - loads, stores, distinct words and bandwidth (bytes per
+                pipeline cycle) of the input frame, output frame, completion
+                marker and anything else
+    buffers   - hit rates of candidate structures in front of DataMem:
+                  rows=K        line buffer of the K most recently read input
+                                rows (word-valid bits, LRU by row; loads
+                                outside the input frame bypass it)
+                  S:L:W         set-associative cache of S words, L-word
+                                lines, W ways, LRU; loads allocate, stores
+                                write through without allocating
+                and the projected savings of each
+
+Savings model: a load that hits skips its DataMem read, so the port-read
+count drops by the hits; a miss fetches its word (line buffer) or its line
+as one wide read (cache). --penalty is the extra cycles a DataMem read
+costs over a buffer hit. The current DataMem answers in the WB cycle, so
+with the stock RTL only port traffic changes; the cycle projection applies
+to a registered-output BRAM or a shared port (see multihart_model.py), for
+which the default is 1. Storage is given in RAMB18 (18 Kb) tiles and
+compared with the free tiles in reports/utilization_impl.txt when present.
+
+Usage: python mem_profile.py [trace] [--program program.mem] [--image image.mem]
+                             [--width W] [--height H] [--packed]
+                             [--rows 2,3,4] [--caches 32:4:1,64:4:2,...]
+                             [--penalty N] [--json out.json]
+Without a trace, the program is run through pipeline_model.py (the access
+pattern does not depend on the pixel values, so a missing image reads as 0).
+"""
+
+import sys
+import os
+import json
+import argparse
+from collections import OrderedDict
+
+try:
+    import numpy as np
+except ImportError:
+    sys.exit("[ERROR] NumPy not installed. Run: pip install numpy")
+
+import trace_store
+from riscv_iss import DMEM_WORDS, MARKER_ADDR
+
+SCRIPT_DIR   = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+UTIL_REPORT  = os.path.join(PROJECT_ROOT, "reports", "utilization_impl.txt")
+
+RAMB18_BITS  = 18 * 1024
+DEFAULT_ROWS   = "2,3,4"
+DEFAULT_CACHES = "16:4:1,32:4:2,64:4:2,64:8:4,128:8:4,256:16:4"
+
+# ====== Address stream ======
+
+def trace_stream(trace):
+    """(word address, is_store) arrays of a trace's DataMem accesses, plus
+    the number of cycles the trace spans."""
+    mem_r = np.asarray(trace["mem_r"]) == 1
+    mem_w = np.asarray(trace["mem_w"]) == 1
+    rows = np.flatnonzero(mem_r | mem_w)
+    addr = (np.asarray(trace["alu"])[rows] >> 2) & (DMEM_WORDS - 1)
+    return addr.astype(np.int64), mem_w[rows], len(trace["cycle"])
+
+def run_stream(program_path, image_path):
+    """trace_stream of a pipeline_model.py run of program.mem."""
+    import riscv_iss
+    import pipeline_model
+
+    program = riscv_iss.read_mem(program_path, riscv_iss.IMEM_WORDS)
+    if image_path and os.path.exists(image_path):
+        dmem = riscv_iss.read_mem(image_path, DMEM_WORDS)
+    else:
+        dmem = [0] * DMEM_WORDS
+    columns = trace_store.new_columns()
+    stats = pipeline_model.run(program, dmem, columns=columns)
+    if not stats["halted"]:
+        print("[WARN] Program did not reach the completion marker; "
+              "profiling the cycles that ran")
+    return trace_stream(columns)
+
+def frame_regions(width, height, packed=False):
+    """[(name, lo, hi)] word ranges of the DataMem frame layout."""
+    frame = (width * height) // 4 if packed else width * height
+    out_base = DMEM_WORDS - frame
+    marker = MARKER_ADDR >> 2
+    return [("input", 0, frame), ("output", out_base, marker),
+            ("marker", marker, marker + 1)]
+
+# ====== Reuse distance ======
+
+def reuse_distances(addrs):
+    """LRU stack distance of each access (-1 for the first touch).
+
+    A Fenwick tree marks the latest access time of every address, so the
+    distance is the number of marks between the previous and this access."""
+    n = len(addrs)
+    tree = [0] * (n + 1)
+    last = {}
+    out = np.empty(n, dtype=np.int64)
+
+    def add(i, delta):
+        i += 1
+        while i <= n:
+            tree[i] += delta
+            i += i & -i
+
+    def prefix(i):                  # marks at times < i
+        total = 0
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    for t, a in enumerate(addrs.tolist()):
+        p = last.get(a)
+        if p is None:
+            out[t] = -1
+        else:
+            out[t] = prefix(t) - prefix(p + 1)
+            add(p, -1)
+        add(t, 1)
+        last[a] = t
+    return out
+
+def reuse_histogram(dist):
+    """{"cold": n, "0": n, "1": n, "2-3": n, ...} of stack distances."""
+    hist = {"cold": int(np.count_nonzero(dist < 0))}
+    warm = dist[dist >= 0]
+    if not len(warm):
+        return hist
+    # Bin 0 holds distance 0, bin b >= 1 distances 2^(b-1) .. 2^b - 1
+    bins = np.bincount([int(d).bit_length() for d in warm.tolist()])
+    for b, count in enumerate(bins.tolist()):
+        lo, hi = (0, 0) if b == 0 else (1 << (b - 1), (1 << b) - 1)
+        hist[str(lo) if lo == hi else f"{lo}-{hi}"] = count
+    return hist
+
+# ====== Buffer models ======
+
+def simulate_line_buffer(addrs, stores, rows, row_words, input_words):
+    """Load hits of a K-row line buffer over the input frame."""
+    lines = OrderedDict()           # row -> set of valid word offsets
+    hits = 0
+    for a, st in zip(addrs.tolist(), stores.tolist()):
+        if a >= input_words:
+            continue
+        row, col = divmod(a, row_words)
+        valid = lines.get(row)
+        if st:                      # write-through, no allocate
+            if valid is not None:
+                valid.add(col)
+            continue
+        if valid is not None:
+            lines.move_to_end(row)
+            if col in valid:
+                hits += 1
+                continue
+            valid.add(col)
+        else:
+            if len(lines) >= rows:
+                lines.popitem(last=False)
+            lines[row] = {col}
+    return hits
+
+def simulate_cache(addrs, stores, size, line, ways):
+    """Load hits of a set-associative LRU cache (write-through, no allocate)."""
+    sets = size // (line * ways)
+    tags = [OrderedDict() for _ in range(sets)]
+    hits = 0
+    for a, st in zip(addrs.tolist(), stores.tolist()):
+        block = a // line
+        entry = tags[block % sets]
+        if block in entry:
+            entry.move_to_end(block)
+            hits += not st
+        elif not st:
+            if len(entry) >= ways:
+                entry.popitem(last=False)
+            entry[block] = True
+    return hits
+
+def parse_cache(text):
+    try:
+        size, line, ways = (int(v) for v in text.split(":"))
+    except ValueError:
+        sys.exit(f"[ERROR] Cache '{text}' is not SIZE:LINE:WAYS (words)")
+    if min(size, line, ways) < 1 or size % (line * ways):
+        sys.exit(f"[ERROR] Cache '{text}': size must be a multiple of "
+                 f"line x ways")
+    return size, line, ways
+
+def ramb18_tiles(data_bits, tag_bits=0):
+    return -(-(data_bits + tag_bits) // RAMB18_BITS)
+
+def free_ramb18():
+    """Free RAMB18 tiles in the implementation report, or None."""
+    if not os.path.exists(UTIL_REPORT):
+        return None
+    import vivado_reports
+
+    util = vivado_reports.parse_utilization(UTIL_REPORT)
+    if "ramb18" not in util or util["ramb18"]["available"] is None:
+        return None
+    return int(util["ramb18"]["available"] - (util["ramb18"]["used"] or 0))
+
+# ====== Report ======
+
+def profile(addrs, stores, span, args):
+    loads = ~stores
+    load_addrs = addrs[loads]
+    dist = reuse_distances(load_addrs)
+    warm = dist[dist >= 0]
+    n_loads = len(load_addrs)
+    capacity = [1 << k for k in range(0, 12)]
+    fa_hits = {c: int(np.count_nonzero(warm < c)) for c in capacity}
+
+    regions = []
+    covered = np.zeros(len(addrs), dtype=bool)
+    for name, lo, hi in frame_regions(args.width, args.height, args.packed):
+        inside = (addrs >= lo) & (addrs < hi)
+        covered |= inside
+        regions.append((name, inside))
+    regions.append(("other", ~covered))
+    region_stats = []
+    for name, inside in regions:
+        r, w = int(np.count_nonzero(inside & loads)), \
+            int(np.count_nonzero(inside & stores))
+        region_stats.append({
+            "region": name, "loads": r, "stores": w,
+            "distinct_words": int(len(np.unique(addrs[inside]))),
+            "bytes_per_cycle": round(4 * (r + w) / max(span, 1), 4),
+            "share": round((r + w) / max(len(addrs), 1), 4)})
+
+    row_words = args.width // 4 if args.packed else args.width
+    input_words = frame_regions(args.width, args.height, args.packed)[0][2]
+    configs = []
+    for rows in args.rows:
+        hits = simulate_line_buffer(addrs, stores, rows, row_words, input_words)
+        configs.append({"config": f"rows={rows}", "hits": hits,
+                        "ramb18": ramb18_tiles(rows * row_words * 32)})
+    for size, line, ways in args.caches:
+        hits = simulate_cache(addrs, stores, size, line, ways)
+        sets = size // (line * ways)
+        # tag + valid bit per line
+        tag_bits = (size // line) * (DMEM_WORDS // (line * sets)).bit_length()
+        configs.append({"config": f"{size}:{line}:{ways}", "hits": hits,
+                        "ramb18": ramb18_tiles(size * 32, tag_bits)})
+    for cfg in configs:
+        cfg["hit_rate"] = round(cfg["hits"] / max(n_loads, 1), 4)
+        cfg["port_reads"] = n_loads - cfg["hits"]
+        cfg["cycles_saved"] = cfg["hits"] * args.penalty
+        cfg["saved_pct"] = round(100 * cfg["cycles_saved"] / max(span, 1), 2)
+
+    return {"cycles": span, "loads": n_loads,
+            "stores": int(np.count_nonzero(stores)),
+            "distinct_load_words": int(len(np.unique(load_addrs))),
+            "reuse_histogram": reuse_histogram(dist),
+            "lru_hit_rate": {str(c): round(h / max(n_loads, 1), 4)
+                             for c, h in fa_hits.items()},
+            "regions": region_stats, "penalty": args.penalty,
+            "buffers": configs}
+
+def print_report(result, free):
+    loads = max(result["loads"], 1)
+    print(f"[OK]   {result['cycles']} cycles, {result['loads']} loads "
+          f"({result['distinct_load_words']} distinct words), "
+          f"{result['stores']} stores")
+
+    print("\n  Reuse distance (loads)      count    share")
+    for key, count in result["reuse_histogram"].items():
+        print(f"    {key:<24} {count:>7} {count / loads:>8.1%}")
+    print("\n  Fully-associative LRU words  hit rate")
+    for cap, rate in result["lru_hit_rate"].items():
+        print(f"    {cap:>24} {rate:>9.1%}")
+
+    print(f"\n  {'region':<8} {'loads':>7} {'stores':>7} {'words':>7} "
+          f"{'B/cycle':>8} {'share':>7}")
+    for r in result["regions"]:
+        print(f"  {r['region']:<8} {r['loads']:>7} {r['stores']:>7} "
+              f"{r['distinct_words']:>7} {r['bytes_per_cycle']:>8.3f} "
+              f"{r['share']:>7.1%}")
+
+    print(f"\n  {'buffer':<14} {'hit rate':>8} {'port reads':>10} "
+          f"{'cycles saved':>13} {'RAMB18':>7}  (penalty "
+          f"{result['penalty']} cycle/read)")
+    for cfg in result["buffers"]:
+        fits = "" if free is None else \
+            ("" if cfg["ramb18"] <= free else "  over budget")
+        print(f"  {cfg['config']:<14} {cfg['hit_rate']:>8.1%} "
+              f"{cfg['port_reads']:>10} {cfg['cycles_saved']:>7} "
+              f"({cfg['saved_pct']:>4.1f}%) {cfg['ramb18']:>7}{fits}")
+    if free is not None:
+        print(f"  Free RAMB18 tiles in {os.path.relpath(UTIL_REPORT, PROJECT_ROOT)}: {free}")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="DataMem access-pattern profile and buffer sizing")
+    parser.add_argument("trace", nargs="?",
+                        help="simulate.log or trace_store.py store")
+    parser.add_argument("--program",
+                        default=os.path.join(PROJECT_ROOT, "mem", "program.mem"),
+                        help="program run through pipeline_model.py when "
+                             "no trace is given")
+    parser.add_argument("--image",
+                        default=os.path.join(PROJECT_ROOT, "output", "image.mem"))
+    parser.add_argument("--width", type=int, default=None)
+    parser.add_argument("--height", type=int, default=None)
+    parser.add_argument("--packed", action="store_true",
+                        help="frame stored 4 pixels per word (64x64 default)")
+    parser.add_argument("--rows", default=DEFAULT_ROWS,
+                        help="line-buffer row counts (default: %(default)s)")
+    parser.add_argument("--caches", default=DEFAULT_CACHES,
+                        help="SIZE:LINE:WAYS caches in words "
+                             "(default: %(default)s)")
+    parser.add_argument("--penalty", type=int, default=1,
+                        help="extra cycles of a DataMem read over a hit "
+                             "(default: %(default)s)")
+    parser.add_argument("--json", help="write the profile as JSON")
+    args = parser.parse_args()
+    default = 64 if args.packed else 32
+    args.width = args.width or default
+    args.height = args.height or default
+    args.rows = [int(k) for k in args.rows.split(",") if k]
+    args.caches = [parse_cache(c) for c in args.caches.split(",") if c]
+    if any(k < 1 for k in args.rows):
+        sys.exit("[ERROR] --rows counts must be at least 1")
+
+    if args.trace:
+        print(f"[INFO] Trace: {args.trace}")
+        stream = trace_stream(trace_store.open_trace(args.trace))
+    else:
+        print(f"[INFO] Program: {args.program} (pipeline_model.py run)")
+        stream = run_stream(args.program, args.image)
+    result = profile(*stream, args)
+    result["source"] = args.trace or args.program
+    result["size"] = [args.width, args.height]
+    print_report(result, free_ramb18())
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"[OK]   Profile written to '{args.json}'")
+
+if __name__ == "__main__":
+    main()
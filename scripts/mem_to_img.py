@@ -3,66 +3,123 @@
 mem_to_img.py
 Reads output_image.mem (1024 lines of 32-bit hex) from Vivado simulation.
 Extracts lower 8 bits per word → reconstructs 32x32 edge-detected image.
-Usage: python mem_to_img.py [input.mem] [output.png]
+
+Stitch mode reassembles a tiled run (see img_to_mem.py --tile): only the valid
+30x30 interior of each tile's output_image.mem is pasted back, giving a
+full-resolution edge map with a zero 1-pixel border.
+
+The input may also be a single-frame .bin sidecar (see mem_codec.py).
+--packed reads 4 pixels per word (img_to_mem.py --packed) into a 64x64 image.
+--width/--height read another frame size, taken from the end of the output
+region as generate_program_mem.py lays it out.
+
+Usage: python mem_to_img.py [input.mem | input.bin] [output.png] [--packed]
+                            [--width W] [--height H]
+       python mem_to_img.py --stitch <tiles_dir> [output.png]
 """
 
 import sys
 import os
+import json
 
-try:
-    from PIL import Image
-except ImportError:
-    sys.exit("[ERROR] Pillow not installed. Run: pip install Pillow")
-
-import struct
+from mem_codec import FRAME_WORDS, load_words, read_memh, pop_frame_args
+from visor import pil_image, save_png, words_to_pixels
 
-def mem_to_img(input_path="output_image.mem", output_path="edge_detected_output.png"):
+def mem_to_img(input_path="output_image.mem", output_path="edge_detected_output.png",
+               packed=False, width=None, height=None):
     if not os.path.exists(input_path):
         sys.exit(f"[ERROR] File not found: '{input_path}'\n"
                  f"       Make sure Vivado simulation has completed and "
                  f"$writememh was called.")
 
     print(f"[INFO] Reading: {input_path}")
-    pixels = []
+    if input_path.endswith(".bin"):
+        words = load_words(input_path, FRAME_WORDS)
+    else:
+        try:
+            words, stats = read_memh(input_path, FRAME_WORDS, stats=True)
+        except ValueError as e:
+            sys.exit(f"[ERROR] {input_path}: {e}")
+        if stats["defined"] != FRAME_WORDS:
+            print(f"[WARN] Only {stats['defined']} of {FRAME_WORDS} pixel "
+                  f"addresses are written; the rest read as 0.")
+        if stats["dropped"]:
+            print(f"[WARN] {stats['dropped']} words past address "
+                  f"{FRAME_WORDS - 1} ignored.")
+    # Lower 8 bits = intensity (4 pixels per word packed); 32x32 / 64x64
+    # by default
+    frame = words_to_pixels(words, width, height, packed)
+    height, width = frame.shape
+    pixels = frame.ravel().tolist()
 
-    with open(input_path, "r") as f:
-        for lineno, line in enumerate(f, 1):
-            line = line.strip()
-            if not line or line.startswith("//") or line.startswith("@"):
-                # Skip blank lines, comments, and $readmemh address markers
-                continue
-            try:
-                word = int(line, 16)        # Parse 32-bit hex word
-                px   = word & 0xFF          # Extract lower 8 bits = pixel intensity
-                pixels.append(px)
-            except ValueError:
-                print(f"[WARN] Skipping unparseable line {lineno}: '{line}'")
+    # Scale up for visibility (32x32 is tiny) and keep the raw size too
+    save_png(frame, output_path)
+    scale = max(1, 512 // max(width, height))
+    large = (width * scale, height * scale)
 
-    if len(pixels) != 1024:
-        print(f"[WARN] Expected 1024 pixels, got {len(pixels)}. "
-              f"Image may be incomplete.")
-        # Pad with zeros if short, truncate if too long
-        pixels = (pixels + [0] * 1024)[:1024]
+    print(f"[OK]   Saved edge image ({large[0]}x{large[1]}) → 'C:\\Users\\hridd\\VISOR'")
+    print(f"[OK]   Saved raw {width}x{height} image      → 'C:\\Users\\hridd\\VISOR'")
+    print(f"       Non-zero pixels (edges detected): "
+          f"{sum(1 for p in pixels if p > 0)} / {len(pixels)}")
+    print(f"       Max intensity: {max(pixels)}  |  Mean: {sum(pixels)/len(pixels):.1f}")
 
-    # Reconstruct 32x32 image
-    img = Image.new("L", (32, 32))
-    img.putdata(pixels)
+def read_pixels(input_path, count=1024):
+    """Low bytes of the first count words of a .mem/.bin file (no warnings)."""
+    return (load_words(input_path, count) & 0xFF).tolist()
 
-    # Scale up for visibility (32x32 is tiny) — save both sizes
-    img_large = img.resize((512, 512), Image.NEAREST)   # Crisp pixel-art upscale
-    img_large.save(output_path)
+def paste_tile(canvas, pixels, y, x, tile=32, halo=1):
+    """Paste the valid interior of one tile output at tile origin (y, x)."""
+    width, height = canvas.size
+    tile_img = pil_image().new("L", (tile, tile))
+    tile_img.putdata(pixels)
+    # Interior rows/cols [halo, tile-halo) map to image y+halo.., clipped so
+    # the image's own outer border stays 0
+    right  = min(tile - halo, width - 1 - x)
+    bottom = min(tile - halo, height - 1 - y)
+    if right > halo and bottom > halo:
+        canvas.paste(tile_img.crop((halo, halo, right, bottom)),
+                     (x + halo, y + halo))
 
-    # Also save a raw 32x32 version
-    raw_path = output_path.replace(".png", "_32x32.png")
-    img.save(raw_path)
+def stitch_tiles(tiles_dir, output_path="edge_detected_output.png"):
+    layout_path = os.path.join(tiles_dir, "tiles.json")
+    if not os.path.exists(layout_path):
+        sys.exit(f"[ERROR] File not found: '{layout_path}'\n"
+                 f"       Run img_to_mem.py --tile first.")
+    with open(layout_path) as f:
+        layout = json.load(f)
 
-    print(f"[OK]   Saved edge image (512x512) → 'C:\\Users\\hridd\\VISOR'")
-    print(f"[OK]   Saved raw 32x32 image      → 'C:\\Users\\hridd\\VISOR'")
+    canvas = pil_image().new("L", (layout["width"], layout["height"]))
+    missing = 0
+    for t in layout["tiles"]:
+        mem_path = os.path.join(tiles_dir, t["dir"], "output_image.mem")
+        if not os.path.exists(mem_path):
+            missing += 1
+            continue
+        paste_tile(canvas, read_pixels(mem_path, layout["tile"] ** 2),
+                   t["y"], t["x"], layout["tile"], layout["halo"])
+
+    if missing:
+        print(f"[WARN] {missing} of {len(layout['tiles'])} tiles have no "
+              f"output_image.mem; those regions are left black.")
+    canvas.save(output_path)
+    hist = canvas.histogram()
+    print(f"[OK]   Stitched {len(layout['tiles']) - missing} tiles → "
+          f"'{output_path}' ({layout['width']}x{layout['height']})")
     print(f"       Non-zero pixels (edges detected): "
-          f"{sum(1 for p in pixels if p > 0)} / 1024")
-    print(f"       Max intensity: {max(pixels)}  |  Mean: {sum(pixels)/len(pixels):.1f}")
+          f"{layout['width'] * layout['height'] - hist[0]} / "
+          f"{layout['width'] * layout['height']}")
 
 if __name__ == "__main__":
+    packed = "--packed" in sys.argv[1:]
+    if packed:
+        sys.argv.remove("--packed")
+    width, height = pop_frame_args(sys.argv, packed)
+    if len(sys.argv) > 1 and sys.argv[1] == "--stitch":
+        if len(sys.argv) < 3:
+            sys.exit("[ERROR] --stitch needs the tiles directory")
+        stitch_tiles(sys.argv[2],
+                     sys.argv[3] if len(sys.argv) > 3 else "edge_detected_output.png")
+        sys.exit(0)
     input_path  = sys.argv[1] if len(sys.argv) > 1 else "output_image.mem"
     output_path = sys.argv[2] if len(sys.argv) > 2 else "edge_detected_output.png"
-    mem_to_img(input_path, output_path)
+    mem_to_img(input_path, output_path, packed, width, height)
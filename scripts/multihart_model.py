@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+multihart_model.py
+Scaling model for N copies of the VISOR pipeline sharing one DataMem.
+
+The interior rows of the frame are split into N contiguous, balanced
+ranges; hart k runs its own generate_program_mem.py --rows A:B program
+(same schedule, row range baked into its pointer registers) in a private
+InstrMem. All harts are clocked in lock-step with pipeline_model.core():
+each cycle every hart is evaluated first, then a round-robin arbiter hands
+the P DataMem ports to the harts whose EX/WB stage loads or stores, and a
+hart that gets none holds all of its registers for that cycle (a port
+wait). The frame is done when every hart has reached its halt loop.
+
+For each N and P the model reports cycles, speedup and efficiency against
+the single-core full-frame program, and checks that the merged output
+region matches the single-core run word for word.
+
+Note: the RTL DataMem has one read and one write port, which a single
+core never contends for; P counts ports shared by all harts, each load or
+store taking one.
+
+Usage: python multihart_model.py [image.mem] [--variant optimize|rotate]
+                                 [--harts 1,2,4,8] [--ports 1,2,4]
+                                 [--width W] [--height H] [--json out.json]
+                                 [--max-cycles N] [--clock-mhz F]
+Without an image.mem a seeded random frame is used.
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+
+import riscv_iss
+import pipeline_model
+import visor
+from riscv_iss import IMEM_WORDS, DMEM_WORDS
+
+SCRIPT_DIR   = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+
+def partition(height, harts):
+    """Output row ranges [(A, B), ...] of each hart, covering 0..height.
+
+    The height-2 interior rows are split as evenly as possible; the border
+    rows 0 and height-1 go to the first and last hart."""
+    interior = height - 2
+    if not 1 <= harts <= interior:
+        sys.exit(f"[ERROR] {harts} harts: a {height}-row frame has "
+                 f"{interior} interior rows to share")
+    bounds, row = [0], 1
+    for k in range(harts):
+        row += interior // harts + (k < interior % harts)
+        bounds.append(row)
+    bounds[-1] = height
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def build_program(variant, width, height, rows=None):
+    """InstrMem words of a generated program (rows=(A, B) for one hart)."""
+    try:
+        return visor.generate_program(variant, width, height, rows=rows)
+    except ValueError as e:
+        tag = f" --rows {rows[0]}:{rows[1]}" if rows else ""
+        sys.exit(f"[ERROR] --{variant}{tag}: {e}")
+
+def run_harts(programs, dmem, ports, max_cycles=pipeline_model.MAX_CYCLES):
+    """Clock one core per program against the shared dmem until all halt.
+
+    Returns (cycles, per-hart stats); cycles is -1 if max_cycles ran out."""
+    stats = [pipeline_model.new_stats() for _ in programs]
+    harts = [pipeline_model.core(p, dmem, s, stop_on_spin=True)
+             for p, s in zip(programs, stats)]
+    live, turn, cycles = list(range(len(harts))), 0, 0
+    while live:
+        if cycles >= max_cycles:
+            return -1, stats
+        # Evaluate every hart before any clock edge writes DataMem
+        wants = [k for k in live if next(harts[k])]
+        # Round-robin: the first requester at or after turn wins a port
+        wants.sort(key=lambda k: (k - turn) % len(harts))
+        granted = set(wants[:ports])
+        if granted:
+            turn = (wants[min(ports, len(wants)) - 1] + 1) % len(harts)
+        for k in list(live):
+            try:
+                harts[k].send(k in granted or k not in wants)
+            except StopIteration:
+                live.remove(k)
+        cycles += 1
+    return cycles, stats
+
+def load_image(path, width, height):
+    """DataMem image: image.mem if it exists, else a seeded random frame."""
+    if path and os.path.exists(path):
+        return riscv_iss.read_mem(path, DMEM_WORDS)
+    print(f"[WARN] '{path}' not found, using a random {width}x{height} frame")
+    rng = random.Random(0)
+    frame = [rng.randrange(256) for _ in range(width * height)]
+    return frame + [0] * (DMEM_WORDS - len(frame))
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Multi-hart scaling model with shared DataMem ports")
+    parser.add_argument("image", nargs="?",
+                        default=os.path.join(PROJECT_ROOT, "output", "image.mem"))
+    parser.add_argument("--variant", choices=("optimize", "rotate"),
+                        default="rotate")
+    parser.add_argument("--harts", default="1,2,4,8",
+                        help="comma-separated core counts (default: %(default)s)")
+    parser.add_argument("--ports", default="1,2,4",
+                        help="comma-separated DataMem port counts "
+                             "(default: %(default)s)")
+    parser.add_argument("--width", type=int, default=32)
+    parser.add_argument("--height", type=int, default=32)
+    parser.add_argument("--json", help="write the curves as JSON")
+    parser.add_argument("--max-cycles", type=int,
+                        default=pipeline_model.MAX_CYCLES)
+    parser.add_argument("--clock-mhz", type=float,
+                        default=pipeline_model.PIPELINE_CLK_HZ / 1e6,
+                        help="pipeline clock for frames/s (default: %(default)g)")
+    args = parser.parse_args()
+    harts_list = [int(n) for n in args.harts.split(",")]
+    ports_list = [int(p) for p in args.ports.split(",")]
+    if min(ports_list) < 1:
+        sys.exit("[ERROR] --ports must be at least 1")
+
+    image = load_image(args.image, args.width, args.height)
+    out_words = args.width * args.height        # output ends at the last word
+
+    # --- Single-core reference ---
+    dmem = list(image)
+    single = pipeline_model.run(
+        build_program(args.variant, args.width, args.height), dmem,
+        args.max_cycles)
+    if not single["halted"]:
+        sys.exit("[ERROR] Single-core run did not reach the completion marker")
+    reference = dmem[DMEM_WORDS - out_words:]
+    base = single["cycles"]
+    print(f"[INFO] --{args.variant} {args.width}x{args.height}: single core "
+          f"{base} cycles ({args.clock_mhz * 1e6 / base:.1f} frames/s at "
+          f"{args.clock_mhz:g} MHz)")
+
+    # --- N harts x P ports ---
+    print(f"{'harts':>5} {'ports':>5} {'cycles':>8} {'speedup':>8} "
+          f"{'effic.':>7} {'port waits':>11} {'slowest':>8}  output")
+    results, mismatches = [], 0
+    for harts in harts_list:
+        rows = partition(args.height, harts)
+        programs = [build_program(args.variant, args.width, args.height, r)
+                    for r in rows]
+        for ports in ports_list:
+            dmem = list(image)
+            cycles, stats = run_harts(programs, dmem, ports, args.max_cycles)
+            if cycles < 0:
+                sys.exit(f"[ERROR] {harts} harts / {ports} ports did not halt "
+                         f"within {args.max_cycles} cycles")
+            match = dmem[DMEM_WORDS - out_words:] == reference
+            mismatches += not match
+            speedup = base / cycles
+            waits = sum(s["port_waits"] for s in stats)
+            slowest = max(range(harts), key=lambda k: stats[k]["cycles"])
+            print(f"{harts:>5} {ports:>5} {cycles:>8} {speedup:>7.2f}x "
+                  f"{speedup / harts:>6.1%} {waits:>11} "
+                  f"{'#' + str(slowest):>8}  {'OK' if match else 'MISMATCH'}")
+            results.append({
+                "harts": harts, "ports": ports, "cycles": cycles,
+                "speedup": round(speedup, 4),
+                "efficiency": round(speedup / harts, 4),
+                "fps": round(args.clock_mhz * 1e6 / cycles, 2),
+                "port_waits": waits, "output_match": match,
+                "per_hart": [{"rows": list(r), "cycles": s["cycles"],
+                              "instructions": s["instructions"],
+                              "port_waits": s["port_waits"]}
+                             for r, s in zip(rows, stats)],
+            })
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"variant": args.variant,
+                       "size": [args.width, args.height],
+                       "single_core_cycles": base,
+                       "clock_mhz": args.clock_mhz,
+                       "runs": results}, f, indent=2)
+        print(f"[OK]   Curves written to '{args.json}'")
+    if mismatches:
+        sys.exit(f"[ERROR] {mismatches} run(s) differ from the single-core output")
+    print("[OK]   Merged output matches the single-core run")
+
+if __name__ == "__main__":
+    main()
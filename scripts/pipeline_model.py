@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+pipeline_model.py
+Cycle-accurate Python model of the VISOR 3-stage pipeline (rtl/ClkDiv.v).
+Steps the design one pipeline clock at a time:
+    IF_Stage    - PC / pc_reg / BRAM output register, two-cycle flush_delay
+    EX_Stage    - ControlUnit, ImmGen, ALU, branch resolve, EX/WB register
+    WB_Stage    - DataMem read + ALU / DataMem / reram_result writeback mux
+    HazardUnit  - one-cycle load-use stall (EX/WB load vs IF/EX rs1/rs2)
+    ForwardUnit - EX/WB forwarding paths (fwd_a / fwd_b)
+
+Reports total cycles, CPI, stall cycles and flush bubbles for a program.mem,
+and the frame latency at the pipeline clock. Optionally writes the same
+"CYC ... | PC= | instr= ..." trace as tb_RISCV_Pipeline, as text and/or as a
+columnar trace_store.py store.
+
+Note: ClkDiv toggles clk_out once every 4 clk_100mhz edges, so the pipeline
+clock is clk_100mhz / 8 = 12.5 MHz (the RISCV_Pipeline comment says 25 MHz).
+
+Usage: python pipeline_model.py [program.mem] [image.mem] [--trace trace.log]
+                                [--trace-store trace.npz]
+                                [--output output_image.mem] [--clock-mhz F]
+"""
+
+import os
+import argparse
+
+import riscv_iss
+import trace_store
+from riscv_iss import (IMEM_WORDS, DMEM_WORDS, MARKER_ADDR, MARKER_VALUE,
+                       MASK32, decode, alu, reram_sobel)
+
+SCRIPT_DIR   = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+
+REF_CLK_HZ      = 100e6
+CLK_DIV_RATIO   = 8                 # ClkDiv: toggle every 4 ref edges
+PIPELINE_CLK_HZ = REF_CLK_HZ / CLK_DIV_RATIO
+RESET_CYCLES    = 3                 # tb: rst held 20 ref cycles = 3 clk edges
+MAX_CYCLES      = 800000 // CLK_DIV_RATIO   # tb: default +MAX_CYCLES=800000 @clk_100mhz
+
+CYC_FORMAT = ("CYC {cyc} | PC={pc:08x} | instr={instr:08x} | rd={rd} wr={wr} | "
+              "alu={alu:08x} | mem_w={mem_w} mem_r={mem_r} | "
+              "fwdA={fwd_a:02b} fwdB={fwd_b:02b}")
+COMPLETION_FORMAT = "*** COMPLETION MARKER WRITE DETECTED at cycle {cyc} ***"
+
+# EX/WB pipeline register after reset / flush
+EX_RESET = {"alu": 0, "store": 0, "mem_read": False, "mem_write": False,
+            "reg_write": False, "reram": False, "wb_sel": 0, "rd": 0,
+            "window": None}
+
+def new_stats():
+    return {"cycles": 0, "instructions": 0, "stall_cycles": 0,
+            "flush_bubbles": 0, "reram_triggers": 0, "port_waits": 0,
+            "halted": False, "spinning": False, "completion": -1}
+
+def core(program, dmem, stats, trace=None, columns=None, stop_on_spin=False):
+    """Generator that clocks one pipeline against dmem, one cycle per two
+    resumptions.
+
+    The first yield comes after the cycle's combinational evaluation (the
+    DataMem read is done) and reports whether EX/WB uses a DataMem port;
+    the value sent back is the port grant. Granted, the clock edge is
+    taken; refused, every register holds and the cycle counts as a
+    port wait. The second yield follows the edge, so a driver clocking
+    several cores (multihart_model.py) can evaluate all of them before any
+    writes. Returns at the completion marker, or with stop_on_spin at a
+    "jal x0, 0" halt loop (stats["spinning"])."""
+    imem = list(program[:IMEM_WORDS]) + [0] * (IMEM_WORDS - len(program))
+    decoded = {w: decode(w) for w in set(imem) | {0}}
+
+    regs = [0] * 32
+    ex   = dict(EX_RESET)
+
+    # IF_Stage registers as left by reset; the BRAM has read mem[PC=0]
+    pc, pc_reg, if_pc, if_instr, flush_delay = 0, 0, 0, 0, False
+    bram = imem[0]
+    if_bubble = False       # IF/EX holds a branch-flush bubble
+
+    if columns is not None:
+        record = [columns[name].append for name in trace_store.COLUMNS]
+    for cyc in range(RESET_CYCLES):
+        if trace is not None:
+            trace.write(CYC_FORMAT.format(cyc=cyc, pc=0, instr=0, rd=0, wr=0,
+                                          alu=0, mem_w=0, mem_r=0,
+                                          fwd_a=0, fwd_b=0) + "\n")
+        if columns is not None:
+            for append, value in zip(record, (cyc, 0, 0, 0, 0, 0, 0, 0, 0, 0)):
+                append(value)
+
+    while True:
+        cyc = RESET_CYCLES + stats["cycles"]
+        rs1 = (if_instr >> 15) & 0x1F
+        rs2 = (if_instr >> 20) & 0x1F
+
+        # HazardUnit
+        stall = ex["mem_read"] and ex["rd"] != 0 and ex["rd"] in (rs1, rs2)
+
+        # WB_Stage: DataMem read + writeback mux
+        if ex["mem_read"]:
+            mem_rdata = dmem[(ex["alu"] >> 2) & (DMEM_WORDS - 1)]
+        else:
+            mem_rdata = 0
+        reram_result = reram_sobel(ex["window"]) if ex["reram"] else 0
+        wb_data = (mem_rdata if ex["wb_sel"] == 1 else
+                   reram_result if ex["wb_sel"] == 2 else ex["alu"])
+
+        # ForwardUnit (EX/WB is both the "mem" and the "wb" source here)
+        fwd_ok = ex["reg_write"] and ex["rd"] != 0
+        fwd_a = 0b10 if fwd_ok and ex["rd"] == rs1 else 0b00
+        fwd_b = 0b10 if fwd_ok and ex["rd"] == rs2 else 0b00
+
+        if trace is not None:
+            trace.write(CYC_FORMAT.format(
+                cyc=cyc, pc=if_pc, instr=if_instr, rd=ex["rd"],
+                wr=int(ex["reg_write"]), alu=ex["alu"],
+                mem_w=int(ex["mem_write"]), mem_r=int(ex["mem_read"]),
+                fwd_a=fwd_a, fwd_b=fwd_b) + "\n")
+        if columns is not None:
+            for append, value in zip(record, (
+                    cyc, if_pc, if_instr, ex["rd"], int(ex["reg_write"]),
+                    ex["alu"], int(ex["mem_write"]), int(ex["mem_read"]),
+                    fwd_a, fwd_b)):
+                append(value)
+
+        if not (yield ex["mem_read"] or ex["mem_write"]):
+            stats["cycles"] += 1
+            stats["port_waits"] += 1
+            yield
+            continue
+
+        done = (ex["mem_write"] and ex["alu"] == MARKER_ADDR and
+                ex["store"] == MARKER_VALUE)
+
+        # EX_Stage (flush forces opcode 0, i.e. all controls off)
+        (opcode, _, _, rd, funct3, imm, alu_op, alu_src_imm,
+         reg_write, mem_read, mem_write, branch, jump,
+         reram) = decoded[0 if stall else if_instr]
+        a = ex["alu"] if fwd_a else (regs[rs1] if rs1 else 0)
+        b = ex["alu"] if fwd_b else (regs[rs2] if rs2 else 0)
+        result = alu(alu_op, a, imm if alu_src_imm else b)
+        taken = jump or (branch and (
+            (funct3 == 0b000 and result == 0) or
+            (funct3 == 0b001 and result != 0) or
+            (funct3 == 0b100 and result & 1)))
+        target = (if_pc + imm) & MASK32
+
+        if stall:
+            stats["stall_cycles"] += 1
+        elif if_bubble:
+            stats["flush_bubbles"] += 1
+        elif if_instr != 0:
+            stats["instructions"] += 1
+            if reram:
+                stats["reram_triggers"] += 1
+
+        # ---------------- clock edge ----------------
+        window = regs[10:19] if reram and not stall else None
+        if ex["reg_write"] and ex["rd"] != 0:
+            regs[ex["rd"]] = wb_data
+        if ex["mem_write"]:
+            dmem[(ex["alu"] >> 2) & (DMEM_WORDS - 1)] = ex["store"]
+
+        if stall:
+            ex = dict(EX_RESET)
+        else:
+            ex = {"alu": result, "store": b, "mem_read": mem_read,
+                  "mem_write": mem_write, "reg_write": reg_write,
+                  "reram": reram, "wb_sel": 2 if reram else 1 if mem_read else 0,
+                  "rd": rd, "window": window}
+
+        next_bram = imem[(pc >> 2) & (IMEM_WORDS - 1)]
+        if taken:
+            spin = jump and target == if_pc
+            pc, pc_reg, if_pc, if_instr = target, 0, 0, 0
+            flush_delay, if_bubble = True, True
+        elif flush_delay:
+            pc_reg, if_pc, if_instr = pc, 0, 0
+            pc, flush_delay, if_bubble = pc + 4, False, True
+        elif not stall:
+            pc_reg, if_pc, if_instr = pc, pc_reg, bram
+            pc, if_bubble = pc + 4, False
+        pc &= MASK32
+        bram = next_bram
+
+        stats["cycles"] += 1
+        if done:
+            stats["halted"] = True
+            stats["completion"] = cyc
+            if trace is not None:
+                trace.write(COMPLETION_FORMAT.format(cyc=cyc) + "\n")
+            return
+        if stop_on_spin and taken and spin:
+            stats["spinning"] = True
+            return
+        yield
+
+def run(program, dmem, max_cycles=MAX_CYCLES, trace=None, columns=None):
+    """Clock the pipeline from reset release until the completion marker.
+
+    program is a list of InstrMem words, dmem is modified in place.
+    trace, if given, is a file object that receives tb-format CYC lines;
+    columns, if given, is a trace_store.new_columns() dict that receives the
+    same records. stats["completion"] is the marker cycle (-1 if none).
+    Returns a stats dict: cycles, instructions, cpi, stall_cycles,
+    flush_bubbles, reram_triggers, halted."""
+    stats = new_stats()
+    pipe = core(program, dmem, stats, trace, columns)
+    try:
+        while stats["cycles"] < max_cycles:
+            next(pipe)              # evaluate
+            pipe.send(True)         # clock edge; the only core owns the port
+    except StopIteration:
+        pass
+    stats["cpi"] = stats["cycles"] / max(stats["instructions"], 1)
+    return stats
+
+def report(stats, clock_hz=PIPELINE_CLK_HZ):
+    print(f"[OK]   Cycles:          {stats['cycles']}"
+          f"{'' if stats['halted'] else '  (no completion marker)'}")
+    print(f"       Instructions:    {stats['instructions']}")
+    print(f"       CPI:             {stats['cpi']:.3f}")
+    print(f"       Stall cycles:    {stats['stall_cycles']}")
+    print(f"       Flush bubbles:   {stats['flush_bubbles']}")
+    print(f"       ReRAM triggers:  {stats['reram_triggers']}")
+    latency = stats["cycles"] / clock_hz
+    print(f"       Frame latency:   {latency * 1e3:.3f} ms at "
+          f"{clock_hz / 1e6:g} MHz  ({1 / latency:.1f} frames/s)")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Cycle-accurate model of the VISOR 3-stage pipeline")
+    parser.add_argument("program", nargs="?",
+                        default=os.path.join(PROJECT_ROOT, "mem", "program.mem"))
+    parser.add_argument("image", nargs="?",
+                        default=os.path.join(PROJECT_ROOT, "output", "image.mem"))
+    parser.add_argument("--trace", help="write tb_RISCV_Pipeline CYC trace")
+    parser.add_argument("--trace-store",
+                        help="write the trace as a columnar .npz / .npy dir")
+    parser.add_argument("--output", help="write output_image.mem")
+    parser.add_argument("--clock-mhz", type=float,
+                        default=PIPELINE_CLK_HZ / 1e6,
+                        help="pipeline clock for latency (default: %(default)g)")
+    parser.add_argument("--max-cycles", type=int, default=MAX_CYCLES)
+    args = parser.parse_args()
+
+    program = riscv_iss.read_mem(args.program, IMEM_WORDS)
+    if os.path.exists(args.image):
+        dmem = riscv_iss.read_mem(args.image, DMEM_WORDS)
+    else:
+        print(f"[WARN] '{args.image}' not found, using an all-zero image")
+        dmem = [0] * DMEM_WORDS
+
+    print(f"[INFO] Program: {args.program}")
+    columns = trace_store.new_columns() if args.trace_store else None
+    if args.trace:
+        with open(args.trace, "w") as f:
+            stats = run(program, dmem, args.max_cycles, trace=f, columns=columns)
+        print(f"[OK]   Trace written to '{args.trace}'")
+    else:
+        stats = run(program, dmem, args.max_cycles, columns=columns)
+    if columns is not None:
+        trace_store.save(columns, args.trace_store, stats["completion"])
+        print(f"[OK]   Trace store written to '{args.trace_store}'")
+
+    if args.output:
+        riscv_iss.write_mem(args.output, dmem)
+        print(f"[OK]   Written output memory to '{args.output}'")
+    report(stats, args.clock_mhz * 1e6)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+reram_vectors.py
+Bulk self-checking test vectors for the ReRAM_Accelerator (rtl/MAC_Cell.v).
+
+Generates 72-bit pixel windows (p00..p22, p00 in the top byte, as on the
+pixel_window bus) and the expected 8-bit result of each, computed for the
+whole batch at once with sobel_golden.edge (zero-extended pixels, signed
+Sobel weights, |Gx| + |Gy| clamped to 255), the model the frame checks use.
+Vector classes:
+    corners     - every window over a small set of pixel levels
+                  (--levels, default 0,128,255: 3^9 = 19683 windows)
+    random      - uniform random pixels
+    saturating  - two-level windows whose |Gx| + |Gy| lands within 8 of the
+                  255 clamp, and windows far past it
+    border      - random windows with a zero row and/or column, as the
+                  zero-padded halo at frame and tile edges presents them
+
+Writes $readmemh files for tb_ReRAM_Accelerator's streaming mode:
+    reram_vectors.mem    one 18-digit hex window per line
+    reram_expected.mem   one 2-digit hex result per line
+    reram_vectors.json   counts and index range of every class
+A sample of every run is cross-checked against riscv_iss.reram_sobel.
+
+The testbench applies one vector per clock and counts mismatches:
+    xvlog rtl/MAC_Cell.v && xelab tb_ReRAM_Accelerator -s reram_tb
+    xsim reram_tb -R -testplusarg VECTORS=output/reram_vectors.mem \\
+                     -testplusarg EXPECTED=output/reram_expected.mem
+
+Usage: python reram_vectors.py [--out-dir DIR] [--levels 0,128,255]
+                               [--random N] [--saturating N] [--border N]
+                               [--seed S]
+"""
+
+import sys
+import os
+import json
+import argparse
+import itertools
+
+try:
+    import numpy as np
+except ImportError:
+    sys.exit("[ERROR] NumPy not installed. Run: pip install numpy")
+
+from riscv_iss import reram_sobel
+from sobel_golden import CLAMP, edge, gradient
+
+SCRIPT_DIR   = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+OUTPUT_DIR   = os.path.join(PROJECT_ROOT, "output")
+
+MAX_VECTORS  = 1 << 21          # tb_ReRAM_Accelerator MAX_VECTORS
+ISS_SAMPLES  = 2000
+
+_HEX = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+
+def window_taps(windows):
+    """(N, 9) windows p00..p22 → sobel_golden 3x3 nested (N,) tap arrays."""
+    w = np.asarray(windows, dtype=np.int32)
+    return [[w[:, 3 * r + c] for c in range(3)] for r in range(3)]
+
+def edge_sum(windows):
+    """Unclamped |Gx| + |Gy| of (N, 9) windows."""
+    return gradient(window_taps(windows))
+
+def reram_result(windows):
+    """Accelerator result (N,) uint8 for (N, 9) pixel windows p00..p22."""
+    return edge(window_taps(windows)).astype(np.uint8)
+
+# ====== Vector classes ======
+
+def corner_windows(levels):
+    """Every 9-pixel combination of the given levels."""
+    return np.array(list(itertools.product(levels, repeat=9)), dtype=np.uint8)
+
+def random_windows(rng, n):
+    return rng.integers(0, 256, size=(n, 9), dtype=np.uint8)
+
+def two_level(rng, n):
+    """Windows of two random levels in a random 9-bit pattern."""
+    lo = rng.integers(0, 256, size=(n, 1))
+    hi = rng.integers(0, 256, size=(n, 1))
+    mask = rng.integers(0, 2, size=(n, 9), dtype=bool)
+    return np.where(mask, hi, lo).astype(np.uint8)
+
+def saturating_windows(rng, n):
+    """n/2 windows within 8 of the clamp (both sides), n/2 far past it."""
+    near, far, found_near, found_far = n - n // 2, n // 2, [], []
+    while near > 0 or far > 0:
+        pool = two_level(rng, 16 * max(near, far, 64))
+        raw = edge_sum(pool)
+        hit = pool[np.abs(raw - CLAMP) <= 8][:max(near, 0)]
+        found_near.append(hit)
+        near -= len(hit)
+        hit = pool[raw >= 2 * CLAMP][:max(far, 0)]
+        found_far.append(hit)
+        far -= len(hit)
+    return np.concatenate(found_near + found_far)
+
+BORDER_MASKS = np.array([
+    [0, 0, 0, 1, 1, 1, 1, 1, 1],        # top row zero
+    [1, 1, 1, 1, 1, 1, 0, 0, 0],        # bottom row zero
+    [0, 1, 1, 0, 1, 1, 0, 1, 1],        # left column zero
+    [1, 1, 0, 1, 1, 0, 1, 1, 0],        # right column zero
+    [0, 0, 0, 0, 1, 1, 0, 1, 1],        # top-left corner
+    [0, 0, 0, 1, 1, 0, 1, 1, 0],        # top-right corner
+    [0, 1, 1, 0, 1, 1, 0, 0, 0],        # bottom-left corner
+    [1, 1, 0, 1, 1, 0, 0, 0, 0],        # bottom-right corner
+], dtype=np.uint8)
+
+def border_windows(rng, n):
+    masks = BORDER_MASKS[rng.integers(0, len(BORDER_MASKS), size=n)]
+    return random_windows(rng, n) * masks
+
+# ====== $readmemh output ======
+
+def write_hex(path, rows, header):
+    """(N, B) uint8 rows → one 2*B-digit hex word per line, MSB first."""
+    rows = np.ascontiguousarray(rows, dtype=np.uint8)
+    n, width = rows.shape
+    out = np.empty((n, 2 * width + 1), dtype=np.uint8)
+    out[:, 0:2 * width:2] = _HEX[rows >> 4]
+    out[:, 1:2 * width:2] = _HEX[rows & 0xF]
+    out[:, -1] = ord("\n")
+    with open(path, "wb") as f:
+        f.write("".join(f"// {line}\n" for line in header).encode())
+        f.write(out.tobytes())
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="ReRAM_Accelerator test vectors with expected results")
+    parser.add_argument("--out-dir", default=OUTPUT_DIR)
+    parser.add_argument("--levels", default="0,128,255",
+                        help="pixel levels of the exhaustive corner class "
+                             "(default: %(default)s)")
+    parser.add_argument("--random", type=int, default=50000)
+    parser.add_argument("--saturating", type=int, default=10000)
+    parser.add_argument("--border", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    try:
+        levels = sorted({int(v, 0) for v in args.levels.split(",") if v})
+    except ValueError:
+        sys.exit("[ERROR] --levels takes comma-separated pixel values")
+    if not levels or min(levels) < 0 or max(levels) > 255:
+        sys.exit("[ERROR] --levels must be pixel values 0-255")
+
+    rng = np.random.default_rng(args.seed)
+    classes = [("corners", corner_windows(levels)),
+               ("random", random_windows(rng, args.random)),
+               ("saturating", saturating_windows(rng, args.saturating)),
+               ("border", border_windows(rng, args.border))]
+    windows = np.concatenate([w for _, w in classes])
+    if len(windows) > MAX_VECTORS:
+        sys.exit(f"[ERROR] {len(windows)} vectors, tb_ReRAM_Accelerator holds "
+                 f"{MAX_VECTORS} (raise its MAX_VECTORS parameter)")
+    expected = reram_result(windows)
+
+    # Cross-check the vectorized model against the ISS scalar model
+    sample = rng.choice(len(windows), size=min(ISS_SAMPLES, len(windows)),
+                        replace=False)
+    bad = [int(i) for i in sample
+           if reram_sobel(windows[i].tolist()) != expected[i]]
+    if bad:
+        sys.exit(f"[ERROR] Model disagrees with riscv_iss.reram_sobel on "
+                 f"{len(bad)} samples, e.g. window {windows[bad[0]].tolist()}")
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    vec_path = os.path.join(args.out_dir, "reram_vectors.mem")
+    exp_path = os.path.join(args.out_dir, "reram_expected.mem")
+    header = [f"reram_vectors.py: {len(windows)} vectors, seed {args.seed}"]
+    write_hex(vec_path, windows, header + ["p00..p22, p00 in bits 71:64"])
+    write_hex(exp_path, expected[:, None], header + ["|Gx| + |Gy|, clamped to 255"])
+
+    layout, start = {}, 0
+    for name, w in classes:
+        layout[name] = {"first": start, "count": len(w)}
+        start += len(w)
+    with open(os.path.join(args.out_dir, "reram_vectors.json"), "w") as f:
+        json.dump({"vectors": len(windows), "seed": args.seed,
+                   "levels": levels, "classes": layout,
+                   "clamped": int(np.count_nonzero(expected == CLAMP)),
+                   "zero": int(np.count_nonzero(expected == 0))}, f, indent=2)
+
+    for name, info in layout.items():
+        print(f"[INFO] {name:<11} {info['count']:>8} vectors "
+              f"(from #{info['first']})")
+    print(f"[OK]   {len(windows)} vectors → '{vec_path}'")
+    print(f"[OK]   Expected results → '{exp_path}' "
+          f"({np.count_nonzero(expected == CLAMP)} clamped, "
+          f"{np.count_nonzero(expected == 0)} zero)")
+    print(f"       Model matches riscv_iss.reram_sobel on {len(sample)} samples")
+
+if __name__ == "__main__":
+    main()
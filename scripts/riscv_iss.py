@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+riscv_iss.py
+Functional instruction-set simulator for the VISOR RISC-V pipeline.
+Runs program.mem against image.mem using exactly the opcode subset decoded by
+ControlUnit (rtl/ClkDiv.v), including the CUSTOM opcode 0001011 that fires the
+ReRAM_Accelerator (|Gx| + |Gy|, clamped to 255).
+
+Custom words execute through the custom_ops.py registry (sources, dests and
+semantics per funct3/funct7); the stock encoding is its "sobel" entry, and
+any unregistered encoding falls back to it, as ControlUnit does.
+
+Halts on the 0xDEADBEEF completion marker store to 0x1FFC (the same condition
+tb_RISCV_Pipeline watches for) and writes DataMem words 1024-2047 in the same
+layout as the testbench $writememh.
+
+The model is functional, but it keeps the one-instruction writeback slot of
+the 3-stage pipeline so results match the RTL bit-for-bit:
+    - forwarding from EX/WB delivers the ALU result (ForwardUnit path 10)
+    - CUSTOM reads x10-x18 straight from the register file (pixel_regs bus),
+      so it does not see the write of the instruction right in front of it
+    - a load-use stall lets the IF_Stage BRAM run one word ahead of pc_reg,
+      so the following instruction is replaced as in the RTL
+
+Usage: python riscv_iss.py [program.mem] [image.mem] [output_image.mem]
+"""
+
+import sys
+import os
+
+SCRIPT_DIR   = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+
+IMEM_WORDS   = 256          # InstrMem: reg [31:0] mem [0:255]
+DMEM_WORDS   = 2048         # DataMem:  reg [31:0] mem [0:2047]
+OUT_START    = 1024         # $writememh range in tb_RISCV_Pipeline
+OUT_END      = 2047
+MARKER_ADDR  = 0x1FFC
+MARKER_VALUE = 0xDEADBEEF
+MAX_INSTRS   = 100000       # tb budget: 800000 clk_100mhz cycles / ClkDiv ratio 8
+
+MASK32 = 0xFFFFFFFF
+
+# Opcodes decoded by ControlUnit
+OP_RTYPE  = 0b0110011
+OP_ITYPE  = 0b0010011
+OP_LOAD   = 0b0000011
+OP_STORE  = 0b0100011
+OP_BRANCH = 0b1100011
+OP_JAL    = 0b1101111
+OP_LUI    = 0b0110111
+OP_CUSTOM = 0b0001011
+
+# ALU operations (ALU localparams)
+ALU_ADD, ALU_SUB, ALU_AND, ALU_OR, ALU_XOR = 0, 1, 2, 3, 4
+ALU_SLL, ALU_SRL, ALU_SLT, ALU_SLTU        = 5, 6, 7, 8
+
+# ControlUnit R-type decode on {funct7[5], funct3}, everything else is ADD
+RTYPE_OPS = {0b0000: ALU_ADD, 0b1000: ALU_SUB, 0b0111: ALU_AND,
+             0b0110: ALU_OR,  0b0100: ALU_XOR, 0b0001: ALU_SLL,
+             0b0101: ALU_SRL, 0b0010: ALU_SLT}
+ITYPE_OPS = {0b000: ALU_ADD, 0b111: ALU_AND, 0b110: ALU_OR,
+             0b100: ALU_XOR, 0b001: ALU_SLL, 0b101: ALU_SRL,
+             0b010: ALU_SLT}
+BRANCH_OPS = {0b000: ALU_SUB, 0b001: ALU_SUB, 0b100: ALU_SLT}
+
+# Sobel kernels, row-major p00..p22 (ReRAM_Accelerator gx**/gy** wires)
+SOBEL_GX = (-1, 0, 1, -2, 0, 2, -1, 0, 1)
+SOBEL_GY = (-1, -2, -1, 0, 0, 0, 1, 2, 1)
+
+# ====== Memory files ======
+
+def read_mem(path, depth):
+    """$readmemh: hex words (one per token), '//' comments, '@addr' markers."""
+    if not os.path.exists(path):
+        sys.exit(f"[ERROR] File not found: '{path}'")
+    mem  = [0] * depth
+    addr = 0
+    with open(path, "r") as f:
+        for line in f:
+            line = line.split("//", 1)[0]
+            for tok in line.split():
+                if tok.startswith("@"):
+                    addr = int(tok[1:], 16)
+                    continue
+                if addr < depth:
+                    mem[addr] = int(tok, 16) & MASK32
+                addr += 1
+    return mem
+
+def write_mem(path, mem, start=OUT_START, end=OUT_END):
+    """$writememh of mem[start..end], one 8-digit hex word per line."""
+    with open(path, "w") as f:
+        f.write("".join(f"{mem[i]:08x}\n" for i in range(start, end + 1)))
+
+# ====== Datapath models ======
+
+def sign_extend(value, bits):
+    sign = 1 << (bits - 1)
+    return ((value & (sign - 1)) - (value & sign)) & MASK32
+
+def to_signed(value):
+    return value - (1 << 32) if value & 0x80000000 else value
+
+def imm_gen(instr):
+    """ImmGen: sign-extended immediate, selected by opcode alone."""
+    opcode = instr & 0x7F
+    if opcode in (0b0010011, 0b0000011, 0b1100111):
+        return sign_extend(instr >> 20, 12)
+    if opcode == 0b0100011:
+        return sign_extend(((instr >> 25) << 5) | ((instr >> 7) & 0x1F), 12)
+    if opcode == 0b1100011:
+        imm = (((instr >> 31) & 1) << 12) | (((instr >> 7) & 1) << 11) | \
+              (((instr >> 25) & 0x3F) << 5) | (((instr >> 8) & 0xF) << 1)
+        return sign_extend(imm, 13)
+    if opcode == 0b1101111:
+        imm = (((instr >> 31) & 1) << 20) | (((instr >> 12) & 0xFF) << 12) | \
+              (((instr >> 20) & 1) << 11) | (((instr >> 21) & 0x3FF) << 1)
+        return sign_extend(imm, 21)
+    if opcode in (0b0110111, 0b0010111):
+        return instr & 0xFFFFF000
+    return 0
+
+def alu(op, a, b):
+    if op == ALU_ADD:  return (a + b) & MASK32
+    if op == ALU_SUB:  return (a - b) & MASK32
+    if op == ALU_AND:  return a & b
+    if op == ALU_OR:   return a | b
+    if op == ALU_XOR:  return a ^ b
+    if op == ALU_SLL:  return (a << (b & 0x1F)) & MASK32
+    if op == ALU_SRL:  return a >> (b & 0x1F)
+    if op == ALU_SLT:  return int(to_signed(a) < to_signed(b))
+    if op == ALU_SLTU: return int(a < b)
+    return 0
+
+def reram_sobel(pixels):
+    """ReRAM_Accelerator result for 9 window pixels p00..p22 (lower 8 bits)."""
+    gx = sum(w * (p & 0xFF) for w, p in zip(SOBEL_GX, pixels))
+    gy = sum(w * (p & 0xFF) for w, p in zip(SOBEL_GY, pixels))
+    return min(abs(gx) + abs(gy), 255)
+
+def decode(instr):
+    """ControlUnit + field extraction, pre-computed once per InstrMem word.
+
+    Returns (opcode, rs1, rs2, rd, funct3, imm, alu_op, alu_src_imm,
+             reg_write, mem_read, mem_write, branch, jump, reram)."""
+    opcode = instr & 0x7F
+    rd     = (instr >> 7) & 0x1F
+    funct3 = (instr >> 12) & 0x7
+    rs1    = (instr >> 15) & 0x1F
+    rs2    = (instr >> 20) & 0x1F
+    funct7 = (instr >> 25) & 0x7F
+    imm    = imm_gen(instr)
+
+    alu_op, alu_src_imm = ALU_ADD, False
+    reg_write = mem_read = mem_write = branch = jump = reram = False
+
+    if opcode == OP_RTYPE:
+        reg_write = True
+        alu_op = RTYPE_OPS.get(((funct7 >> 5) << 3) | funct3, ALU_ADD)
+    elif opcode == OP_ITYPE:
+        reg_write, alu_src_imm = True, True
+        alu_op = ITYPE_OPS.get(funct3, ALU_ADD)
+    elif opcode == OP_LOAD:
+        mem_read, reg_write, alu_src_imm = True, True, True
+    elif opcode == OP_STORE:
+        mem_write, alu_src_imm = True, True
+    elif opcode == OP_BRANCH:
+        branch = True
+        alu_op = BRANCH_OPS.get(funct3, ALU_SUB)
+    elif opcode == OP_JAL:
+        reg_write, jump = True, True
+    elif opcode == OP_LUI:
+        reg_write, alu_src_imm = True, True
+    elif opcode == OP_CUSTOM:
+        reg_write, reram = True, True
+
+    return (opcode, rs1, rs2, rd, funct3, imm, alu_op, alu_src_imm,
+            reg_write, mem_read, mem_write, branch, jump, reram)
+
+# ====== Simulation ======
+
+def retire(regs, wb):
+    """Register write(s) of the instruction in the EX/WB register."""
+    regs[wb[0]] = wb[2]
+    for rd, value in wb[4]:
+        regs[rd] = value
+
+def run(program, dmem, max_instrs=MAX_INSTRS):
+    """Execute program (list of InstrMem words) against dmem in place.
+
+    Returns a stats dict: instructions, load_use_stalls, branches_taken,
+    reram_triggers, halted (completion marker seen)."""
+    import custom_ops
+
+    words = list(program[:IMEM_WORDS]) + [0] * (IMEM_WORDS - len(program))
+    decoded = [decode(w) for w in words]
+    customs = [custom_ops.lookup(w) if w & 0x7F == OP_CUSTOM else None
+               for w in words]
+
+    regs = [0] * 32
+    # Register-writing instruction in the EX/WB register:
+    # (rd, alu_result, wb_value, mem_read, extra), or None for a bubble / no
+    # write; extra holds (rd, value) of further custom-op dests, which are
+    # not forwarded either. Its register writes land at the end of the cycle.
+    wb = None
+
+    # IF_Stage state just after reset: BRAM output word address (fetched),
+    # its pc_reg label, and PC. The BRAM has already read mem[0] while PC
+    # was held at 0, so the first instruction issues twice, as in the RTL.
+    fetched, pc_reg, pc = 0, 0, 0
+    stats = {"instructions": 0, "load_use_stalls": 0, "branches_taken": 0,
+             "reram_triggers": 0, "halted": False}
+
+    while stats["instructions"] < max_instrs:
+        # Normal IF edge: IF/EX <= {BRAM output, pc_reg}; pc_reg <= PC
+        addr, if_pc = fetched, pc_reg
+        fetched, pc_reg, pc = pc, pc, pc + 4
+        slot = (addr >> 2) & (IMEM_WORDS - 1)
+        (opcode, rs1, rs2, rd, funct3, imm, alu_op, alu_src_imm,
+         reg_write, mem_read, mem_write, branch, jump,
+         reram) = decoded[slot]
+
+        # HazardUnit: load in WB feeding the raw rs1/rs2 fields -> 1 bubble.
+        # IF_Stage holds pc_reg during the stall but its BRAM re-reads PC.
+        if wb is not None and wb[3] and wb[0] in (rs1, rs2):
+            retire(regs, wb)
+            wb = None
+            fetched = pc
+            stats["load_use_stalls"] += 1
+
+        # Register file read + ForwardUnit (EX/WB ALU result wins)
+        a = regs[rs1] if rs1 else 0
+        b = regs[rs2] if rs2 else 0
+        if wb is not None:
+            if wb[0] == rs1: a = wb[1]
+            if wb[0] == rs2: b = wb[1]
+
+        result = alu(alu_op, a, imm if alu_src_imm else b)
+        if reram:
+            op = customs[slot]
+            window = [regs[r] for r in op["sources"]]   # pixel_regs: no forwarding
+            stats["reram_triggers"] += 1
+
+        # Writeback of the older instruction happens at this clock edge
+        if wb is not None:
+            retire(regs, wb)
+
+        wb_value, extra = result, ()
+        if mem_read:
+            wb_value = dmem[(result >> 2) & (DMEM_WORDS - 1)]
+        elif mem_write:
+            dmem[(result >> 2) & (DMEM_WORDS - 1)] = b
+        elif reram:
+            wb_value, *rest = op["semantics"](window)
+            wb_value &= MASK32
+            extra = tuple((r, v & MASK32) for r, v in zip(op["dests"][1:], rest))
+        wb = (rd, result, wb_value, mem_read, extra) if reg_write and rd else None
+        stats["instructions"] += 1
+
+        if mem_write and result == MARKER_ADDR and b == MARKER_VALUE:
+            stats["halted"] = True
+            break
+
+        taken = jump or (branch and (
+            (funct3 == 0b000 and result == 0) or
+            (funct3 == 0b001 and result != 0) or
+            (funct3 == 0b100 and result & 1)))
+        if taken:
+            # Two flush bubbles retire this instruction; the target then
+            # issues with pc_reg and the BRAM output back in step.
+            target = (if_pc + imm) & MASK32
+            fetched, pc_reg, pc = target, target, target + 4
+            if wb is not None:
+                retire(regs, wb)
+                wb = None
+            stats["branches_taken"] += 1
+
+    if wb is not None:
+        retire(regs, wb)
+    stats["regs"] = regs
+    return stats
+
+def simulate(program_path, image_path, output_path, max_instrs=MAX_INSTRS):
+    """Load program.mem + image.mem, run to completion, write output_image.mem."""
+    program = read_mem(program_path, IMEM_WORDS)
+    dmem    = read_mem(image_path, DMEM_WORDS)
+
+    print(f"[INFO] Program: {program_path}")
+    print(f"[INFO] Image:   {image_path}")
+    stats = run(program, dmem, max_instrs)
+
+    if stats["halted"]:
+        print(f"[OK]   Completion marker written after "
+              f"{stats['instructions']} instructions")
+    else:
+        print(f"[WARN] No completion marker after {max_instrs} instructions; "
+              f"dumping memory anyway.")
+
+    write_mem(output_path, dmem)
+    print(f"[OK]   Written DataMem[{OUT_START}:{OUT_END}] to '{output_path}'")
+    print(f"       ReRAM triggers: {stats['reram_triggers']}  |  "
+          f"Load-use stalls: {stats['load_use_stalls']}  |  "
+          f"Branches taken: {stats['branches_taken']}")
+    return stats
+
+if __name__ == "__main__":
+    program_path = sys.argv[1] if len(sys.argv) > 1 else \
+        os.path.join(PROJECT_ROOT, "mem", "program.mem")
+    image_path   = sys.argv[2] if len(sys.argv) > 2 else "image.mem"
+    output_path  = sys.argv[3] if len(sys.argv) > 3 else "output_image.mem"
+    simulate(program_path, image_path, output_path)
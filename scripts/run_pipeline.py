@@ -2,10 +2,60 @@
 """
 run_pipeline.py
 Full automation: image → .mem → Vivado sim → output PNG
-Runs all three steps in sequence from one terminal command.
+Runs all three steps in sequence from one terminal command. The conversion
+steps run in this process through visor.py (no interpreter per step); only
+the Vivado backend spawns a simulator.
 
 Usage (from project root):
     python scripts/run_pipeline.py test_data/test_image.png
+    python scripts/run_pipeline.py test_data/test_image.png --backend iss
+
+Batch mode (directory, glob and/or several images):
+    python scripts/run_pipeline.py test_data/ "frames/*.png" --backend iss -j 8
+Each image runs in its own directory under output/runs/ (image.mem,
+program.mem, output_image.mem, edge PNG, step log) and a manifest.json with
+per-image status, wall time (total and per stage) and edge-pixel count is
+written next to them.
+
+Tiled mode (full resolution instead of the 32x32 resize):
+    python scripts/run_pipeline.py camera_frame.png --tile --backend iss -j 8
+The image is cut into 32x32 tiles overlapping by the 1-pixel Sobel halo,
+tiles are streamed through a worker pool and the valid 30x30 interiors are
+stitched into output/<name>_edges.png.
+
+Stream mode (image sequence and/or video, e.g. a camera feed):
+    python scripts/run_pipeline.py "frames/*.png" --stream --backend iss -j 8
+Frames are tiled as above, but the previous input and edge map are kept:
+only tiles whose input window (interior plus halo) changed are simulated,
+the rest reuse last frame's output. The next frame is decoded on a
+background thread while the current one runs. Edge maps and stream.json
+(per-frame recomputed tiles, sustained frames/s, skipped-tile fraction) go
+to output/stream/. Video input needs OpenCV (pip install opencv-python).
+
+Packed mode (64x64, 4 pixels per word; needs the --packed program):
+    python scripts/generate_program_mem.py --packed
+    python scripts/run_pipeline.py test_data/test_image.png --packed --backend iss
+Other frame sizes need a program generated for the same --width/--height:
+    python scripts/generate_program_mem.py --rotate --width 48 --height 21
+    python scripts/run_pipeline.py wide.png --width 48 --height 21 --backend iss
+--program selects the program.mem in every mode (default mem/program.mem).
+Its frame, read from the sobel_program.s generated next to it, must match
+the frame being run (32x32 tiles with --tile / --stream), or the run is
+rejected before any simulation.
+
+Backends:
+    vivado  - Vivado/xsim batch simulation through run_sim.tcl (default)
+    iss     - riscv_iss.py functional simulator, no Vivado licence needed
+
+With the vivado backend the testbench stops at the completion marker; its
++MAX_CYCLES budget is the pipeline_model.py cycle count x --sim-margin, and
+the waveform dump / per-cycle trace are only produced with --vcd / --trace
+(tb plusargs +VCD / +TRACE, see run_sim.tcl).
+
+Results are cached under output/cache/, keyed by a hash of program.mem,
+image.mem and the simulator sources (rtl/ etc., see sim_cache.py); a hit
+skips the simulation step. --no-cache forces a fresh run, --cache-mb bounds
+the cache size (least recently used entries are evicted).
 
 Requirements:
     - Pillow:  pip install Pillow
@@ -14,8 +64,17 @@ Requirements:
 
 import sys
 import os
+import argparse
+import contextlib
+import glob
+import json
+import multiprocessing
+import re
 import subprocess
 import shutil
+import time
+from concurrent.futures import (ProcessPoolExecutor, as_completed, wait,
+                                FIRST_COMPLETED)
 
 # -------------------------------------------------------
 # USER CONFIGURATION
@@ -29,12 +88,18 @@ SCRIPT_DIR  = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)  # scripts/ → project root
 
 TCL_SCRIPT  = os.path.join(SCRIPT_DIR, "run_sim.tcl")
-IMG_TO_MEM  = os.path.join(SCRIPT_DIR, "img_to_mem.py")
-MEM_TO_IMG  = os.path.join(SCRIPT_DIR, "mem_to_img.py")
+PROGRAM_MEM = os.path.join(PROJECT_ROOT, "mem", "program.mem")
 
 INPUT_MEM   = os.path.join(PROJECT_ROOT, "output", "image.mem")
 OUTPUT_MEM  = os.path.join(PROJECT_ROOT, "output", "output_image.mem")
 OUTPUT_PNG  = os.path.join(PROJECT_ROOT, "output", "edge_detected_output.png")
+RUNS_DIR    = os.path.join(PROJECT_ROOT, "output", "runs")
+TILES_DIR   = os.path.join(PROJECT_ROOT, "output", "tiles")
+
+SIM_MARGIN  = 1.25           # tb +MAX_CYCLES = modelled cycles x margin
+SIM_SLACK   = 1000           # ... plus this many clk_100mhz cycles
+
+IMAGE_EXTS  = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tif", ".tiff")
 # -------------------------------------------------------
 
 def banner(msg):
@@ -46,20 +111,782 @@ def check_file(path, label):
     if not os.path.exists(path):
         sys.exit(f"[ERROR] {label} not found: '{path}'")
 
+def program_frame(program_mem):
+    """(width, height, packed) of the frame program_mem was generated for,
+    from the sobel_program.s header written next to it, or None."""
+    asm = os.path.join(os.path.dirname(program_mem), "sobel_program.s")
+    if not os.path.exists(asm):
+        return None
+    # The banner dash may be in the platform's encoding; the fields are ASCII
+    with open(asm, errors="replace") as f:
+        header = "".join(line for line in f if line.startswith("#"))
+    m = re.search(r"^# (\d+)x(\d+) image", header, re.M)
+    if m is None:
+        return None
+    return int(m[1]), int(m[2]), "4 per 32-bit word" in header
+
+def check_program(program_mem, size, packed, needs):
+    """Exit unless program_mem was generated for a size (W, H) frame."""
+    check_file(program_mem, "program.mem (run scripts/generate_program_mem.py)")
+    frame = program_frame(program_mem)
+    if frame is None:
+        print(f"[WARN] No sobel_program.s next to '{program_mem}'; its frame "
+              f"size is not checked")
+    elif frame != (*size, packed):
+        built = f"{frame[0]}x{frame[1]}{' packed' if frame[2] else ''}"
+        sys.exit(f"[ERROR] '{program_mem}' was generated for a {built} frame, "
+                 f"but {needs} (regenerate with generate_program_mem.py "
+                 f"--width/--height/--packed to match)")
+
 def run_step(cmd, label, cwd=None):
     banner(f"STEP: {label}")
     print(f"[CMD] {' '.join(cmd)}\n")
-    result = subprocess.run(cmd, shell=True, cwd=cwd)
+    # shell=True is only needed for vivado.bat; on POSIX it would drop argv[1:]
+    result = subprocess.run(cmd, shell=(os.name == "nt"), cwd=cwd)
     if result.returncode != 0:
         sys.exit(f"[ERROR] '{label}' failed with exit code {result.returncode}")
     print(f"[OK]  {label} completed successfully.")
 
+def run_inline(func, label, *args):
+    """run_step for the conversion steps: called in this process, no spawn."""
+    banner(f"STEP: {label}")
+    func(*args)
+    print(f"[OK]  {label} completed successfully.")
+
+def find_vivado():
+    vivado_exe = shutil.which(VIVADO_PATH) or VIVADO_PATH
+    return vivado_exe if shutil.which(vivado_exe) else None
+
+def vivado_cmd(vivado_exe, run_dir=None, plusargs=()):
+    cmd = [vivado_exe, "-mode", "batch", "-source", TCL_SCRIPT,
+           "-nojournal", "-nolog"]
+    tclargs = ([run_dir] if run_dir is not None else []) + list(plusargs)
+    if tclargs:
+        cmd += ["-tclargs"] + tclargs
+    return cmd
+
+def sim_plusargs(program_mem, margin=SIM_MARGIN, vcd=False, trace=False):
+    """tb_RISCV_Pipeline plusargs for one program (see run_sim.tcl).
+
+    +MAX_CYCLES is the cycle model's count for the program (its loop is
+    data-independent) times margin, in clk_100mhz cycles, so a run that
+    misses the completion marker stops soon after it should have finished
+    instead of after the tb's 8 ms default. +VCD / +TRACE are opt-in."""
+    import pipeline_model
+    import riscv_iss
+
+    plusargs = []
+    if os.path.exists(program_mem):
+        program = riscv_iss.read_mem(program_mem, riscv_iss.IMEM_WORDS)
+        stats = pipeline_model.run(program, [0] * riscv_iss.DMEM_WORDS)
+        if stats["halted"]:
+            budget = (int(stats["cycles"] * margin) + pipeline_model.RESET_CYCLES) \
+                * pipeline_model.CLK_DIV_RATIO + SIM_SLACK
+            plusargs.append(f"+MAX_CYCLES={budget}")
+            print(f"[INFO] Cycle model: {stats['cycles']} pipeline cycles → "
+                  f"tb budget {budget} clk_100mhz cycles (x{margin:g})")
+        else:
+            print("[WARN] Cycle model never reaches the completion marker; "
+                  "keeping the tb's default budget")
+    if vcd:
+        plusargs.append("+VCD")
+    if trace:
+        plusargs.append("+TRACE")
+    return plusargs
+
+def run_vivado(plusargs=(), program_mem=PROGRAM_MEM):
+    check_file(TCL_SCRIPT, "run_sim.tcl")
+
+    # run_sim.tcl reads mem/program.mem, or program.mem from a run
+    # directory: another program runs from output/ next to image.mem
+    run_dir = None
+    if os.path.abspath(program_mem) != PROGRAM_MEM:
+        run_dir = os.path.dirname(INPUT_MEM)
+        shutil.copy(program_mem, os.path.join(run_dir, "program.mem"))
+    vivado_exe = find_vivado()
+    if vivado_exe is None:
+        print(f"[WARN] Vivado not found at '{VIVADO_PATH}'.")
+        print("       Skipping simulation step. You can run manually:")
+        print(f"         vivado -mode batch -source {TCL_SCRIPT}"
+              + (f" -tclargs {run_dir}" if run_dir else ""))
+    else:
+        run_step(vivado_cmd(vivado_exe, run_dir, plusargs),
+                 "Vivado batch simulation",
+                 cwd=PROJECT_ROOT)
+
+def run_iss(program_mem=PROGRAM_MEM):
+    import riscv_iss
+
+    check_file(program_mem, "program.mem (run scripts/generate_program_mem.py)")
+    banner("STEP: ISS functional simulation")
+    stats = riscv_iss.simulate(program_mem, INPUT_MEM, OUTPUT_MEM)
+    if not stats["halted"]:
+        sys.exit("[ERROR] ISS finished without the completion marker")
+    print("[OK]  ISS functional simulation completed successfully.")
+
+def sim_completed(output_mem):
+    """True when an output_image.mem dump ends with the completion marker.
+
+    tb_RISCV_Pipeline writes the dump on +MAX_CYCLES timeout too, so the
+    file existing does not mean the frame is complete."""
+    import mem_codec
+    import riscv_iss
+    words = mem_codec.read_memh(output_mem)
+    return len(words) > 0 and int(words[-1]) == riscv_iss.MARKER_VALUE
+
+def run_simulation(backend, cache_dir, plusargs=(), program_mem=PROGRAM_MEM):
+    """Step 2 of the single-image flow, served from the cache when possible."""
+    import sim_cache
+
+    if not os.path.exists(program_mem):
+        cache_dir = None                # run_iss / run_sim.tcl report it
+    if cache_dir is not None:
+        key = sim_cache.cache_key(backend, program_mem, INPUT_MEM)
+        meta = sim_cache.lookup(key, OUTPUT_MEM, cache_dir)
+        if meta is not None:
+            banner("STEP: Simulation (cached)")
+            print(f"[OK]  Cache hit {key[:12]}: {backend} simulation skipped "
+                  f"(originally {meta['sim_time_s']:.2f} s).")
+            return
+
+    start = time.time()
+    if backend == "iss":
+        run_iss(program_mem)
+    else:
+        run_vivado(plusargs, program_mem)
+
+    # Only cache a result this run actually produced
+    fresh = os.path.exists(OUTPUT_MEM) and os.path.getmtime(OUTPUT_MEM) >= start
+    if fresh and backend == "vivado" and not sim_completed(OUTPUT_MEM):
+        sys.exit("[ERROR] Vivado simulation timed out before the completion "
+                 "marker (raise --sim-margin); output_image.mem is partial")
+    if cache_dir is not None and fresh:
+        sim_cache.store(key, OUTPUT_MEM,
+                        {"backend": backend, "sim_time_s": time.time() - start,
+                         "program": program_mem, "image": INPUT_MEM},
+                        cache_dir)
+
+# -------------------------------------------------------
+# BATCH MODE — one private run directory per image
+# -------------------------------------------------------
+def expand_inputs(inputs):
+    """Resolve files, directories and glob patterns to a sorted image list."""
+    images = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = [os.path.join(item, name) for name in os.listdir(item)]
+        elif glob.has_magic(item):
+            matches = glob.glob(item)
+        else:
+            matches = [item]
+        images += sorted(os.path.abspath(p) for p in matches
+                         if os.path.isfile(p) and
+                         p.lower().endswith(IMAGE_EXTS))
+        if not matches:
+            print(f"[WARN] No images matched '{item}'")
+    return list(dict.fromkeys(images))
+
+def count_edges(mem_path, packed=False, size=None):
+    """Non-zero pixels in an output_image.mem (same count as mem_to_img.py)."""
+    import mem_codec
+    words = mem_codec.read_memh(mem_path, 1024)
+    if size:
+        words = mem_codec.output_frame(words, *size, packed)
+    if packed:
+        return int((mem_codec.unpack_pixels(words) != 0).sum())
+    return int(((words & 0xFF) != 0).sum())
+
+def run_logged(cmd, label, log, cwd=None):
+    """run_step for batch workers: output goes to the job log, errors raise."""
+    log.write(f"[CMD] {' '.join(cmd)}\n")
+    log.flush()
+    result = subprocess.run(cmd, shell=(os.name == "nt"), cwd=cwd,
+                            stdout=log, stderr=subprocess.STDOUT)
+    if result.returncode != 0:
+        raise RuntimeError(f"{label} failed with exit code {result.returncode}")
+
+def run_logged_inline(func, label, log, *args):
+    """run_inline for batch workers: output goes to the job log, errors raise."""
+    log.write(f"[CALL] {func.__module__}.{func.__name__}\n")
+    try:
+        with contextlib.redirect_stdout(log):
+            func(*args)
+    except SystemExit as e:
+        raise RuntimeError(f"{label} failed: {e.code}") from None
+    finally:
+        log.flush()
+
+_sim_slots = None
+
+def _init_worker(sim_slots):
+    global _sim_slots
+    _sim_slots = sim_slots
+
+def simulate_in(run_dir, backend, log, cache_dir=None, plusargs=()):
+    """Simulate run_dir/program.mem + image.mem → run_dir/output_image.mem.
+
+    Returns True when the result was served from the cache."""
+    import sim_cache
+
+    program_mem = os.path.join(run_dir, "program.mem")
+    image_mem   = os.path.join(run_dir, "image.mem")
+    output_mem  = os.path.join(run_dir, "output_image.mem")
+    if cache_dir is not None:
+        key = sim_cache.cache_key(backend, program_mem, image_mem)
+        if sim_cache.lookup(key, output_mem, cache_dir) is not None:
+            log.write(f"[INFO] Cache hit {key[:12]}, simulation skipped\n")
+            return True
+
+    start = time.perf_counter()
+    with _sim_slots:
+        if backend == "iss":
+            import riscv_iss
+            with contextlib.redirect_stdout(log):
+                stats = riscv_iss.simulate(program_mem, image_mem, output_mem)
+            if not stats["halted"]:
+                raise RuntimeError("no completion marker")
+        else:
+            vivado_exe = find_vivado()
+            if vivado_exe is None:
+                raise RuntimeError(f"Vivado not found at '{VIVADO_PATH}'")
+            run_logged(vivado_cmd(vivado_exe, run_dir, plusargs),
+                       "Vivado batch simulation", log, cwd=PROJECT_ROOT)
+    if not os.path.exists(output_mem):
+        raise RuntimeError("output_image.mem was not produced")
+    if backend == "vivado" and not sim_completed(output_mem):
+        raise RuntimeError("no completion marker (simulation timed out, "
+                           "raise --sim-margin)")
+    if cache_dir is not None:
+        sim_cache.store(key, output_mem,
+                        {"backend": backend,
+                         "sim_time_s": time.perf_counter() - start,
+                         "run_dir": run_dir}, cache_dir)
+    return False
+
+def run_job(image, run_dir, backend, program_mem, cache_dir=None, packed=False,
+            size=None, plusargs=()):
+    """Run one image through the pipeline inside run_dir; never raises."""
+    import img_to_mem
+    import mem_to_img
+
+    record = {"image": image, "run_dir": run_dir, "backend": backend,
+              "status": "ok", "error": None, "wall_time_s": None,
+              "stage_s": {}, "edge_pixels": None, "cached": False}
+    start = time.perf_counter()
+
+    def stage(name, since):
+        record["stage_s"][name] = round(time.perf_counter() - since, 4)
+        return time.perf_counter()
+
+    frame_size = size or (None, None)
+    os.makedirs(run_dir, exist_ok=True)
+    image_mem  = os.path.join(run_dir, "image.mem")
+    output_mem = os.path.join(run_dir, "output_image.mem")
+    output_png = os.path.join(run_dir, "edge_detected_output.png")
+
+    if os.path.exists(output_mem):
+        os.remove(output_mem)       # never report a previous run's result
+
+    with open(os.path.join(run_dir, "pipeline.log"), "w") as log:
+        try:
+            shutil.copy(program_mem, os.path.join(run_dir, "program.mem"))
+            t = time.perf_counter()
+            run_logged_inline(img_to_mem.img_to_mem,
+                              "Image → image.mem conversion", log,
+                              image, image_mem, packed, *frame_size)
+            t = stage("img_to_mem", t)
+
+            record["cached"] = simulate_in(run_dir, backend, log, cache_dir,
+                                           plusargs)
+            t = stage("simulate", t)
+            run_logged_inline(mem_to_img.mem_to_img,
+                              "output_image.mem → edge PNG", log,
+                              output_mem, output_png, packed, *frame_size)
+            stage("mem_to_img", t)
+            record["edge_pixels"] = count_edges(output_mem, packed, size)
+        except Exception as e:
+            record["status"] = "failed"
+            record["error"] = str(e)
+            log.write(f"[ERROR] {e}\n")
+
+    record["wall_time_s"] = round(time.perf_counter() - start, 4)
+    return record
+
+def run_batch(images, args):
+    program_mem = os.path.abspath(args.program)
+    check_file(program_mem, "program.mem (run scripts/generate_program_mem.py)")
+    if args.backend == "vivado":
+        check_file(TCL_SCRIPT, "run_sim.tcl")
+
+    out_dir = os.path.abspath(args.out_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    stem_width = len(str(len(images)))
+    jobs = [(img, os.path.join(out_dir, f"{i:0{stem_width}d}_"
+                               f"{os.path.splitext(os.path.basename(img))[0]}"))
+            for i, img in enumerate(images)]
+
+    banner(f"BATCH: {len(images)} images, {args.jobs} workers, "
+           f"{args.sim_jobs} simulator slots ({args.backend})")
+    sim_slots = multiprocessing.BoundedSemaphore(args.sim_jobs)
+    start = time.perf_counter()
+    records = []
+    with ProcessPoolExecutor(max_workers=args.jobs, initializer=_init_worker,
+                             initargs=(sim_slots,)) as pool:
+        futures = [pool.submit(run_job, img, run_dir, args.backend,
+                               program_mem, args.cache_dir, args.packed,
+                               args.size, args.plusargs)
+                   for img, run_dir in jobs]
+        for future in as_completed(futures):
+            rec = future.result()
+            records.append(rec)
+            tag = "[OK]  " if rec["status"] == "ok" else "[FAIL]"
+            detail = (f"{rec['edge_pixels']} edge pixels"
+                      f"{' (cached)' if rec['cached'] else ''}"
+                      if rec["status"] == "ok" else rec["error"])
+            print(f"{tag} ({len(records)}/{len(jobs)}) "
+                  f"{os.path.basename(rec['image'])}: {detail} "
+                  f"[{rec['wall_time_s']:.3f} s]")
+
+    elapsed = time.perf_counter() - start
+    order = {img: i for i, (img, _) in enumerate(jobs)}
+    records.sort(key=lambda r: order[r["image"]])
+    failed = sum(1 for r in records if r["status"] != "ok")
+    cached = sum(1 for r in records if r["cached"])
+
+    manifest = os.path.join(out_dir, "manifest.json")
+    with open(manifest, "w") as f:
+        json.dump({"backend": args.backend, "program": program_mem,
+                   "packed": args.packed, "size": args.size,
+                   "jobs": args.jobs, "sim_jobs": args.sim_jobs,
+                   "wall_time_s": round(elapsed, 4),
+                   "images": len(records), "failed": failed,
+                   "cached": cached,
+                   "results": records}, f, indent=2)
+
+    banner("BATCH COMPLETE")
+    print(f"  Images:    {len(records)}  ({failed} failed, {cached} cached)")
+    print(f"  Wall time: {elapsed:.2f} s  "
+          f"({len(records) / elapsed:.1f} images/s)")
+    print(f"  Manifest:  {manifest}")
+    return failed
+
+# -------------------------------------------------------
+# TILED MODE — full-resolution image as halo-overlapped 32x32 tiles
+# -------------------------------------------------------
+def run_tile(tile_dir, backend, program_mem, cache_dir=None, plusargs=()):
+    """Simulate one tile directory (image.mem already written); never raises."""
+    output_mem = os.path.join(tile_dir, "output_image.mem")
+    try:
+        if os.path.exists(output_mem):
+            os.remove(output_mem)   # never stitch a previous frame's tile
+        shutil.copy(program_mem, os.path.join(tile_dir, "program.mem"))
+        with open(os.path.join(tile_dir, "pipeline.log"), "w") as log:
+            simulate_in(tile_dir, backend, log, cache_dir, plusargs)
+        return None
+    except Exception as e:
+        return str(e)
+
+def run_tiled(image, args):
+    import img_to_mem
+    import mem_to_img
+    from PIL import Image
+
+    program_mem = os.path.abspath(args.program)
+    check_file(program_mem, "program.mem (run scripts/generate_program_mem.py)")
+    check_file(image, "Input image")
+    stem = os.path.splitext(os.path.basename(image))[0]
+    tiles_dir = os.path.join(os.path.abspath(args.out_dir or TILES_DIR), stem)
+    output_png = os.path.join(PROJECT_ROOT, "output", f"{stem}_edges.png")
+    os.makedirs(tiles_dir, exist_ok=True)
+
+    src = Image.open(image).convert("L")
+    canvas = Image.new("L", src.size)
+    rows, cols = img_to_mem.tile_grid(*src.size)
+    total = rows * cols
+    banner(f"TILED: {os.path.basename(image)} {src.size[0]}x{src.size[1]} → "
+           f"{total} tiles, {args.jobs} workers ({args.backend})")
+
+    # Tiles are cut lazily and at most `window` are in flight, so neither
+    # the tile images nor their results pile up in memory.
+    window = args.jobs * 4
+    pending, tiles, failed, done = {}, [], 0, 0
+    start = time.perf_counter()
+
+    def drain(block_all):
+        nonlocal failed, done
+        while pending and (block_all or len(pending) >= window):
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                tile_dir, y, x = pending.pop(future)
+                error = future.result()
+                done += 1
+                if error is None:
+                    mem_to_img.paste_tile(
+                        canvas,
+                        mem_to_img.read_pixels(
+                            os.path.join(tile_dir, "output_image.mem")),
+                        y, x, img_to_mem.TILE, img_to_mem.HALO)
+                    if not args.keep_tiles:
+                        shutil.rmtree(tile_dir, ignore_errors=True)
+                else:
+                    failed += 1
+                    print(f"[FAIL] {os.path.basename(tile_dir)}: {error}")
+                if done % max(1, total // 10) == 0 or done == total:
+                    print(f"[INFO] {done}/{total} tiles")
+
+    sim_slots = multiprocessing.BoundedSemaphore(args.sim_jobs)
+    with ProcessPoolExecutor(max_workers=args.jobs, initializer=_init_worker,
+                             initargs=(sim_slots,)) as pool:
+        for r, c, y, x, tile in img_to_mem.iter_tiles(src):
+            name = f"tile_{r:03d}_{c:03d}"
+            tile_dir = os.path.join(tiles_dir, name)
+            os.makedirs(tile_dir, exist_ok=True)
+            img_to_mem.write_pixels(tile.tobytes(),
+                                    os.path.join(tile_dir, "image.mem"))
+            tiles.append({"row": r, "col": c, "y": y, "x": x, "dir": name})
+            future = pool.submit(run_tile, tile_dir, args.backend,
+                                 program_mem, args.cache_dir, args.plusargs)
+            pending[future] = (tile_dir, y, x)
+            drain(block_all=False)
+        drain(block_all=True)
+
+    elapsed = time.perf_counter() - start
+    canvas.save(output_png)
+    if args.keep_tiles:
+        img_to_mem.write_layout(tiles_dir, image, src.size, tiles)
+    else:
+        shutil.rmtree(tiles_dir, ignore_errors=True)
+
+    banner("TILED RUN COMPLETE")
+    print(f"  Tiles:      {total}  ({failed} failed)")
+    print(f"  Wall time:  {elapsed:.2f} s  ({total / elapsed:.1f} tiles/s)")
+    print(f"  Edge map:   {output_png}  ({src.size[0]}x{src.size[1]})")
+    if args.keep_tiles:
+        print(f"  Tiles kept: {tiles_dir}")
+    return failed
+
+# -------------------------------------------------------
+# STREAM MODE — frame sequence / video, only changed tiles re-simulated
+# -------------------------------------------------------
+VIDEO_EXTS  = (".mp4", ".avi", ".mov", ".mkv", ".webm", ".m4v")
+STREAM_DIR  = os.path.join(PROJECT_ROOT, "output", "stream")
+
+def stream_sources(inputs):
+    """Frame sources in order: image files, and video files as whole entries."""
+    sources = []
+    for item in inputs:
+        if os.path.isfile(item) and item.lower().endswith(VIDEO_EXTS):
+            sources.append(os.path.abspath(item))
+        else:
+            sources += expand_inputs([item])
+    return sources
+
+def decode_frames(sources):
+    """Yield (label, grayscale PIL image) for every frame of every source."""
+    from PIL import Image
+
+    for path in sources:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        if not path.lower().endswith(VIDEO_EXTS):
+            yield stem, Image.open(path).convert("L")
+            continue
+        try:
+            import cv2
+        except ImportError:
+            sys.exit("[ERROR] OpenCV not installed (needed for video input). "
+                     "Run: pip install opencv-python")
+        video = cv2.VideoCapture(path)
+        if not video.isOpened():
+            sys.exit(f"[ERROR] Cannot open video: '{path}'")
+        index = 0
+        while True:
+            ok, frame = video.read()
+            if not ok:
+                break
+            yield (f"{stem}_{index:05d}",
+                   Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)))
+            index += 1
+        video.release()
+
+def prefetch(frames, depth=2):
+    """Decode frames on a background thread, at most depth ahead.
+
+    The next frame is read and converted while the current one is being
+    simulated; decode errors (including sys.exit) are re-raised here."""
+    import queue
+    import threading
+
+    slots, done = queue.Queue(maxsize=depth), object()
+
+    def producer():
+        try:
+            for item in frames:
+                slots.put(item)
+        except BaseException as e:
+            slots.put(e)
+        slots.put(done)
+
+    threading.Thread(target=producer, daemon=True).start()
+    while True:
+        item = slots.get()
+        if item is done:
+            return
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+
+def dirty_tiles(prev, cur, rows, cols):
+    """(row, col) of tiles whose 32x32 input window (interior plus halo)
+    differs between two same-size frames; prev=None marks every tile."""
+    import numpy as np
+    import img_to_mem
+
+    if prev is None:
+        return [(r, c) for r in range(rows) for c in range(cols)]
+    changed = np.asarray(prev) != np.asarray(cur)
+    # 2-D prefix sums of the change mask: each window test is O(1); the
+    # zero padding past the image edge never changes, so windows are clipped
+    sums = np.zeros((changed.shape[0] + 1, changed.shape[1] + 1), np.int64)
+    sums[1:, 1:] = changed.cumsum(0).cumsum(1)
+    height, width = changed.shape
+    tiles = []
+    for r in range(rows):
+        for c in range(cols):
+            y, x = r * img_to_mem.STRIDE, c * img_to_mem.STRIDE
+            y1, x1 = min(y + img_to_mem.TILE, height), min(x + img_to_mem.TILE, width)
+            if sums[y1, x1] - sums[y, x1] - sums[y1, x] + sums[y, x]:
+                tiles.append((r, c))
+    return tiles
+
+def run_stream(sources, args):
+    import img_to_mem
+    import mem_to_img
+    from PIL import Image
+
+    program_mem = os.path.abspath(args.program)
+    check_file(program_mem, "program.mem (run scripts/generate_program_mem.py)")
+    out_dir = os.path.abspath(args.out_dir or STREAM_DIR)
+    tiles_dir = os.path.join(out_dir, "tiles")
+    os.makedirs(tiles_dir, exist_ok=True)
+
+    banner(f"STREAM: {len(sources)} source(s), {args.jobs} workers "
+           f"({args.backend})")
+    # A tile output depends only on its input window and the program, so a
+    # tile whose window is unchanged keeps its previous output; tiles that
+    # failed are forced dirty on the next frame.
+    prev, canvas, stale = None, None, set()
+    records, failed = [], 0
+    tiles_total = tiles_run = 0
+    start = time.perf_counter()
+
+    sim_slots = multiprocessing.BoundedSemaphore(args.sim_jobs)
+    with ProcessPoolExecutor(max_workers=args.jobs, initializer=_init_worker,
+                             initargs=(sim_slots,)) as pool:
+        for label, frame in prefetch(decode_frames(sources)):
+            t0 = time.perf_counter()
+            rows, cols = img_to_mem.tile_grid(*frame.size)
+            if prev is not None and prev.size != frame.size:
+                print(f"[WARN] {label}: size changed to "
+                      f"{frame.size[0]}x{frame.size[1]}, recomputing all tiles")
+                prev, stale = None, set()
+            if prev is None:
+                canvas = Image.new("L", frame.size)
+            dirty = sorted(set(dirty_tiles(prev, frame, rows, cols)) | stale)
+
+            futures = {}
+            for r, c in dirty:
+                y, x = r * img_to_mem.STRIDE, c * img_to_mem.STRIDE
+                tile_dir = os.path.join(tiles_dir, f"tile_{r:03d}_{c:03d}")
+                os.makedirs(tile_dir, exist_ok=True)
+                img_to_mem.write_pixels(
+                    frame.crop((x, y, x + img_to_mem.TILE,
+                                y + img_to_mem.TILE)).tobytes(),
+                    os.path.join(tile_dir, "image.mem"))
+                futures[pool.submit(run_tile, tile_dir, args.backend,
+                                    program_mem, args.cache_dir,
+                                    args.plusargs)] = (r, c, y, x)
+            stale = set()
+            for future in as_completed(futures):
+                r, c, y, x = futures[future]
+                error = future.result()
+                if error is None:
+                    mem_to_img.paste_tile(
+                        canvas,
+                        mem_to_img.read_pixels(os.path.join(
+                            tiles_dir, f"tile_{r:03d}_{c:03d}",
+                            "output_image.mem")),
+                        y, x, img_to_mem.TILE, img_to_mem.HALO)
+                else:
+                    stale.add((r, c))
+                    print(f"[FAIL] {label} tile {r},{c}: {error}")
+
+            output_png = os.path.join(out_dir, f"{label}_edges.png")
+            canvas.save(output_png)
+            prev = frame
+            total = rows * cols
+            tiles_total += total
+            tiles_run += len(dirty)
+            failed += len(stale)
+            wall = time.perf_counter() - t0
+            records.append({"frame": label, "size": list(frame.size),
+                            "tiles": total, "recomputed": len(dirty),
+                            "failed": len(stale),
+                            "wall_time_s": round(wall, 4),
+                            "output": output_png})
+            tag = "[OK]  " if not stale else "[FAIL]"
+            print(f"{tag} {label}: "
+                  f"{len(dirty)}/{total} tiles recomputed [{wall:.3f} s]")
+
+    elapsed = time.perf_counter() - start
+    if not args.keep_tiles:
+        shutil.rmtree(tiles_dir, ignore_errors=True)
+    if not records:
+        sys.exit("[ERROR] No frames decoded")
+    skipped = 1 - tiles_run / tiles_total
+    manifest = os.path.join(out_dir, "stream.json")
+    with open(manifest, "w") as f:
+        json.dump({"backend": args.backend, "program": program_mem,
+                   "jobs": args.jobs, "sim_jobs": args.sim_jobs,
+                   "wall_time_s": round(elapsed, 4),
+                   "frames": len(records),
+                   "fps": round(len(records) / elapsed, 3),
+                   "tiles": tiles_total, "recomputed": tiles_run,
+                   "skipped_fraction": round(skipped, 4),
+                   "failed_tiles": failed,
+                   "results": records}, f, indent=2)
+
+    banner("STREAM COMPLETE")
+    print(f"  Frames:        {len(records)}  ({failed} failed tiles)")
+    print(f"  Wall time:     {elapsed:.2f} s  "
+          f"({len(records) / elapsed:.2f} frames/s sustained)")
+    print(f"  Tiles skipped: {tiles_total - tiles_run}/{tiles_total}  "
+          f"({skipped:.1%})")
+    print(f"  Edge maps:     {out_dir}")
+    print(f"  Manifest:      {manifest}")
+    return failed
+
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python scripts/run_pipeline.py <input_image.png>")
-        sys.exit(1)
+    import sim_cache
+
+    parser = argparse.ArgumentParser(
+        description="image -> .mem -> simulation -> edge PNG")
+    parser.add_argument("inputs", nargs="+",
+                        help="input image(s), directories or glob patterns")
+    parser.add_argument("--backend", choices=("vivado", "iss"),
+                        default="vivado",
+                        help="simulation backend (default: vivado)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="batch worker processes (default: CPU count)")
+    parser.add_argument("--sim-jobs", type=int, default=None,
+                        help="max concurrent simulator runs in batch mode "
+                             "(default: 1 for vivado, which shares one xsim "
+                             "directory per project; --jobs for iss)")
+    parser.add_argument("--out-dir", default=None,
+                        help="batch run directories + manifest.json "
+                             "(default: output/runs), tile directories "
+                             "with --tile (default: output/tiles), or edge "
+                             "maps + stream.json with --stream "
+                             "(default: output/stream)")
+    parser.add_argument("--tile", action="store_true",
+                        help="process at full resolution as 32x32 tiles")
+    parser.add_argument("--stream", action="store_true",
+                        help="treat the inputs as one frame sequence (images "
+                             "in order and/or videos) and re-simulate only "
+                             "the tiles that changed since the last frame")
+    parser.add_argument("--keep-tiles", action="store_true",
+                        help="keep per-tile directories and tiles.json")
+    parser.add_argument("--packed", action="store_true",
+                        help="64x64 frames, 4 pixels per word (run with "
+                             "generate_program_mem.py --packed)")
+    parser.add_argument("--width", type=int, default=None,
+                        help="frame width (needs a program generated with "
+                             "the same --width; default 32, 64 packed)")
+    parser.add_argument("--height", type=int, default=None,
+                        help="frame height (default 32, 64 packed)")
+    parser.add_argument("--program", default=PROGRAM_MEM,
+                        help="program.mem copied into each batch run")
+    parser.add_argument("--vcd", action="store_true",
+                        help="vivado: dump riscv_pipeline_wave.vcd (tb +VCD)")
+    parser.add_argument("--trace", action="store_true",
+                        help="vivado: per-cycle CYC trace in simulate.log "
+                             "(tb +TRACE)")
+    parser.add_argument("--sim-margin", type=float, default=SIM_MARGIN,
+                        help="vivado: tb cycle budget as a multiple of the "
+                             "cycle model's count (default: %(default)g)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always simulate; do not read or write the cache")
+    parser.add_argument("--cache-dir", default=None,
+                        help="result cache directory (default: output/cache)")
+    parser.add_argument("--cache-mb", type=float,
+                        default=sim_cache.DEFAULT_MAX_MB,
+                        help="cache size bound in MB (default: %(default)g)")
+    args = parser.parse_args()
+    tiled = args.tile or args.stream
+    if args.packed and tiled:
+        parser.error("--packed cannot be combined with --tile or --stream")
+    args.size = None
+    if args.width or args.height:
+        if tiled:
+            parser.error("--tile and --stream always use 32x32 tiles")
+        default = 64 if args.packed else 32
+        args.size = (args.width or default, args.height or default)
+
+    batch = len(args.inputs) > 1 or any(
+        os.path.isdir(p) or glob.has_magic(p) for p in args.inputs)
+    args.program = os.path.abspath(args.program)
+    if tiled:
+        import img_to_mem
+        tile = (img_to_mem.TILE, img_to_mem.TILE)
+        check_program(args.program, tile, False,
+                      f"--tile / --stream run {tile[0]}x{tile[1]} tiles")
+    else:
+        default = 64 if args.packed else 32
+        size = args.size or (default, default)
+        check_program(args.program, size, args.packed,
+                      f"the frame is {size[0]}x{size[1]}"
+                      f"{' packed' if args.packed else ''}")
+    args.plusargs = []
+    if args.backend == "vivado":
+        args.plusargs = sim_plusargs(args.program, args.sim_margin, args.vcd,
+                                     args.trace)
+        if args.vcd or args.trace:
+            args.no_cache = True    # a cache hit would skip the dump
+    args.cache_dir = None if args.no_cache else \
+        os.path.abspath(args.cache_dir or sim_cache.CACHE_DIR)
+    cache_bytes = int(args.cache_mb * 2**20)
+
+    if args.stream:
+        sources = stream_sources(args.inputs)
+        if not sources:
+            sys.exit("[ERROR] No input frames found")
+        args.jobs = max(1, args.jobs)
+        if args.sim_jobs is None:
+            args.sim_jobs = 1 if args.backend == "vivado" else args.jobs
+        args.sim_jobs = max(1, args.sim_jobs)
+        failed = run_stream(sources, args)
+        if args.cache_dir is not None:
+            sim_cache.evict(cache_bytes, args.cache_dir)
+        sys.exit(1 if failed else 0)
+
+    if batch or args.tile:
+        images = expand_inputs(args.inputs) if batch else \
+            [os.path.abspath(args.inputs[0])]
+        if not images:
+            sys.exit("[ERROR] No input images found")
+        args.jobs = max(1, args.jobs if args.tile else min(args.jobs, len(images)))
+        if args.sim_jobs is None:
+            args.sim_jobs = 1 if args.backend == "vivado" else args.jobs
+        args.sim_jobs = max(1, args.sim_jobs)
+        if args.tile:
+            failed = sum(run_tiled(img, args) for img in images)
+        else:
+            args.out_dir = args.out_dir or RUNS_DIR
+            failed = run_batch(images, args)
+        if args.cache_dir is not None:
+            sim_cache.evict(cache_bytes, args.cache_dir)
+        sys.exit(1 if failed else 0)
 
-    input_image = os.path.abspath(sys.argv[1])
+    input_image = os.path.abspath(args.inputs[0])
     check_file(input_image, "Input image")
 
     # Ensure output directory exists
@@ -68,42 +895,33 @@ def main():
     # -------------------------------------------------------
     # STEP 1: Convert image → image.mem
     # -------------------------------------------------------
-    run_step(
-        [sys.executable, IMG_TO_MEM, input_image, INPUT_MEM],
-        "Image → image.mem conversion"
-    )
+    import img_to_mem
+    import mem_to_img
+
+    frame_size = args.size or (None, None)
+    run_inline(img_to_mem.img_to_mem, "Image → image.mem conversion",
+               input_image, INPUT_MEM, args.packed, *frame_size)
     check_file(INPUT_MEM, "image.mem (output of step 1)")
 
     # -------------------------------------------------------
-    # STEP 2: Run Vivado simulation in batch mode
+    # STEP 2: Run simulation (Vivado batch mode or functional ISS)
     # -------------------------------------------------------
-    check_file(TCL_SCRIPT, "run_sim.tcl")
-
-    vivado_exe = shutil.which(VIVADO_PATH) or VIVADO_PATH
-    if not shutil.which(vivado_exe):
-        print(f"[WARN] Vivado not found at '{vivado_exe}'.")
-        print("       Skipping simulation step. You can run manually:")
-        print(f"         vivado -mode batch -source {TCL_SCRIPT}")
-    else:
-        run_step(
-            [vivado_exe, "-mode", "batch", "-source", TCL_SCRIPT,
-             "-nojournal", "-nolog"],
-            "Vivado batch simulation",
-            cwd=PROJECT_ROOT
-        )
+    run_simulation(args.backend, args.cache_dir, args.plusargs, args.program)
+    if args.cache_dir is not None:
+        sim_cache.evict(cache_bytes, args.cache_dir)
 
     # -------------------------------------------------------
     # STEP 3: Convert output_image.mem → edge PNG
     # -------------------------------------------------------
     check_file(OUTPUT_MEM, "output_image.mem (output of simulation)")
 
-    run_step(
-        [sys.executable, MEM_TO_IMG, OUTPUT_MEM, OUTPUT_PNG],
-        "output_image.mem → edge PNG"
-    )
+    run_inline(mem_to_img.mem_to_img, "output_image.mem → edge PNG",
+               OUTPUT_MEM, OUTPUT_PNG, args.packed, *frame_size)
 
     banner("ALL STEPS COMPLETE")
     print(f"  Input image:       {input_image}")
+    print(f"  Backend:           {args.backend}")
+    print(f"  Program:           {args.program}")
     print(f"  Simulation input:  {INPUT_MEM}")
     print(f"  Simulation output: {OUTPUT_MEM}")
     print(f"  Edge result PNG:   {OUTPUT_PNG}")
@@ -4,6 +4,18 @@
 #
 # Usage from terminal:
 #   vivado -mode batch -source run_sim.tcl
+#   vivado -mode batch -source run_sim.tcl -tclargs <run_dir>
+#   vivado -mode batch -source run_sim.tcl -tclargs [<run_dir>] +MAX_CYCLES=N +VCD +TRACE
+#
+# With a run directory (used by run_pipeline.py batch mode), image.mem and
+# program.mem are taken from <run_dir> and output_image.mem is copied back
+# there instead of output/.
+#
+# Arguments starting with '+' are passed to tb_RISCV_Pipeline as plusargs:
+# +MAX_CYCLES=N bounds the run (run_pipeline.py sets it from the cycle model
+# with a safety margin), +VCD and +TRACE turn on the waveform dump and the
+# per-cycle trace. The simulation runs until the testbench finishes, which
+# it does right after the completion marker store.
 #
 # Adjust PROJECT_DIR and PROJECT_NAME to match your Vivado project.
 # =============================================================
@@ -14,7 +26,17 @@
 set PROJECT_DIR  "C:/Users/hridd/VISOR"           ;# Folder containing your .xpr
 set PROJECT_NAME "VISOR"                           ;# Your Vivado project name (without .xpr)
 set SIM_TOP      "tb_RISCV_Pipeline"               ;# Top-level testbench module name
-set SIM_RUNTIME  "4ms"                             ;# Simulation runtime - enough for full Sobel
+
+# Optional per-run directory and tb plusargs passed with -tclargs
+set RUN_DIR ""
+set PLUSARGS {}
+foreach arg $argv {
+    if {[string index $arg 0] eq "+"} {
+        lappend PLUSARGS [string range $arg 1 end]
+    } elseif {$arg ne ""} {
+        set RUN_DIR [file normalize $arg]
+    }
+}
 
 # -------------------------------------------------------
 # Open the project
@@ -36,13 +58,29 @@ open_project $XPR_FILE
 set_property top            $SIM_TOP  [get_filesets sim_1]
 set_property top_lib        xil_defaultlib [get_filesets sim_1]
 
+# Plusargs for the tb, and no all-signal waveform database unless +VCD asks
+# for waveforms
+set xsim_opts {}
+foreach plusarg $PLUSARGS {
+    lappend xsim_opts -testplusarg $plusarg
+}
+set_property -name {xsim.simulate.xsim.more_options} -value $xsim_opts \
+    -objects [get_filesets sim_1]
+set_property -name {xsim.simulate.log_all_signals} \
+    -value [expr {[lsearch -exact $PLUSARGS VCD] >= 0}] \
+    -objects [get_filesets sim_1]
+
 # Ensure memory files are found in the sim run directory
 # Copy .mem files to the simulation working directory
 set sim_run_dir [file join $PROJECT_DIR "${PROJECT_NAME}.sim" "sim_1" "behav" "xsim"]
 
 # Copy image.mem from output/ and program.mem from mem/ to sim working dir
+# (both from RUN_DIR when one was given)
 foreach {mem_file src_subdir} {image.mem output program.mem mem} {
     set src [file join $PROJECT_DIR $src_subdir $mem_file]
+    if {$RUN_DIR ne ""} {
+        set src [file join $RUN_DIR $mem_file]
+    }
     if {[file exists $src]} {
         file copy -force $src $sim_run_dir
         puts "\[INFO\]  Copied $src_subdir/$mem_file → $sim_run_dir"
@@ -54,10 +92,16 @@ foreach {mem_file src_subdir} {image.mem output program.mem mem} {
 # -------------------------------------------------------
 # Launch, run, and close the simulation
 # -------------------------------------------------------
-puts "\[INFO\]  Launching simulation (runtime: $SIM_RUNTIME) ..."
+set shown "none"
+if {[llength $PLUSARGS] > 0} {
+    set shown [join $PLUSARGS " "]
+}
+puts "\[INFO\]  Launching simulation (plusargs: $shown) ..."
 launch_simulation -mode behavioral
 
-run $SIM_RUNTIME
+# The tb ends itself ($finish) at the completion marker or after its
+# +MAX_CYCLES budget
+run all
 
 puts "\[INFO\]  Simulation complete."
 
@@ -66,6 +110,9 @@ puts "\[INFO\]  Simulation complete."
 # -------------------------------------------------------
 set output_mem [file join $sim_run_dir "output_image.mem"]
 set output_dir [file join $PROJECT_DIR "output"]
+if {$RUN_DIR ne ""} {
+    set output_dir $RUN_DIR
+}
 file mkdir $output_dir
 if {[file exists $output_mem]} {
     file copy -force $output_mem $output_dir
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+sim_cache.py
+Content-addressed cache of simulation results for run_pipeline.py.
+
+The key is a SHA-256 over the backend name, program.mem, image.mem and the
+sources that determine the simulator's behaviour:
+    vivado  - every .v under rtl/, sim/ and VISOR.srcs/, plus run_sim.tcl
+    iss     - riscv_iss.py, custom_ops.py and the op files in $VISOR_CUSTOM_OPS
+Each entry is a directory <cache>/<key[:2]>/<key>/ holding output_image.mem
+and meta.json (inputs, creation and last-use time, simulation wall time).
+Entries are published with an atomic rename, so concurrent batch workers
+can share one cache. evict() trims the cache to a byte budget, least
+recently used first.
+
+Usage: python sim_cache.py [--cache-dir DIR] stats
+       python sim_cache.py [--cache-dir DIR] evict --max-mb N
+       python sim_cache.py [--cache-dir DIR] clear
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+
+SCRIPT_DIR   = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+
+CACHE_DIR      = os.path.join(PROJECT_ROOT, "output", "cache")
+DEFAULT_MAX_MB = 512
+
+SIM_SOURCES = {
+    "vivado": (["rtl", "sim", "VISOR.srcs"], [os.path.join("scripts", "run_sim.tcl")]),
+    "iss":    ([], [os.path.join("scripts", "riscv_iss.py"),
+                    os.path.join("scripts", "custom_ops.py")]),
+}
+
+def custom_op_files():
+    """Extension op files custom_ops.load_extensions() executes."""
+    return [os.path.abspath(p) for p in
+            os.environ.get("VISOR_CUSTOM_OPS", "").split(os.pathsep) if p]
+
+_source_digests = {}
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def source_digest(backend):
+    """Digest of the simulator sources for backend (computed once)."""
+    if backend not in _source_digests:
+        dirs, files = SIM_SOURCES[backend]
+        named = [(f, os.path.join(PROJECT_ROOT, f)) for f in files]
+        for d in dirs:
+            for root, _, names in os.walk(os.path.join(PROJECT_ROOT, d)):
+                named += [(os.path.relpath(os.path.join(root, n), PROJECT_ROOT),
+                           os.path.join(root, n))
+                          for n in names if n.endswith(".v")]
+        if backend == "iss":
+            # Extension files can live anywhere (on Windows even on another
+            # drive than the repo), so they are named by basename only
+            named += [(os.path.basename(p), p) for p in custom_op_files()]
+        h = hashlib.sha256()
+        for name, path in sorted(n for n in named if os.path.exists(n[1])):
+            h.update(name.replace(os.sep, "/").encode())
+            h.update(file_digest(path).encode())
+        _source_digests[backend] = h.hexdigest()
+    return _source_digests[backend]
+
+def cache_key(backend, program_mem, image_mem):
+    h = hashlib.sha256(backend.encode())
+    for part in (file_digest(program_mem), file_digest(image_mem),
+                 source_digest(backend)):
+        h.update(part.encode())
+    return h.hexdigest()
+
+def entry_dir(key, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, key[:2], key)
+
+def lookup(key, output_mem, cache_dir=CACHE_DIR):
+    """Copy a cached output_image.mem to output_mem; meta dict or None."""
+    entry = entry_dir(key, cache_dir)
+    meta_path = os.path.join(entry, "meta.json")
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        shutil.copy(os.path.join(entry, "output_image.mem"), output_mem)
+        os.utime(meta_path)                 # mtime = last use, for LRU
+    except (OSError, ValueError):
+        return None
+    return meta
+
+def store(key, output_mem, meta, cache_dir=CACHE_DIR):
+    """Add output_mem under key; a concurrent identical store is harmless."""
+    entry = entry_dir(key, cache_dir)
+    if os.path.exists(entry):
+        return
+    tmp = f"{entry}.tmp{os.getpid()}"
+    os.makedirs(tmp, exist_ok=True)
+    shutil.copy(output_mem, os.path.join(tmp, "output_image.mem"))
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump(dict(meta, key=key, created=time.time()), f, indent=1)
+    try:
+        os.rename(tmp, entry)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def entries(cache_dir=CACHE_DIR):
+    """[(last_use, bytes, path)] for every complete entry."""
+    found = []
+    if not os.path.isdir(cache_dir):
+        return found
+    for shard in os.listdir(cache_dir):
+        shard_dir = os.path.join(cache_dir, shard)
+        if not os.path.isdir(shard_dir):
+            continue
+        for name in os.listdir(shard_dir):
+            path = os.path.join(shard_dir, name)
+            try:
+                used = os.path.getmtime(os.path.join(path, "meta.json"))
+                size = sum(os.path.getsize(os.path.join(path, f))
+                           for f in os.listdir(path))
+            except OSError:
+                continue                    # in-flight .tmp or removed
+            found.append((used, size, path))
+    return found
+
+def evict(max_bytes, cache_dir=CACHE_DIR):
+    """Drop least recently used entries until the cache fits max_bytes."""
+    found = sorted(entries(cache_dir))
+    total = sum(size for _, size, _ in found)
+    removed = 0
+    for _, size, path in found:
+        if total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        removed += 1
+    return removed, total
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulation result cache")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("stats", help="entry count and size")
+    p_evict = sub.add_parser("evict", help="trim to a size budget (LRU)")
+    p_evict.add_argument("--max-mb", type=float, default=DEFAULT_MAX_MB)
+    sub.add_parser("clear", help="remove every entry")
+    args = parser.parse_args()
+
+    if args.cmd == "stats":
+        found = entries(args.cache_dir)
+        size = sum(s for _, s, _ in found)
+        print(f"[INFO] {args.cache_dir}: {len(found)} entries, "
+              f"{size / 2**20:.2f} MB")
+    elif args.cmd == "evict":
+        removed, size = evict(int(args.max_mb * 2**20), args.cache_dir)
+        print(f"[OK]   Evicted {removed} entries, {size / 2**20:.2f} MB left")
+    else:
+        shutil.rmtree(args.cache_dir, ignore_errors=True)
+        print(f"[OK]   Cleared '{args.cache_dir}'")
+
+if __name__ == "__main__":
+    main()
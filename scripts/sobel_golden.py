@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+sobel_golden.py
+Vectorized NumPy golden model of the ReRAM_Accelerator Sobel datapath
+(rtl/MAC_Cell.v), applied to whole stacks of frames in one array operation:
+    MAC_Cell     - zero-extended 8-bit pixel x signed 8-bit weight
+    AdderTree9   - signed sum of the 9 products (Gx and Gy)
+    edge         - |Gx| + |Gy|, saturated to 255
+    border       - 1-pixel frame left at 0 by the zero-fill loop of
+                   generate_program_mem.py, except the last word, which
+                   holds the 0xDEADBEEF completion marker (low byte 0xEF)
+
+Diffs the golden result against one or many output_image.mem files and
+reports the mismatching pixel coordinates.
+
+--stale-x18 models the stock generate_program_mem.py schedule, where the
+CUSTOM instruction issues right behind "lw x18" and so sees the previous
+window's bottom-right pixel (see riscv_iss.py).
+
+--packed reads 64x64 frames stored 4 pixels per word (img_to_mem.py --packed,
+generate_program_mem.py --packed); the marker word then covers the last 4
+pixels of the bottom row.
+
+--width/--height check another frame size: IMAGE.mem holds it from word 0,
+OUTPUT.mem at the end of its 1024 words (see mem_codec.output_frame).
+
+Usage: python sobel_golden.py IMAGE.mem OUTPUT.mem [IMAGE.mem OUTPUT.mem ...]
+                              [--stale-x18] [--packed] [--width W] [--height H]
+                              [--max-report N]
+"""
+
+import sys
+import argparse
+
+try:
+    import numpy as np
+except ImportError:
+    sys.exit("[ERROR] NumPy not installed. Run: pip install numpy")
+
+from mem_codec import (FRAME_WORDS, PACK, PACKED_WIDTH, frame_words,
+                       load_words, output_frame, unpack_pixels)
+from riscv_iss import SOBEL_GX, SOBEL_GY, MARKER_VALUE
+
+WIDTH  = 32
+HEIGHT = 32
+
+# Kernels as 3x3 arrays, row-major p00..p22
+GX = np.array(SOBEL_GX, dtype=np.int32).reshape(3, 3)
+GY = np.array(SOBEL_GY, dtype=np.int32).reshape(3, 3)
+CLAMP = 255                     # edge saturation of the accelerator output
+
+def taps(frames):
+    """(N, H, W) pixels -> 3x3 nested list of (N, H-2, W-2) int32 tap planes."""
+    frames = np.asarray(frames, dtype=np.int32) & 0xFF
+    h, w = frames.shape[-2:]
+    return [[frames[..., r:h - 2 + r, c:w - 2 + c] for c in range(3)]
+            for r in range(3)]
+
+def gradient(p):
+    """Unclamped |Gx| + |Gy| of a 3x3 nested list of int32 tap arrays."""
+    # Zero weights drop out of the adder trees, so only 6 taps are summed
+    gx = sum(int(GX[r, c]) * p[r][c]
+             for r in range(3) for c in range(3) if GX[r, c])
+    gy = sum(int(GY[r, c]) * p[r][c]
+             for r in range(3) for c in range(3) if GY[r, c])
+    return np.abs(gx) + np.abs(gy)
+
+def edge(p):
+    """Accelerator result of 3x3 tap arrays: gradient() saturated to 255."""
+    return np.minimum(gradient(p), CLAMP)
+
+def sobel_golden(frames, stale_x18=False, packed=False):
+    """Edge image for a (H, W) frame or an (N, H, W) stack of frames."""
+    frames = np.asarray(frames)
+    single = frames.ndim == 2
+    if single:
+        frames = frames[np.newaxis]
+
+    p = taps(frames)
+    if stale_x18:
+        # p22 comes from the previous CUSTOM in raster order (x18 = 0 first)
+        n, h, w = p[2][2].shape
+        p22 = p[2][2].reshape(n, h * w)
+        p22 = np.concatenate([np.zeros((n, 1), np.int32), p22[:, :-1]], axis=1)
+        p[2][2] = p22.reshape(n, h, w)
+
+    out = np.zeros(frames.shape, dtype=np.uint8)
+    out[:, 1:-1, 1:-1] = edge(p)
+    if packed:
+        out[:, -1, -PACK:] = unpack_pixels(np.array([MARKER_VALUE]))
+    else:
+        out[:, -1, -1] = MARKER_VALUE & 0xFF
+    return out[0] if single else out
+
+def load_frames(paths, width=WIDTH, height=HEIGHT, packed=False, output=False):
+    """Stack of low-byte pixel frames from $readmemh-format or .bin files
+    (all 4 bytes of every word with packed). output=True takes each frame
+    from the end of a 1024-word output_image.mem instead of word 0."""
+    depth = FRAME_WORDS if output else frame_words(width, height, packed)
+    frames = np.zeros((len(paths), depth), dtype=np.uint32)
+    for i, path in enumerate(paths):
+        frames[i] = load_words(path, depth)
+    if output:
+        frames = output_frame(frames, width, height, packed)
+    pixels = unpack_pixels(frames) if packed else frames & 0xFF
+    return pixels.reshape(len(paths), height, width)
+
+def diff_frames(expected, actual):
+    """Per-frame list of (row, col) mismatch coordinate arrays."""
+    bad = np.asarray(expected) != np.asarray(actual)
+    frame, row, col = np.nonzero(bad)
+    split = np.searchsorted(frame, np.arange(1, bad.shape[0]))
+    return np.split(np.stack([row, col], axis=1), split)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="NumPy golden Sobel model and output_image.mem diff")
+    parser.add_argument("files", nargs="+",
+                        help="IMAGE.mem OUTPUT.mem pairs")
+    parser.add_argument("--stale-x18", action="store_true",
+                        help="model the stock program's stale x18 read")
+    parser.add_argument("--packed", action="store_true",
+                        help="4 pixels per word (64x64 frames by default)")
+    parser.add_argument("--width", type=int, default=None,
+                        help="frame width (default 32, 64 with --packed)")
+    parser.add_argument("--height", type=int, default=None,
+                        help="frame height (default 32, 64 with --packed)")
+    parser.add_argument("--max-report", type=int, default=10,
+                        help="mismatching pixels listed per file")
+    args = parser.parse_intermixed_args()
+
+    if len(args.files) % 2:
+        sys.exit("[ERROR] Expected IMAGE.mem OUTPUT.mem pairs")
+    images  = args.files[0::2]
+    outputs = args.files[1::2]
+
+    size = PACKED_WIDTH if args.packed else WIDTH
+    width, height = args.width or size, args.height or size
+    if frame_words(width, height, args.packed) > FRAME_WORDS:
+        sys.exit(f"[ERROR] {width}x{height} does not fit a {FRAME_WORDS}-word frame")
+    golden = sobel_golden(load_frames(images, width, height, args.packed),
+                          stale_x18=args.stale_x18, packed=args.packed)
+    actual = load_frames(outputs, width, height, args.packed, output=True)
+    failed = 0
+    for img, out, exp, act, coords in zip(images, outputs, golden, actual,
+                                          diff_frames(golden, actual)):
+        if len(coords) == 0:
+            print(f"[OK]   {out} matches golden ({img})")
+            continue
+        failed += 1
+        print(f"[FAIL] {out}: {len(coords)} mismatching pixels vs {img}")
+        for r, c in coords[:args.max_report]:
+            print(f"         ({r:2d}, {c:2d})  expected {exp[r, c]:3d}  "
+                  f"got {act[r, c]:3d}")
+
+    print(f"[INFO] {len(outputs) - failed}/{len(outputs)} outputs match")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+trace_index.py
+Single-pass indexed analyzer for the tb_RISCV_Pipeline simulate.log.
+
+The log is memory-mapped and every CYC / REGS / COMPLETION line is parsed
+exactly once into a sidecar index (<log>.idx.npz) holding, per line, its byte
+offset and the decoded CYC fields. The index is rebuilt only when the log's
+size or mtime changes. Queries (cycle range, PC, rd, store address, line
+kind) are vectorized filters over the index followed by seeks into the
+mapped log, so no question needs another pass over a multi-hundred-MB file.
+
+Usage: python trace_index.py [LOG] index
+       python trace_index.py [LOG] query [--cycles A:B] [--pc 0x64 ...]
+                                         [--rd 19] [--store-addr LO:HI]
+                                         [--kind cyc|regs|completion ...]
+                                         [--context B:A] [--limit N] [-o OUT]
+       python trace_index.py [LOG] pcs
+LOG defaults to VISOR.sim/sim_1/behav/xsim/simulate.log.
+"""
+
+import sys
+import os
+import re
+import mmap
+import argparse
+
+try:
+    import numpy as np
+except ImportError:
+    sys.exit("[ERROR] NumPy not installed. Run: pip install numpy")
+
+DEFAULT_LOG = os.path.join("VISOR.sim", "sim_1", "behav", "xsim", "simulate.log")
+
+KIND_CYC, KIND_REGS, KIND_COMPLETION = 0, 1, 2
+KINDS = {"cyc": KIND_CYC, "regs": KIND_REGS, "completion": KIND_COMPLETION}
+
+HEX = rb"([0-9a-fA-FxzXZ]{8})"
+LINE_RE = re.compile(
+    rb"^(?:CYC (\d+) \| PC=" + HEX + rb" \| instr=" + HEX +
+    rb" \| rd=(\d+) wr=([01xz]) \| alu=" + HEX +
+    rb" \| mem_w=([01xz]) mem_r=([01xz]) \| fwdA=([01xz]{2}) fwdB=([01xz]{2})"
+    rb"|[ \t]*REGS:"
+    rb"|\*\*\* COMPLETION MARKER WRITE DETECTED at cycle (\d+))",
+    re.M)
+
+COLUMNS = ("offset", "kind", "cycle", "pc", "instr", "rd", "wr", "alu",
+           "mem_w", "mem_r", "fwd_a", "fwd_b")
+DTYPES  = {"offset": np.uint64, "kind": np.uint8, "cycle": np.uint32,
+           "pc": np.uint32, "instr": np.uint32, "rd": np.uint8,
+           "wr": np.uint8, "alu": np.uint32, "mem_w": np.uint8,
+           "mem_r": np.uint8, "fwd_a": np.uint8, "fwd_b": np.uint8}
+
+XZ_TO_0 = bytes.maketrans(b"xzXZ", b"0000")
+
+def _num(field, base=16):
+    """Trace field → int; unknown (x/z) bits read as 0."""
+    return int(field.translate(XZ_TO_0), base)
+
+def index_path(log_path):
+    return log_path + ".idx.npz"
+
+def build_index(log_path):
+    """One pass over the mapped log → dict of NumPy columns."""
+    cols = {name: [] for name in COLUMNS}
+    cycle = 0
+    with open(log_path, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for m in LINE_RE.finditer(mm):
+            g = m.groups()
+            if g[0] is not None:
+                cycle = int(g[0])
+                row = (KIND_CYC, cycle, _num(g[1]), _num(g[2]), int(g[3]),
+                       _num(g[4], 2), _num(g[5]), _num(g[6], 2),
+                       _num(g[7], 2), _num(g[8], 2), _num(g[9], 2))
+            elif g[10] is not None:
+                row = (KIND_COMPLETION, int(g[10])) + (0,) * 9
+            else:
+                row = (KIND_REGS, cycle) + (0,) * 9
+            cols["offset"].append(m.start())
+            for name, value in zip(COLUMNS[1:], row):
+                cols[name].append(value)
+    return {name: np.array(values, dtype=DTYPES[name])
+            for name, values in cols.items()}
+
+def load_index(log_path, rebuild=False):
+    """Cached index for log_path, rebuilt when the log has changed."""
+    if not os.path.exists(log_path):
+        sys.exit(f"[ERROR] File not found: '{log_path}'")
+    st = os.stat(log_path)
+    stamp = np.array([st.st_size, st.st_mtime_ns], dtype=np.int64)
+    idx_path = index_path(log_path)
+
+    if not rebuild and os.path.exists(idx_path):
+        with np.load(idx_path) as data:
+            if np.array_equal(data["stamp"], stamp):
+                return {name: data[name] for name in COLUMNS}
+
+    index = build_index(log_path)
+    with open(idx_path, "wb") as f:
+        np.savez(f, stamp=stamp, **index)
+    return index
+
+def select(index, cycles=None, pcs=None, rd=None, store_addr=None, kinds=None):
+    """Boolean mask over index rows; all given filters must hold."""
+    mask = np.ones(len(index["offset"]), dtype=bool)
+    if kinds is not None:
+        mask &= np.isin(index["kind"], [KINDS[k] for k in kinds])
+    if cycles is not None:
+        lo, hi = cycles
+        mask &= (index["cycle"] >= lo) & (index["cycle"] <= hi)
+    if pcs is not None:
+        mask &= (index["kind"] == KIND_CYC) & np.isin(index["pc"], pcs)
+    if rd is not None:
+        mask &= (index["kind"] == KIND_CYC) & (index["rd"] == rd)
+    if store_addr is not None:
+        lo, hi = store_addr
+        mask &= ((index["kind"] == KIND_CYC) & (index["mem_w"] == 1) &
+                 (index["alu"] >= lo) & (index["alu"] <= hi))
+    return mask
+
+def with_context(mask, before, after):
+    """Widen a row mask by before/after neighbouring indexed lines."""
+    rows = np.flatnonzero(mask)
+    out = np.zeros_like(mask)
+    for k in range(-before, after + 1):
+        shifted = rows + k
+        out[shifted[(shifted >= 0) & (shifted < len(mask))]] = True
+    return out
+
+def iter_lines(log_path, offsets):
+    """Yield the raw text lines at the given byte offsets (mapped seeks)."""
+    with open(log_path, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for off in offsets:
+            end = mm.find(b"\n", int(off))
+            yield mm[int(off):end if end >= 0 else len(mm)] \
+                .rstrip(b"\r").decode("utf-8", "replace")
+
+def write_lines(log_path, out_path, **filters):
+    """Write every indexed line matching filters to out_path, in log order."""
+    index = load_index(log_path)
+    offsets = index["offset"][select(index, **filters)]
+    with open(out_path, "w", encoding="utf-8") as f:
+        for line in iter_lines(log_path, offsets):
+            f.write(line + "\n")
+    print(f"[OK]   Written {len(offsets)} lines to '{out_path}'")
+
+def pc_profile(index):
+    """PC → (CYC lines, first cycle, last cycle), from the index alone."""
+    cyc = index["kind"] == KIND_CYC
+    pcs, inverse, counts = np.unique(index["pc"][cyc], return_inverse=True,
+                                     return_counts=True)
+    cycles = index["cycle"][cyc]
+    first = np.full(len(pcs), np.iinfo(np.uint32).max, dtype=np.uint32)
+    last  = np.zeros(len(pcs), dtype=np.uint32)
+    np.minimum.at(first, inverse, cycles)
+    np.maximum.at(last, inverse, cycles)
+    return pcs, counts, first, last
+
+def parse_range(text):
+    lo, _, hi = text.partition(":")
+    lo = int(lo, 0) if lo else 0
+    hi = int(hi, 0) if hi else 0xFFFFFFFF
+    return lo, hi
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Single-pass indexed analyzer for simulate.log")
+    parser.add_argument("log", nargs="?", default=DEFAULT_LOG)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_index = sub.add_parser("index", help="(re)build the sidecar index")
+    p_index.add_argument("--force", action="store_true")
+
+    p_query = sub.add_parser("query", help="print matching trace lines")
+    p_query.add_argument("--cycles", type=parse_range, help="A:B inclusive")
+    p_query.add_argument("--pc", type=lambda s: int(s, 0), nargs="+")
+    p_query.add_argument("--rd", type=int)
+    p_query.add_argument("--store-addr", type=parse_range, help="LO:HI bytes")
+    p_query.add_argument("--kind", choices=KINDS, nargs="+")
+    p_query.add_argument("--context", default="0:0",
+                         help="B:A indexed lines before/after each match")
+    p_query.add_argument("--limit", type=int, help="first N matches only")
+    p_query.add_argument("-o", "--output", help="write lines to a file")
+
+    sub.add_parser("pcs", help="per-PC CYC line counts")
+    args = parser.parse_args()
+
+    if args.cmd == "index":
+        index = load_index(args.log, rebuild=args.force)
+        kinds = np.bincount(index["kind"], minlength=3)
+        print(f"[OK]   Indexed '{args.log}' → '{index_path(args.log)}'")
+        print(f"       CYC: {kinds[KIND_CYC]}  |  REGS: {kinds[KIND_REGS]}  |  "
+              f"COMPLETION: {kinds[KIND_COMPLETION]}")
+        return
+
+    index = load_index(args.log)
+    if args.cmd == "pcs":
+        pcs, counts, first, last = pc_profile(index)
+        print(f"{'PC':>10}  {'lines':>8}  {'first':>8}  {'last':>8}")
+        for pc, n, lo, hi in zip(pcs, counts, first, last):
+            print(f"0x{pc:08x}  {n:8d}  {lo:8d}  {hi:8d}")
+        return
+
+    mask = select(index, cycles=args.cycles, pcs=args.pc, rd=args.rd,
+                  store_addr=args.store_addr, kinds=args.kind)
+    if args.limit is not None:
+        keep = np.flatnonzero(mask)[:args.limit]
+        mask = np.zeros_like(mask)
+        mask[keep] = True
+    before, _, after = args.context.partition(":")
+    if int(before or 0) or int(after or 0):
+        mask = with_context(mask, int(before or 0), int(after or 0))
+
+    lines = iter_lines(args.log, index["offset"][mask])
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            for line in lines:
+                f.write(line + "\n")
+        print(f"[OK]   Written {int(mask.sum())} lines to '{args.output}'")
+    else:
+        for line in lines:
+            print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+trace_profile.py
+Per-PC and per-basic-block cycle profile of a tb_RISCV_Pipeline trace.
+
+Every CYC record is one pipeline cycle of the instruction in IF/EX and is
+charged to exactly one PC:
+    retired  - the instruction executed in EX this cycle
+    stall    - HazardUnit load-use bubble, charged to the stalled consumer
+    flush    - taken-branch bubble (instr=0), charged to the last retired
+               instruction, i.e. the branch/jump that caused it
+    reset    - bubbles before the first instruction reaches EX
+ReRAM triggers are retired CUSTOM (opcode 0001011) instructions.
+
+Basic blocks are split at branch/jump targets and fall-throughs of
+program.mem; block names come from the "LABEL:" comments of
+sobel_program.s when present. Reports a flat and a block profile, writes
+the numbers back onto sobel_program.s line by line (--annotate) and a
+folded-stack file for flamegraph.pl / speedscope (--folded).
+
+Usage: python trace_profile.py <trace> [--program program.mem]
+                               [--asm sobel_program.s] [--annotate out.s]
+                               [--folded out.folded] [--top N]
+<trace> is a simulate.log / pipeline_model.py --trace file or a
+trace_store.py store (.npz or .npy directory).
+"""
+
+import sys
+import os
+import re
+import argparse
+
+try:
+    import numpy as np
+except ImportError:
+    sys.exit("[ERROR] NumPy not installed. Run: pip install numpy")
+
+from riscv_iss import IMEM_WORDS, OP_CUSTOM, read_mem, decode
+from trace_store import open_trace
+
+SCRIPT_DIR   = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+
+ASM_LINE_RE = re.compile(r"#\s*0x([0-9A-Fa-f]+)\s+([0-9A-Fa-f]{8})\s+(.*)")
+LABEL_RE    = re.compile(r"#\s*([A-Z][A-Z0-9_]*):")
+FIELDS      = ("retired", "cycles", "stall", "flush", "reram")
+
+def read_asm(path):
+    """sobel_program.s → (lines, {word index: (line no, word, text)})."""
+    if not path or not os.path.exists(path):
+        return [], {}
+    with open(path, encoding="utf-8", errors="surrogateescape") as f:
+        lines = f.read().splitlines()
+    entries = {}
+    for n, line in enumerate(lines):
+        m = ASM_LINE_RE.search(line)
+        if m:
+            entries[int(m.group(1), 16) // 4] = (n, int(m.group(2), 16),
+                                                 m.group(3).strip())
+    return lines, entries
+
+def basic_blocks(program, asm_entries):
+    """Word index → block id, and per-block (start, end, name)."""
+    words = len(program)
+    leaders = {0}
+    for i, instr in enumerate(program):
+        fields = decode(instr)
+        branch, jump = fields[11], fields[12]
+        if branch or jump:
+            leaders.add(((i * 4 + fields[5]) & 0xFFFFFFFF) // 4)
+            leaders.add(i + 1)
+    leaders = sorted(l for l in leaders if 0 <= l < words)
+
+    block_of = np.zeros(words, dtype=np.int64)
+    blocks = []
+    for b, start in enumerate(leaders):
+        end = leaders[b + 1] if b + 1 < len(leaders) else words
+        block_of[start:end] = b
+        m = LABEL_RE.search(asm_entries.get(start, (0, 0, ""))[2])
+        name = m.group(1) if m else f"bb_{start * 4:03x}"
+        blocks.append((start, end, name))
+    return block_of, blocks
+
+def profile(trace, words=IMEM_WORDS):
+    """Per-PC counters (arrays indexed by PC/4) plus reset bubble count."""
+    pc    = trace["pc"].astype(np.int64)
+    instr = trace["instr"].astype(np.int64)
+    rd    = trace["rd"].astype(np.int64)
+    n = len(pc)
+
+    # HazardUnit: EX/WB load whose rd matches the raw rs1/rs2 fields
+    rs1, rs2 = (instr >> 15) & 0x1F, (instr >> 20) & 0x1F
+    stall  = (trace["mem_r"] == 1) & (rd != 0) & ((rd == rs1) | (rd == rs2))
+    bubble = (instr == 0) & ~stall
+    retired = ~bubble & ~stall
+
+    last = np.maximum.accumulate(np.where(retired, np.arange(n), -1))
+    reset = bubble & (last < 0)
+    flush = bubble & ~reset
+    owner = np.where(flush, pc[np.maximum(last, 0)], pc)
+    slot  = (owner >> 2) % words
+
+    reram = retired & ((instr & 0x7F) == OP_CUSTOM)
+    counts = {
+        "retired": np.bincount(slot[retired], minlength=words),
+        "stall":   np.bincount(slot[stall], minlength=words),
+        "flush":   np.bincount(slot[flush], minlength=words),
+        "reram":   np.bincount(slot[reram], minlength=words),
+    }
+    counts["cycles"] = counts["retired"] + counts["stall"] + counts["flush"]
+    return counts, int(reset.sum())
+
+def block_profile(counts, block_of, nblocks):
+    return {k: np.bincount(block_of, weights=counts[k][:len(block_of)],
+                           minlength=nblocks).astype(np.int64)
+            for k in FIELDS}
+
+def write_annotated(path, lines, entries, counts, total):
+    """sobel_program.s with the per-PC counters prefixed to each line."""
+    header = (f"{'cycles':>8} {'%':>6} {'retired':>8} {'stall':>6} "
+              f"{'flush':>6} {'reram':>5} | ")
+    at_line = {n: i for i, (n, _, _) in entries.items()}
+    with open(path, "w", encoding="utf-8", errors="surrogateescape") as f:
+        f.write(f"# {header}\n")
+        for n, line in enumerate(lines):
+            i = at_line.get(n)
+            if i is None or i >= len(counts["cycles"]):
+                f.write(" " * len(header) + line + "\n")
+                continue
+            c = int(counts["cycles"][i])
+            f.write(f"{c:8d} {100 * c / max(total, 1):5.1f}% "
+                    f"{int(counts['retired'][i]):8d} "
+                    f"{int(counts['stall'][i]):6d} "
+                    f"{int(counts['flush'][i]):6d} "
+                    f"{int(counts['reram'][i]):5d} | {line}\n")
+
+def write_folded(path, root, counts, block_of, blocks, reset):
+    """Folded stacks: root;BLOCK;PC[;stall|;flush] cycles."""
+    with open(path, "w") as f:
+        if reset:
+            f.write(f"{root};[reset] {reset}\n")
+        for i in np.flatnonzero(counts["cycles"][:len(block_of)]):
+            frame = f"{root};{blocks[block_of[i]][2]};0x{i * 4:03x}"
+            if counts["retired"][i]:
+                f.write(f"{frame} {int(counts['retired'][i])}\n")
+            for kind in ("stall", "flush"):
+                if counts[kind][i]:
+                    f.write(f"{frame};[{kind}] {int(counts[kind][i])}\n")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Per-PC / basic-block profile of a pipeline trace")
+    parser.add_argument("trace")
+    parser.add_argument("--program",
+                        default=os.path.join(PROJECT_ROOT, "mem", "program.mem"))
+    parser.add_argument("--asm",
+                        default=os.path.join(PROJECT_ROOT, "mem", "sobel_program.s"))
+    parser.add_argument("--annotate", help="write annotated sobel_program.s")
+    parser.add_argument("--folded", help="write flame-graph folded stacks")
+    parser.add_argument("--top", type=int, default=15,
+                        help="PCs listed in the flat profile")
+    args = parser.parse_args()
+
+    program = read_mem(args.program, IMEM_WORDS)
+    lines, entries = read_asm(args.asm)
+    if any(program[i] != word for i, (_, word, _) in entries.items()
+           if i < len(program)):
+        print(f"[WARN] '{args.asm}' does not match '{args.program}'; "
+              "ignoring it")
+        lines, entries = [], {}
+
+    trace = open_trace(args.trace)
+    counts, reset = profile(trace)
+    block_of, blocks = basic_blocks(program, entries)
+    per_block = block_profile(counts, block_of, len(blocks))
+    total = len(trace["cycle"])
+
+    print(f"[INFO] {total} cycles  |  retired {int(counts['retired'].sum())}  |  "
+          f"stall {int(counts['stall'].sum())}  |  "
+          f"flush {int(counts['flush'].sum())}  |  reset {reset}  |  "
+          f"ReRAM {int(counts['reram'].sum())}")
+
+    print(f"\n{'PC':>6} {'block':<10} {'cycles':>8} {'%':>6} {'retired':>8} "
+          f"{'stall':>6} {'flush':>6} {'reram':>5}  instruction")
+    for i in np.argsort(-counts["cycles"], kind="stable")[:args.top]:
+        c = int(counts["cycles"][i])
+        if not c:
+            break
+        text = entries.get(i, (0, 0, ""))[2].split("#")[0].strip()
+        print(f"0x{i * 4:03x}  {blocks[block_of[i]][2]:<10} {c:8d} "
+              f"{100 * c / total:5.1f}% {int(counts['retired'][i]):8d} "
+              f"{int(counts['stall'][i]):6d} {int(counts['flush'][i]):6d} "
+              f"{int(counts['reram'][i]):5d}  {text}")
+
+    print(f"\n{'block':<10} {'range':>11} {'cycles':>8} {'%':>6} {'retired':>8} "
+          f"{'stall':>6} {'flush':>6} {'reram':>5}")
+    for b in np.argsort(-per_block["cycles"], kind="stable"):
+        c = int(per_block["cycles"][b])
+        if not c:
+            break
+        start, end, name = blocks[b]
+        print(f"{name:<10} {start * 4:#05x}-{end * 4 - 4:#05x} {c:8d} "
+              f"{100 * c / total:5.1f}% {int(per_block['retired'][b]):8d} "
+              f"{int(per_block['stall'][b]):6d} {int(per_block['flush'][b]):6d} "
+              f"{int(per_block['reram'][b]):5d}")
+
+    if args.annotate:
+        if not lines:
+            sys.exit("[ERROR] --annotate needs a sobel_program.s matching the program")
+        write_annotated(args.annotate, lines, entries, counts, total)
+        print(f"\n[OK]   Annotated assembly written to '{args.annotate}'")
+    if args.folded:
+        root = os.path.splitext(os.path.basename(args.program))[0]
+        write_folded(args.folded, root, counts, block_of, blocks, reset)
+        print(f"[OK]   Folded stacks written to '{args.folded}'")
+
+if __name__ == "__main__":
+    main()
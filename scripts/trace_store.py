@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+trace_store.py
+Compact columnar store for tb_RISCV_Pipeline traces.
+
+A trace is kept as fixed-width NumPy columns, one element per CYC record
+(22 bytes per cycle instead of ~120 bytes of text):
+    cycle, pc, instr, alu   uint32
+    rd, wr, mem_w, mem_r,
+    fwd_a, fwd_b            uint8
+plus the completion-marker cycle (-1 if the run never finished).
+
+A path ending in .npz is written compressed (np.savez_compressed); any other
+path is a directory of .npy files that load() memory-maps, so a regression
+archive of traces can be filtered column-wise without reading it all.
+
+Query API (vectorized, returns row indices):
+    where(trace, pc=0x64)                     every cycle at PC 0x64
+    where(trace, store_addr=(0x1000, 0x1FFC)) every store into the output
+    where(trace, cycles=(7190, 8000), rd=19)
+
+Usage: python trace_store.py convert <simulate.log> <out.npz | out_dir>
+       python trace_store.py query <store> [--pc 0x64 ...] [--rd N]
+                                   [--cycles A:B] [--store-addr LO:HI]
+                                   [--load-addr LO:HI] [--limit N]
+       python trace_store.py stats <store> [<store> ...]
+Traces can also be written directly by
+       python pipeline_model.py ... --trace-store <out.npz | out_dir>
+"""
+
+import sys
+import os
+import json
+import argparse
+
+try:
+    import numpy as np
+except ImportError:
+    sys.exit("[ERROR] NumPy not installed. Run: pip install numpy")
+
+COLUMNS = ("cycle", "pc", "instr", "rd", "wr", "alu",
+           "mem_w", "mem_r", "fwd_a", "fwd_b")
+DTYPES  = {"cycle": np.uint32, "pc": np.uint32, "instr": np.uint32,
+           "rd": np.uint8, "wr": np.uint8, "alu": np.uint32,
+           "mem_w": np.uint8, "mem_r": np.uint8,
+           "fwd_a": np.uint8, "fwd_b": np.uint8}
+
+def new_columns():
+    """Empty per-column lists for a trace writer (see pipeline_model.run)."""
+    return {name: [] for name in COLUMNS}
+
+def save(columns, path, completion=-1):
+    """Write columns (lists or arrays) as .npz or as a directory of .npy."""
+    arrays = {name: np.asarray(columns[name], dtype=DTYPES[name])
+              for name in COLUMNS}
+    if path.endswith(".npz"):
+        np.savez_compressed(path, completion=np.int64(completion), **arrays)
+    else:
+        os.makedirs(path, exist_ok=True)
+        for name, arr in arrays.items():
+            np.save(os.path.join(path, name + ".npy"), arr)
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"completion": int(completion),
+                       "records": len(arrays["cycle"])}, f)
+    return arrays
+
+def load(path):
+    """Trace dict of columns (memory-mapped for a .npy directory)."""
+    if not os.path.exists(path):
+        sys.exit(f"[ERROR] File not found: '{path}'")
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            trace = {name: data[name] for name in COLUMNS}
+            trace["completion"] = int(data["completion"])
+        return trace
+    trace = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode="r")
+             for name in COLUMNS}
+    with open(os.path.join(path, "meta.json")) as f:
+        trace["completion"] = json.load(f)["completion"]
+    return trace
+
+def open_trace(path):
+    """Columns of a store (.npz / .npy dir) or of a text simulate.log."""
+    if path.endswith(".npz") or os.path.isdir(path):
+        return load(path)
+    from trace_index import KIND_CYC, KIND_COMPLETION, load_index
+
+    index = load_index(path)
+    cyc = index["kind"] == KIND_CYC
+    done = index["cycle"][index["kind"] == KIND_COMPLETION]
+    trace = {name: index[name][cyc] for name in COLUMNS}
+    trace["completion"] = int(done[0]) if len(done) else -1
+    return trace
+
+def convert(log_path, path):
+    """simulate.log → columnar store, via the single-pass trace index."""
+    trace = open_trace(log_path)
+    return save(trace, path, trace["completion"])
+
+def where(trace, pc=None, rd=None, cycles=None, store_addr=None,
+          load_addr=None):
+    """Row indices matching every given filter.
+
+    pc may be one PC or a list; cycles/store_addr/load_addr are inclusive
+    (lo, hi) ranges. Store and load addresses are the EX/WB alu value of
+    records with mem_w / mem_r set."""
+    mask = np.ones(len(trace["cycle"]), dtype=bool)
+    if pc is not None:
+        mask &= np.isin(trace["pc"], np.atleast_1d(pc))
+    if rd is not None:
+        mask &= (trace["rd"] == rd) & (trace["wr"] == 1)
+    if cycles is not None:
+        mask &= (trace["cycle"] >= cycles[0]) & (trace["cycle"] <= cycles[1])
+    for flag, rng in (("mem_w", store_addr), ("mem_r", load_addr)):
+        if rng is not None:
+            mask &= ((trace[flag] == 1) & (trace["alu"] >= rng[0]) &
+                     (trace["alu"] <= rng[1]))
+    return np.flatnonzero(mask)
+
+def format_rows(trace, rows):
+    """Yield tb-format CYC lines for the given row indices."""
+    from pipeline_model import CYC_FORMAT
+
+    for i in rows:
+        yield CYC_FORMAT.format(
+            cyc=int(trace["cycle"][i]), pc=int(trace["pc"][i]),
+            instr=int(trace["instr"][i]), rd=int(trace["rd"][i]),
+            wr=int(trace["wr"][i]), alu=int(trace["alu"][i]),
+            mem_w=int(trace["mem_w"][i]), mem_r=int(trace["mem_r"][i]),
+            fwd_a=int(trace["fwd_a"][i]), fwd_b=int(trace["fwd_b"][i]))
+
+def store_size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, f))
+                   for f in os.listdir(path))
+    return os.path.getsize(path)
+
+def parse_range(text):
+    lo, _, hi = text.partition(":")
+    return (int(lo, 0) if lo else 0, int(hi, 0) if hi else 0xFFFFFFFF)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Columnar NumPy store for tb_RISCV_Pipeline traces")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_conv = sub.add_parser("convert", help="simulate.log → store")
+    p_conv.add_argument("log")
+    p_conv.add_argument("store")
+
+    p_query = sub.add_parser("query", help="print matching CYC records")
+    p_query.add_argument("store")
+    p_query.add_argument("--pc", type=lambda s: int(s, 0), nargs="+")
+    p_query.add_argument("--rd", type=int)
+    p_query.add_argument("--cycles", type=parse_range)
+    p_query.add_argument("--store-addr", type=parse_range)
+    p_query.add_argument("--load-addr", type=parse_range)
+    p_query.add_argument("--limit", type=int)
+
+    p_stats = sub.add_parser("stats", help="record counts and sizes")
+    p_stats.add_argument("stores", nargs="+")
+    args = parser.parse_args()
+
+    if args.cmd == "convert":
+        arrays = convert(args.log, args.store)
+        text, packed = os.path.getsize(args.log), store_size(args.store)
+        print(f"[OK]   {len(arrays['cycle'])} records → '{args.store}'")
+        print(f"       {text} bytes of text → {packed} bytes "
+              f"({text / max(packed, 1):.1f}x smaller)")
+    elif args.cmd == "query":
+        trace = load(args.store)
+        rows = where(trace, pc=args.pc, rd=args.rd, cycles=args.cycles,
+                     store_addr=args.store_addr, load_addr=args.load_addr)
+        for line in format_rows(trace, rows[:args.limit]):
+            print(line)
+    else:
+        print(f"{'records':>9}  {'stores':>7}  {'loads':>7}  "
+              f"{'completion':>10}  {'bytes':>10}  store")
+        for path in args.stores:
+            trace = load(path)
+            print(f"{len(trace['cycle']):9d}  "
+                  f"{int(np.count_nonzero(trace['mem_w'])):7d}  "
+                  f"{int(np.count_nonzero(trace['mem_r'])):7d}  "
+                  f"{trace['completion']:10d}  {store_size(path):10d}  {path}")
+
+if __name__ == "__main__":
+    main()
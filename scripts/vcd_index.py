@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+vcd_index.py
+Streaming, indexed reader for riscv_pipeline_wave.vcd ($dumpvars(0, ...) of
+tb_RISCV_Pipeline, i.e. every signal of the design).
+
+One pass over the memory-mapped VCD builds a sidecar index (<vcd>.idx.npz,
+rebuilt only when the VCD's size or mtime changes) holding:
+    - the signal table: hierarchical names, id codes, widths, change counts
+    - the byte offset of every #time marker
+    - a checkpoint every CHECKPOINT_BYTES: the offset of each signal's last
+      value change before it
+Extracting a few signals for a time window then seeks to the checkpoint
+before the window, reads each signal's value there from its last change,
+and scans only up to the window end with a regex that matches only the
+requested id codes. The VCD is never loaded as a whole.
+
+Signals are named by full path (tb_RISCV_Pipeline.dut.ex.stall), by glob
+(*.fwd_a*), or by leaf name, which matches that name in every scope.
+Values are integers with x/z bits read as 0, as in trace_index.py; signals
+wider than 64 bits become rows of little-endian uint64 words.
+
+convert writes the extracted signals as a compact array store: per signal
+a uint64 time column and a value column of the narrowest unsigned dtype,
+as .npz (compressed) or as a directory of .npy files that load()
+memory-maps (see trace_store.py).
+
+Usage: python vcd_index.py [VCD] index [--force]
+       python vcd_index.py [VCD] signals [PATTERN ...]
+       python vcd_index.py [VCD] extract SIGNAL [...] [--time A:B]
+                                         [--limit N]
+       python vcd_index.py [VCD] convert SIGNAL [...] -o <out.npz | out_dir>
+                                         [--time A:B]
+Times are in the VCD timescale, or take a unit (--time 100us:120us).
+VCD defaults to VISOR.sim/sim_1/behav/xsim/riscv_pipeline_wave.vcd.
+"""
+
+import sys
+import os
+import re
+import json
+import mmap
+import fnmatch
+import argparse
+
+try:
+    import numpy as np
+except ImportError:
+    sys.exit("[ERROR] NumPy not installed. Run: pip install numpy")
+
+DEFAULT_VCD = os.path.join("VISOR.sim", "sim_1", "behav", "xsim",
+                           "riscv_pipeline_wave.vcd")
+
+CHECKPOINT_BYTES = 1 << 22      # value-state checkpoint every 4 MiB
+NO_CHANGE = np.iinfo(np.uint64).max
+
+# Data section: a #time marker or a scalar / vector / real value change
+CHANGE_RE = re.compile(rb"^(?:#(\d+)|[01xzXZ](\S+)|[bBrR]\S+ (\S+))\r?$", re.M)
+UNITS = {"s": 1e0, "ms": 1e-3, "us": 1e-6, "ns": 1e-9, "ps": 1e-12,
+         "fs": 1e-15}
+XZ_TO_0 = bytes.maketrans(b"xzXZ", b"0000")
+
+def index_path(vcd_path):
+    return vcd_path + ".idx.npz"
+
+# ====== Header ======
+
+def parse_header(mm):
+    """Signal table and timescale from the declarations of a mapped VCD.
+
+    Returns (names, codes, widths, timescale_s, data_offset); names and
+    codes are parallel lists (several names may share one id code)."""
+    end = mm.find(b"$enddefinitions")
+    if end < 0:
+        sys.exit("[ERROR] No $enddefinitions: not a VCD file")
+    data_offset = mm.find(b"$end", end + len(b"$enddefinitions")) + len(b"$end")
+    tokens = mm[:end].decode("ascii", "replace").split()
+
+    names, codes, widths, scope = [], [], [], []
+    timescale, i = 1e-9, 0
+    while i < len(tokens):
+        tok = tokens[i]
+        if tok == "$scope":
+            scope.append(tokens[i + 2])
+            i += 3
+        elif tok == "$upscope":
+            scope.pop()
+            i += 1
+        elif tok == "$var":
+            width, code, ref = int(tokens[i + 2]), tokens[i + 3], tokens[i + 4]
+            j = i + 5
+            if tokens[j] != "$end":
+                if width == 1 and ":" not in tokens[j]:
+                    ref += tokens[j]            # one bit of a bus: name[3]
+                j += 1
+            names.append(".".join(scope + [ref]))
+            codes.append(code)
+            widths.append(width)
+            i = j + 1
+        elif tok == "$timescale":
+            j = tokens.index("$end", i)
+            m = re.fullmatch(r"(\d+)\s*([munpf]?s)", "".join(tokens[i + 1:j]))
+            if m:
+                timescale = int(m.group(1)) * UNITS[m.group(2)]
+            i = j + 1
+        else:
+            i += 1
+    return names, codes, widths, timescale, data_offset
+
+# ====== Index ======
+
+def build_index(vcd_path):
+    """One pass over the mapped VCD → dict of NumPy arrays."""
+    with open(vcd_path, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        names, codes, widths, timescale, data_offset = parse_header(mm)
+        ids = sorted(set(codes))
+        slot = {code.encode(): k for k, code in enumerate(ids)}
+
+        last = [NO_CHANGE] * len(ids)
+        counts = [0] * len(ids)
+        times, offsets, ckpt_rows, ckpt_last = [], [], [], []
+        next_ckpt = data_offset
+        for m in CHANGE_RE.finditer(mm, data_offset):
+            time, scalar, vector = m.groups()
+            if time is not None:
+                if m.start() >= next_ckpt:
+                    # State before this #time: every signal's last change
+                    ckpt_rows.append(len(times))
+                    ckpt_last.append(list(last))
+                    next_ckpt = m.start() + CHECKPOINT_BYTES
+                times.append(int(time))
+                offsets.append(m.start())
+                continue
+            k = slot.get(scalar if scalar is not None else vector)
+            if k is not None:
+                last[k] = m.start()
+                counts[k] += 1
+
+    code_index = {code: k for k, code in enumerate(ids)}
+    code_width = dict(zip(codes, widths))
+    return {
+        "names": np.array(names, dtype=str),
+        "slots": np.array([code_index[c] for c in codes], dtype=np.int64),
+        "codes": np.array(ids, dtype=str),
+        "widths": np.array([code_width[c] for c in ids], dtype=np.int64),
+        "changes": np.array(counts, dtype=np.int64),
+        "times": np.array(times, dtype=np.uint64),
+        "offsets": np.array(offsets, dtype=np.uint64),
+        "ckpt_rows": np.array(ckpt_rows, dtype=np.int64),
+        "ckpt_last": np.array(ckpt_last, dtype=np.uint64).reshape(
+            len(ckpt_rows), len(ids)),
+        "timescale": np.float64(timescale),
+        "data_offset": np.int64(data_offset),
+    }
+
+def load_index(vcd_path, rebuild=False):
+    """Cached index for vcd_path, rebuilt when the VCD has changed."""
+    if not os.path.exists(vcd_path):
+        sys.exit(f"[ERROR] File not found: '{vcd_path}'")
+    st = os.stat(vcd_path)
+    stamp = np.array([st.st_size, st.st_mtime_ns], dtype=np.int64)
+    idx_path = index_path(vcd_path)
+
+    if not rebuild and os.path.exists(idx_path):
+        with np.load(idx_path) as data:
+            if np.array_equal(data["stamp"], stamp):
+                return {name: data[name] for name in data.files
+                        if name != "stamp"}
+
+    index = build_index(vcd_path)
+    with open(idx_path, "wb") as f:
+        np.savez(f, stamp=stamp, **index)
+    return index
+
+# ====== Extraction ======
+
+def resolve(index, patterns):
+    """Full signal names matching each pattern (path, glob or leaf name)."""
+    names = [str(n) for n in index["names"]]
+    found = []
+    for pat in patterns:
+        if pat in names:
+            hits = [pat]
+        elif any(ch in pat for ch in "*?["):
+            hits = fnmatch.filter(names, pat)
+        else:
+            hits = [n for n in names if n.rsplit(".", 1)[-1] == pat]
+        if not hits:
+            sys.exit(f"[ERROR] No signal matches '{pat}' "
+                     f"(try: vcd_index.py signals '*{pat}*')")
+        found += [n for n in hits if n not in found]
+    return found
+
+def parse_value(token, width):
+    """Value-change token (without id) → int, or list of 64-bit words."""
+    kind = token[:1]
+    if kind in b"bB":
+        value = int(token[1:].translate(XZ_TO_0), 2)
+    elif kind in b"rR":
+        value = int(float(token[1:]))
+    else:
+        value = 1 if token == b"1" else 0
+    if width <= 64:
+        return value
+    return [(value >> (64 * w)) & 0xFFFFFFFFFFFFFFFF
+            for w in range(-(-width // 64))]
+
+def value_dtype(width):
+    for bits, dtype in ((8, np.uint8), (16, np.uint16), (32, np.uint32)):
+        if width <= bits:
+            return dtype
+    return np.uint64
+
+def change_token(mm, offset):
+    """(value token, id code) of the value change line at offset."""
+    end = mm.find(b"\n", offset)
+    line = mm[offset:end if end >= 0 else len(mm)].rstrip(b"\r")
+    if line[:1] in b"bBrR":
+        value, _, code = line.partition(b" ")
+        return value, code
+    return line[:1], line[1:]
+
+def extract(vcd_path, names, t0=0, t1=None, index=None):
+    """{name: (times, values)} for the window [t0, t1] (t1 None = end).
+
+    The first sample of each signal is its value at t0 (time t0), followed
+    by every change inside the window."""
+    index = load_index(vcd_path) if index is None else index
+    times, offsets = index["times"], index["offsets"]
+    all_names = [str(n) for n in index["names"]]
+    slots = {name: int(index["slots"][all_names.index(name)]) for name in names}
+    codes = {k: str(index["codes"][k]).encode() for k in set(slots.values())}
+    widths = {k: int(index["widths"][k]) for k in codes}
+
+    # Checkpoint at or before t0, and the byte range to scan
+    first_row = int(np.searchsorted(times, t0, side="right")) - 1
+    c = int(np.searchsorted(index["ckpt_rows"], max(first_row, 0),
+                            side="right")) - 1
+    end_row = len(times) if t1 is None else \
+        int(np.searchsorted(times, t1, side="right"))
+
+    with open(vcd_path, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if c >= 0:
+            start = int(offsets[index["ckpt_rows"][c]])
+            state = {}
+            for k in codes:
+                off = index["ckpt_last"][c][k]
+                state[k] = parse_value(change_token(mm, int(off))[0], widths[k]) \
+                    if off != NO_CHANGE else parse_value(b"0", widths[k])
+        else:
+            start = int(index["data_offset"])
+            state = {k: parse_value(b"0", widths[k]) for k in codes}
+        stop = int(offsets[end_row]) if end_row < len(offsets) else len(mm)
+
+        ids = b"|".join(re.escape(codes[k]) for k in codes)
+        want = re.compile(rb"^(?:([01xzXZ])|([bBrR]\S+) )(" + ids + rb")\r?$",
+                          re.M)
+        by_code = {code: k for k, code in codes.items()}
+        hits = [(m.start(), by_code[m.group(3)], m.group(1) or m.group(2))
+                for m in want.finditer(mm, start, stop)]
+
+    # Time of every hit from the #time offsets, in one vectorized lookup
+    rows = np.searchsorted(offsets, np.array([h[0] for h in hits],
+                                             dtype=np.uint64), side="right") - 1
+    hit_times = np.where(rows >= 0, times[np.maximum(rows, 0)], 0) \
+        if len(times) else np.zeros(len(hits), dtype=np.uint64)
+    changes = {k: ([], []) for k in codes}
+    for (_, k, token), time in zip(hits, hit_times.tolist()):
+        value = parse_value(token, widths[k])
+        if time <= t0:
+            state[k] = value
+        else:
+            changes[k][0].append(time)
+            changes[k][1].append(value)
+
+    result = {}
+    for name, k in slots.items():
+        t = np.array([t0] + changes[k][0], dtype=np.uint64)
+        v = np.array([state[k]] + changes[k][1], dtype=value_dtype(widths[k]))
+        result[name] = (t, v)
+    return result
+
+# ====== Array store ======
+
+def save(signals, path, timescale):
+    """Write {name: (times, values)} as .npz or a directory of .npy."""
+    meta = {"timescale": timescale, "signals": list(signals)}
+    arrays = {}
+    for k, (t, v) in enumerate(signals.values()):
+        arrays[f"t{k}"], arrays[f"v{k}"] = t, v
+    if path.endswith(".npz"):
+        np.savez_compressed(path, meta=json.dumps(meta), **arrays)
+    else:
+        os.makedirs(path, exist_ok=True)
+        for name, arr in arrays.items():
+            np.save(os.path.join(path, name + ".npy"), arr)
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+def load(path):
+    """{name: (times, values)} of a store (memory-mapped for a directory)."""
+    if not os.path.exists(path):
+        sys.exit(f"[ERROR] File not found: '{path}'")
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            return {name: (data[f"t{k}"], data[f"v{k}"])
+                    for k, name in enumerate(meta["signals"])}
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    return {name: (np.load(os.path.join(path, f"t{k}.npy"), mmap_mode="r"),
+                   np.load(os.path.join(path, f"v{k}.npy"), mmap_mode="r"))
+            for k, name in enumerate(meta["signals"])}
+
+def sample(times, values, at):
+    """Value of a signal at each time in at (vectorized step lookup)."""
+    rows = np.searchsorted(times, at, side="right") - 1
+    return values[np.maximum(rows, 0)]
+
+# ====== CLI ======
+
+def parse_time(text, timescale):
+    """'1200' (timescale units) or '1.2us' → timescale units."""
+    m = re.fullmatch(r"([\d.]+)\s*([munpf]?s)?", text.strip())
+    if not m:
+        sys.exit(f"[ERROR] Bad time '{text}'")
+    if m.group(2):
+        return int(round(float(m.group(1)) * UNITS[m.group(2)] / timescale))
+    return int(float(m.group(1)))
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Streaming indexed reader for the pipeline VCD")
+    parser.add_argument("vcd", nargs="?", default=DEFAULT_VCD)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_index = sub.add_parser("index", help="(re)build the sidecar index")
+    p_index.add_argument("--force", action="store_true")
+
+    p_sig = sub.add_parser("signals", help="list signals (glob patterns)")
+    p_sig.add_argument("patterns", nargs="*")
+
+    for cmd in ("extract", "convert"):
+        p = sub.add_parser(cmd, help="print value changes" if cmd == "extract"
+                           else "write an array store")
+        p.add_argument("signals", nargs="+")
+        p.add_argument("--time", help="A:B window (VCD units or 10us:20us)")
+        if cmd == "extract":
+            p.add_argument("--limit", type=int, help="first N changes per signal")
+        else:
+            p.add_argument("-o", "--output", required=True,
+                           help="out.npz or a directory of .npy")
+    args = parser.parse_args()
+
+    index = load_index(args.vcd, rebuild=getattr(args, "force", False))
+    timescale = float(index["timescale"])
+    if args.cmd == "index":
+        print(f"[OK]   Indexed '{args.vcd}' → '{index_path(args.vcd)}'")
+        print(f"       Signals: {len(index['names'])} ({len(index['codes'])} "
+              f"id codes)  |  Time markers: {len(index['times'])}  |  "
+              f"Checkpoints: {len(index['ckpt_rows'])}")
+        if len(index["times"]):
+            print(f"       Time: {int(index['times'][0])}..{int(index['times'][-1])} "
+                  f"x {timescale:g} s")
+        return
+
+    if args.cmd == "signals":
+        names = [str(n) for n in index["names"]]
+        pats = args.patterns or ["*"]
+        for name, k in zip(names, index["slots"]):
+            if any(fnmatch.fnmatch(name, p) or fnmatch.fnmatch(name, f"*.{p}")
+                   for p in pats):
+                print(f"{name:<60} [{int(index['widths'][k])}]  "
+                      f"{int(index['changes'][k])} changes")
+        return
+
+    t0, t1 = 0, None
+    if args.time:
+        lo, _, hi = args.time.partition(":")
+        t0 = parse_time(lo, timescale) if lo else 0
+        t1 = parse_time(hi, timescale) if hi else None
+    names = resolve(index, args.signals)
+    signals = extract(args.vcd, names, t0, t1, index)
+
+    if args.cmd == "convert":
+        save(signals, args.output, timescale)
+        total = sum(len(t) for t, _ in signals.values())
+        print(f"[OK]   {len(signals)} signals, {total} samples → '{args.output}'")
+        return
+
+    for name, (t, v) in signals.items():
+        print(f"{name}  ({len(t)} samples)")
+        for time, value in list(zip(t, v))[:args.limit]:
+            value = int.from_bytes(np.asarray(value, dtype="<u8").tobytes(),
+                                   "little") if np.ndim(value) else int(value)
+            print(f"  {int(time):>12}  0x{value:x}")
+
+if __name__ == "__main__":
+    main()
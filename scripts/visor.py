@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+visor.py
+In-process library API for the VISOR image → DataMem → Sobel → edge-map flow.
+
+Every step works on in-memory arrays, so a service can run frames without
+spawning img_to_mem.py / mem_to_img.py or writing .mem files:
+
+    import visor
+    program = visor.generate_program("rotate")          # InstrMem words
+    edges, stats = visor.edge_detect("frame.png", program)
+
+    image_to_pixels   path / PIL image / array → (H, W) uint8 frame, resized
+                      with LANCZOS only when the size differs
+    pixels_to_words   frame → DataMem input words (4 per word when packed)
+    words_to_pixels   output_image.mem words → (H, W) uint8 edge frame
+    generate_program  generate_program_mem.build(), cached per frame
+    simulate          riscv_iss.py against a DataMem built from the words
+    edge_detect       all of the above for one frame
+    save_png          upscaled + raw PNG pair, as mem_to_img.py writes
+
+img_to_mem.py, mem_to_img.py and run_pipeline.py are wrappers over these
+functions. Pillow is imported on first use, so array-only callers never
+load it. Errors raise (ValueError, FileNotFoundError, ImportError) instead
+of exiting. The Vivado backend still needs files and stays in
+run_pipeline.py.
+
+Usage: python visor.py <input_image> [output.png] [--variant stock|optimize|
+                       rotate|packed] [--width W] [--height H]
+"""
+
+import os
+import sys
+import argparse
+import functools
+
+try:
+    import numpy as np
+except ImportError:
+    sys.exit("[ERROR] NumPy not installed. Run: pip install numpy")
+
+import generate_program_mem
+from mem_codec import PACKED_WIDTH, output_frame, pack_pixels, unpack_pixels
+
+VARIANTS = ("stock", "optimize", "rotate", "packed")
+
+def pil_image():
+    """PIL.Image, imported on first use."""
+    try:
+        from PIL import Image
+    except ImportError:
+        raise ImportError("Pillow not installed. Run: pip install Pillow") from None
+    return Image
+
+def frame_size(width=None, height=None, packed=False):
+    """(width, height) with the 32x32 / 64x64 packed defaults filled in."""
+    default = PACKED_WIDTH if packed else 32
+    return width or default, height or default
+
+def image_to_pixels(image, width=None, height=None, packed=False):
+    """Grayscale (height, width) uint8 frame of an image path, PIL image or
+    array; resized with LANCZOS, like img_to_mem.py, only when needed."""
+    width, height = frame_size(width, height, packed)
+    if isinstance(image, np.ndarray) and image.ndim == 2 and \
+            image.shape == (height, width):
+        return np.ascontiguousarray(image, dtype=np.uint8)
+    Image = pil_image()
+    if isinstance(image, (str, os.PathLike)):
+        if not os.path.exists(image):
+            raise FileNotFoundError(f"File not found: {image}")
+        image = Image.open(image)
+    elif isinstance(image, np.ndarray):
+        image = Image.fromarray(np.asarray(image, dtype=np.uint8))
+    img = image.convert("L")
+    if img.size != (width, height):
+        img = img.resize((width, height), Image.LANCZOS)
+    return np.frombuffer(img.tobytes(), dtype=np.uint8).reshape(height, width)
+
+def pixels_to_words(pixels, packed=False):
+    """Frame pixels → DataMem input words (uint32), 4 per word when packed."""
+    pixels = np.ascontiguousarray(pixels, dtype=np.uint8).ravel()
+    return pack_pixels(pixels) if packed else pixels.astype(np.uint32)
+
+def words_to_pixels(words, width=None, height=None, packed=False):
+    """Edge frame (height, width) in an output_image.mem dump of
+    FRAME_WORDS words (the frame ends at its last word)."""
+    width, height = frame_size(width, height, packed)
+    words = output_frame(np.asarray(words, dtype=np.uint32), width, height,
+                         packed)
+    pixels = unpack_pixels(words) if packed else (words & 0xFF).astype(np.uint8)
+    return pixels.reshape(height, width)
+
+@functools.lru_cache(maxsize=None)
+def _generate(mode, width, height, custom, rows):
+    words, _ = generate_program_mem.build(mode, width, height, rows, custom)
+    return tuple(words)
+
+def generate_program(variant="stock", width=None, height=None, custom=None,
+                     rows=None):
+    """InstrMem words of generate_program_mem.py --<variant> (or --custom
+    NAME), generated in this process; repeated calls hit a cache."""
+    if variant not in VARIANTS:
+        raise ValueError(f"Unknown variant '{variant}' (one of "
+                         f"{', '.join(VARIANTS)})")
+    mode = "custom" if custom else variant
+    return list(_generate(mode, width, height, custom,
+                          tuple(rows) if rows else None))
+
+def simulate(program, words, max_instrs=None):
+    """Run the ISS on DataMem = input words from word 0.
+
+    Returns (the FRAME_WORDS output_image.mem words, riscv_iss stats)."""
+    import riscv_iss
+
+    words = np.asarray(words, dtype=np.uint32).ravel()
+    if len(words) > riscv_iss.DMEM_WORDS:
+        raise ValueError(f"{len(words)} input words, DataMem has "
+                         f"{riscv_iss.DMEM_WORDS}")
+    dmem = words.tolist() + [0] * (riscv_iss.DMEM_WORDS - len(words))
+    stats = riscv_iss.run(list(program), dmem,
+                          max_instrs or riscv_iss.MAX_INSTRS)
+    output = np.array(dmem[riscv_iss.OUT_START:riscv_iss.OUT_END + 1],
+                      dtype=np.uint32)
+    return output, stats
+
+def edge_detect(image, program=None, width=None, height=None, packed=False):
+    """Edge frame of one image through the ISS; program defaults to the
+    stock (or --packed) program for the frame size.
+
+    Returns ((height, width) uint8 edges, riscv_iss stats); stats["halted"]
+    is False if the completion marker was never written."""
+    if program is None:
+        program = generate_program("packed" if packed else "stock",
+                                   width, height)
+    pixels = image_to_pixels(image, width, height, packed)
+    output, stats = simulate(program, pixels_to_words(pixels, packed))
+    height, width = pixels.shape
+    return words_to_pixels(output, width, height, packed), stats
+
+def to_image(pixels):
+    """(height, width) uint8 array → PIL "L" image."""
+    pixels = np.ascontiguousarray(pixels, dtype=np.uint8)
+    return pil_image().fromarray(pixels, "L")
+
+def save_png(pixels, output_path):
+    """Save the edge frame upscaled (NEAREST, about 512 px) to output_path
+    and at its own size to <output>_<W>x<H>.png; returns both paths."""
+    Image = pil_image()
+    img = to_image(pixels)
+    width, height = img.size
+    scale = max(1, 512 // max(width, height))
+    img.resize((width * scale, height * scale), Image.NEAREST).save(output_path)
+    raw_path = output_path.replace(".png", f"_{width}x{height}.png")
+    img.save(raw_path)
+    return output_path, raw_path
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="In-process image → ISS → edge PNG")
+    parser.add_argument("image")
+    parser.add_argument("output", nargs="?", default="edge_detected_output.png")
+    parser.add_argument("--variant", choices=VARIANTS, default="stock")
+    parser.add_argument("--width", type=int, default=None)
+    parser.add_argument("--height", type=int, default=None)
+    args = parser.parse_args()
+
+    packed = args.variant == "packed"
+    try:
+        program = generate_program(args.variant, args.width, args.height)
+        edges, stats = edge_detect(args.image, program, args.width,
+                                   args.height, packed)
+        save_png(edges, args.output)
+    except (ValueError, OSError, ImportError) as e:
+        sys.exit(f"[ERROR] {e}")
+    if not stats["halted"]:
+        print("[WARN] No completion marker; output may be incomplete")
+    print(f"[OK]   {args.image} → '{args.output}' ({edges.shape[1]}x"
+          f"{edges.shape[0]}, {int(np.count_nonzero(edges))} edge pixels, "
+          f"{stats['instructions']} instructions)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+vivado_reports.py
+Turns the Vivado reports written by run_synth_reports.tcl into operational
+numbers for the Sobel program.
+
+Parses reports/ into structured data:
+    timing_impl.txt       - design WNS/WHS, per-clock period and WNS
+                            (Clock Summary / Intra Clock Table)
+    utilization_impl.txt  - LUT, FF, Block RAM, DSP and IOB use
+    power_report.txt      - total, dynamic and static on-chip power
+and combines them with the cycle count of a program.mem (from
+pipeline_model.py) to report frames/s, pixels/s and uJ per frame
+(pixels/s counts the --width x --height frame the program was generated
+for, default 32x32 or 64x64 with --packed):
+    current  - the ClkDiv pipeline clock (clk_100mhz / 8 = 12.5 MHz, see
+               pipeline_model.py)
+    fmax     - the timing-limited clock 1 / (period - WNS) of the pipeline
+               clock (the constrained clock with the longest period, or
+               --clock NAME), or --fmax-mhz
+Dynamic power is scaled linearly with frequency from the clock the power
+report was estimated at (the constrained pipeline clock, else --power-mhz,
+default the current pipeline clock); static power is fixed.
+
+Without timing constraints (WNS "NA") only the current-clock numbers are
+reported; add a create_clock / create_generated_clock XDC or pass
+--fmax-mhz.
+
+Usage: python vivado_reports.py [--reports DIR] [--program program.mem]
+                                [--width W] [--height H] [--packed]
+                                [--cycles N] [--fmax-mhz F] [--clock NAME]
+                                [--power-mhz F] [--json out.json]
+"""
+
+import sys
+import os
+import re
+import json
+import argparse
+
+SCRIPT_DIR   = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+REPORT_DIR   = os.path.join(PROJECT_ROOT, "reports")
+
+UTIL_ROWS = {"Slice LUTs": "lut", "Slice Registers": "ff",
+             "Block RAM Tile": "bram", "RAMB36/FIFO*": "ramb36",
+             "RAMB18": "ramb18", "DSPs": "dsp", "Bonded IOB": "iob"}
+POWER_ROWS = {"Total On-Chip Power (W)": "total_w", "Dynamic (W)": "dynamic_w",
+              "Device Static (W)": "static_w",
+              "Junction Temperature (C)": "junction_c",
+              "Confidence Level": "confidence"}
+
+CLOCK_SUMMARY_RE = re.compile(r"^\s*(\S+)\s+\{[-\d. ]+\}\s+([\d.]+)\s+([\d.]+)\s*$")
+INTRA_CLOCK_RE   = re.compile(r"^(\S+)\s+(-?[\d.]+|NA)\s+(-?[\d.]+|NA)\s")
+DESIGN_WNS_RE    = re.compile(r"^\s*(-?[\d.]+|NA)\s+(-?[\d.]+|NA)\s+(\d+|NA)\s+"
+                              r"(\d+|NA)\s+(-?[\d.]+|NA)\s")
+
+def _num(text):
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+def read_report(path):
+    if not os.path.exists(path):
+        sys.exit(f"[ERROR] File not found: '{path}'\n"
+                 f"       Run scripts/run_synth_reports.tcl in Vivado first.")
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return f.read().splitlines()
+
+def sections(lines):
+    """{'| Title' heading: [lines up to the next heading]} of a Vivado report."""
+    found, title = {}, None
+    for line in lines:
+        if line.startswith("| ") and not line.startswith("| -"):
+            title = line[2:].strip()
+            found.setdefault(title, [])
+        elif title is not None:
+            found[title].append(line)
+    return found
+
+def table_rows(lines):
+    """'| a | b | c |' rows → [[a, b, c]] (borders and headers included)."""
+    return [[cell.strip() for cell in line.strip().strip("|").split("|")]
+            for line in lines if line.lstrip().startswith("|")]
+
+def parse_timing(path):
+    """Design WNS/WHS (ns or None) and {clock: {period_ns, wns_ns}}."""
+    parts = sections(read_report(path))
+    timing = {"wns_ns": None, "whs_ns": None, "constrained": True, "clocks": {}}
+    for line in parts.get("Design Timing Summary", []):
+        m = DESIGN_WNS_RE.match(line)
+        if m:
+            timing["wns_ns"], timing["whs_ns"] = _num(m.group(1)), _num(m.group(5))
+            break
+    timing["constrained"] = not any("no user specified timing constraints" in l
+                                    for l in parts.get("Design Timing Summary", []))
+    for line in parts.get("Clock Summary", []):
+        m = CLOCK_SUMMARY_RE.match(line)
+        if m:
+            timing["clocks"][m.group(1)] = {"period_ns": float(m.group(2)),
+                                           "wns_ns": None}
+    for line in parts.get("Intra Clock Table", []):
+        m = INTRA_CLOCK_RE.match(line)
+        if m and m.group(1) in timing["clocks"]:
+            timing["clocks"][m.group(1)]["wns_ns"] = _num(m.group(2))
+    return timing
+
+def parse_utilization(path):
+    """{lut|ff|bram|...: {used, available, util_pct}} from the first tables."""
+    util = {}
+    for row in table_rows(read_report(path)):
+        key = UTIL_ROWS.get(row[0])
+        if key and key not in util and len(row) >= 6:
+            util[key] = {"used": _num(row[1]), "available": _num(row[4]),
+                         "util_pct": _num(row[5])}
+    return util
+
+def parse_power(path):
+    """Summary power numbers plus the per-hierarchy dynamic power."""
+    lines = read_report(path)
+    power = {}
+    for row in table_rows(lines):
+        key = POWER_ROWS.get(row[0])
+        if key and key not in power and len(row) >= 2:
+            power[key] = row[1] if key == "confidence" else _num(row[1])
+    power["hierarchy"] = {row[0]: _num(row[1])
+                          for row in table_rows(sections(lines).get("By Hierarchy", []))
+                          if len(row) == 2 and _num(row[1]) is not None}
+    return power
+
+def parse_reports(report_dir=REPORT_DIR):
+    return {"timing": parse_timing(os.path.join(report_dir, "timing_impl.txt")),
+            "utilization": parse_utilization(
+                os.path.join(report_dir, "utilization_impl.txt")),
+            "power": parse_power(os.path.join(report_dir, "power_report.txt"))}
+
+def timing_fmax(timing, clock=None):
+    """(clock name, Fmax Hz) of the pipeline clock, or (None, None)."""
+    clocks = {name: c for name, c in timing["clocks"].items()
+              if c["wns_ns"] is not None}
+    if clock is not None:
+        clocks = {clock: clocks[clock]} if clock in clocks else {}
+    if not clocks:
+        return None, None
+    # The pipeline runs on the divided clock: the longest constrained period
+    name = max(clocks, key=lambda n: clocks[n]["period_ns"])
+    c = clocks[name]
+    return name, 1e9 / (c["period_ns"] - c["wns_ns"])
+
+def operating_point(cycles, clock_hz, power, power_hz, pixels):
+    """frames/s, pixels/s (pixels per frame), power and uJ/frame at clock_hz."""
+    static = power.get("static_w") or 0.0
+    dynamic = (power.get("dynamic_w") or 0.0) * clock_hz / power_hz
+    fps = clock_hz / cycles
+    return {"clock_mhz": round(clock_hz / 1e6, 3),
+            "frame_us": round(1e6 / fps, 3),
+            "fps": round(fps, 2),
+            "pixels_per_s": round(fps * pixels),
+            "power_w": round(static + dynamic, 4),
+            "uj_per_frame": round((static + dynamic) / fps * 1e6, 3)}
+
+def estimate(reports, cycles, clock_hz, fmax_hz=None, clock=None,
+             power_hz=None, frame=(32, 32)):
+    """Operating points at the current clock and at the timing limit for
+    a frame of (width, height) pixels."""
+    timing = reports["timing"]
+    name, timed = timing_fmax(timing, clock)
+    fmax_hz = fmax_hz or timed
+    if power_hz is None:
+        power_hz = (1e9 / timing["clocks"][name]["period_ns"] if name
+                    else clock_hz)
+    pixels = frame[0] * frame[1]
+    result = {"cycles": cycles, "frame": f"{frame[0]}x{frame[1]}",
+              "pipeline_clock": name,
+              "power_estimated_at_mhz": round(power_hz / 1e6, 3),
+              "current": operating_point(cycles, clock_hz, reports["power"],
+                                         power_hz, pixels),
+              "fmax": None, "headroom": None}
+    if fmax_hz:
+        result["fmax"] = operating_point(cycles, fmax_hz, reports["power"],
+                                         power_hz, pixels)
+        result["headroom"] = round(fmax_hz / clock_hz, 2)
+    return result
+
+def program_cycles(program_path, image_path=None):
+    """pipeline_model cycles for program.mem (the loop is data-independent)."""
+    import pipeline_model
+    import riscv_iss
+
+    program = riscv_iss.read_mem(program_path, riscv_iss.IMEM_WORDS)
+    dmem = (riscv_iss.read_mem(image_path, riscv_iss.DMEM_WORDS)
+            if image_path else [0] * riscv_iss.DMEM_WORDS)
+    stats = pipeline_model.run(program, dmem)
+    if not stats["halted"]:
+        sys.exit(f"[ERROR] '{program_path}' never stores the completion marker")
+    return stats["cycles"]
+
+def print_reports(reports):
+    timing, util, power = (reports["timing"], reports["utilization"],
+                           reports["power"])
+    wns = timing["wns_ns"]
+    print(f"[INFO] Timing:  WNS {'NA' if wns is None else f'{wns:.3f} ns'}"
+          f"{'' if timing['constrained'] else '  (no timing constraints)'}")
+    for name, c in timing["clocks"].items():
+        slack = "NA" if c["wns_ns"] is None else f"{c['wns_ns']:.3f} ns"
+        print(f"       {name:<16} period {c['period_ns']:.3f} ns  WNS {slack}")
+    print("[INFO] Resources: " + "  ".join(
+        f"{key.upper()} {int(u['used'])}/{int(u['available'])}"
+        for key, u in util.items()
+        if key in ("lut", "ff", "bram", "dsp") and u["used"] is not None))
+    print(f"[INFO] Power:   total {power.get('total_w')} W  |  dynamic "
+          f"{power.get('dynamic_w')} W  |  static {power.get('static_w')} W  "
+          f"(confidence {power.get('confidence', '?')})")
+    lut = util.get("lut", {}).get("used")
+    bram = util.get("bram", {}).get("used")
+    if lut is not None and lut < 100 and not bram:
+        print(f"[WARN] The implemented netlist is nearly empty ({int(lut)} LUTs, "
+              f"no Block RAM): the pipeline has no observable outputs and was "
+              f"optimized away, so power and timing describe that netlist only.")
+
+def print_point(label, point):
+    print(f"{label:<9} {point['clock_mhz']:8.3f} {point['frame_us']:10.1f} "
+          f"{point['fps']:9.1f} {point['pixels_per_s']:11d} "
+          f"{point['power_w']:7.3f} {point['uj_per_frame']:9.2f}")
+
+def main():
+    import pipeline_model
+
+    parser = argparse.ArgumentParser(
+        description="Vivado reports → Fmax, resources, power, fps and uJ/frame")
+    parser.add_argument("--reports", default=REPORT_DIR)
+    parser.add_argument("--program",
+                        default=os.path.join(PROJECT_ROOT, "mem", "program.mem"))
+    parser.add_argument("--image", help="image.mem for the cycle model "
+                                        "(default: all-zero frame)")
+    parser.add_argument("--width", type=int, default=None,
+                        help="frame width the program was generated for "
+                             "(default 32, 64 packed)")
+    parser.add_argument("--height", type=int, default=None,
+                        help="frame height (default 32, 64 packed)")
+    parser.add_argument("--packed", action="store_true",
+                        help="frame stored 4 pixels per word (64x64 default)")
+    parser.add_argument("--cycles", type=int,
+                        help="cycles per frame (skips the cycle model)")
+    parser.add_argument("--clock-mhz", type=float,
+                        default=pipeline_model.PIPELINE_CLK_HZ / 1e6,
+                        help="current pipeline clock (default: %(default)g)")
+    parser.add_argument("--fmax-mhz", type=float,
+                        help="timing-limited clock when the reports have none")
+    parser.add_argument("--clock", help="constrained clock driving the pipeline")
+    parser.add_argument("--power-mhz", type=float,
+                        help="clock the power report was estimated at")
+    parser.add_argument("--json", help="write reports + estimate as JSON")
+    args = parser.parse_args()
+    default = 64 if args.packed else 32
+    frame = (args.width or default, args.height or default)
+
+    reports = parse_reports(args.reports)
+    print_reports(reports)
+    cycles = args.cycles or program_cycles(args.program, args.image)
+    result = estimate(reports, cycles, args.clock_mhz * 1e6,
+                      args.fmax_mhz and args.fmax_mhz * 1e6, args.clock,
+                      args.power_mhz and args.power_mhz * 1e6, frame)
+
+    print(f"\n[INFO] {cycles} cycles per {frame[0]}x{frame[1]} frame"
+          f"{'' if args.cycles else f' ({args.program})'}")
+    print(f"{'clock':<9} {'MHz':>8} {'frame us':>10} {'frames/s':>9} "
+          f"{'pixels/s':>11} {'power W':>7} {'uJ/frame':>9}")
+    print_point("current", result["current"])
+    if result["fmax"]:
+        print_point("fmax", result["fmax"])
+        print(f"[INFO] Timing headroom: {result['headroom']:.2f}x the current clock")
+    else:
+        print("[WARN] No timing-limited Fmax: the reports have no constrained "
+              "clock with a WNS. Pass --fmax-mhz or constrain the clocks.")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"reports": reports, "estimate": result}, f, indent=1)
+        print(f"[OK]   Written '{args.json}'")
+
+if __name__ == "__main__":
+    main()